@@ -0,0 +1,205 @@
+# bench.py
+#
+# End-to-end benchmarks for pyselector, run against the fake menus in
+# `benchmarks/bin`, so they need no display or tty.
+#
+# Usage:
+#   python benchmarks/bench.py                      # compare with baseline.json
+#   python benchmarks/bench.py --sizes 1000,100000  # only some sizes
+#   python benchmarks/bench.py --save               # store a new baseline
+#
+# Each menu and size runs in its own process, so its peak RSS is not
+# affected by the other runs.
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+HERE = Path(__file__).resolve().parent
+ROOT = HERE.parent
+FAKE_BIN = HERE / 'bin'
+BASELINE = HERE / 'baseline.json'
+
+MENUS = ('rofi', 'dmenu', 'fzf')
+SIZES = (1_000, 10_000, 100_000, 1_000_000, 5_000_000)
+REPEAT = 3
+TOLERANCE = 0.25
+
+# metric -> True if higher is better
+METRICS = {
+    'latency': False,
+    'throughput': True,
+    'peak_rss': False,
+    'menu_peak_rss': False,
+    'import_time': False,
+}
+
+
+def env() -> dict[str, str]:
+    """Environment for the runs: the fake menus and this checkout first."""
+    e = dict(os.environ)
+    e['PATH'] = os.pathsep.join((str(FAKE_BIN), e.get('PATH', '')))
+    e['PYTHONPATH'] = os.pathsep.join(filter(None, (str(ROOT / 'src'), e.get('PYTHONPATH'))))
+    return e
+
+
+def peak_rss() -> int:
+    """
+    Returns the peak RSS of this process in bytes.
+
+    `VmHWM` is reset by exec, unlike `ru_maxrss`, which would include
+    the memory of the process that spawned this one.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is in KiB on linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def worker(menu_name: str, size: int, repeat: int) -> dict[str, Any]:
+    """Runs inside the child process, returns the metrics of one menu and size."""
+    import pyselector
+
+    stats = tempfile.NamedTemporaryFile(mode='r', prefix='pyselector-bench-', suffix='.stats')  # noqa: SIM115
+    os.environ['FAKE_MENU_STATS'] = stats.name
+
+    items = [f'item {i}' for i in range(size)]
+    payload = sum(len(item) + 1 for item in items)
+    menu = pyselector.Menu.get(menu_name)
+
+    timings: list[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        selected, code = menu.select(items)
+        timings.append(time.perf_counter() - start)
+        if selected != items[-1] or code != 0:
+            msg = f'{menu_name}: unexpected selection {selected!r} with code {code}'
+            raise RuntimeError(msg)
+
+    latency = statistics.median(timings)
+    with stats:
+        menu_rss = max(int(line) for line in stats)
+    return {
+        'latency': latency,
+        'throughput': payload / latency,
+        'peak_rss': peak_rss(),
+        'menu_peak_rss': menu_rss,
+    }
+
+
+def run_worker(menu_name: str, size: int, repeat: int) -> dict[str, Any]:
+    cmd = [sys.executable, str(Path(__file__).resolve()), '--worker', menu_name, str(size), str(repeat)]
+    proc = subprocess.run(cmd, env=env(), stdout=subprocess.PIPE, check=True)
+    return json.loads(proc.stdout)
+
+
+def import_time(repeat: int) -> float:
+    """Returns the best cumulative `import pyselector` time, in seconds."""
+    pattern = re.compile(r'import time:\s+\d+\s+\|\s+(\d+)\s+\|\s+pyselector$')
+    best = float('inf')
+    for _ in range(repeat):
+        cmd = [sys.executable, '-X', 'importtime', '-c', 'import pyselector']
+        proc = subprocess.run(cmd, env=env(), stderr=subprocess.PIPE, check=True, text=True)
+        for line in proc.stderr.splitlines():
+            match = pattern.match(line)
+            if match:
+                best = min(best, int(match.group(1)) / 1e6)
+    return best
+
+
+def run(menus: tuple[str, ...], sizes: tuple[int, ...], repeat: int) -> dict[str, dict[str, float]]:
+    results: dict[str, dict[str, float]] = {'import': {'import_time': import_time(repeat)}}
+    for menu_name in menus:
+        for size in sizes:
+            results[f'{menu_name}/{size}'] = run_worker(menu_name, size, repeat)
+            print(f'{menu_name}/{size}: {format_metrics(results[f"{menu_name}/{size}"])}', file=sys.stderr)
+    return results
+
+
+def compare(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    tolerance: float = TOLERANCE,
+) -> list[str]:
+    """Returns a line for each metric that regressed past the tolerance."""
+    regressions: list[str] = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            base = baseline.get(name, {}).get(metric)
+            if not base:
+                continue
+            ratio = value / base
+            worse = ratio < 1 - tolerance if METRICS[metric] else ratio > 1 + tolerance
+            if worse:
+                regressions.append(f'{name} {metric}: {value:.6g} vs baseline {base:.6g} ({ratio:.2f}x)')
+    return regressions
+
+
+def format_metrics(metrics: dict[str, float]) -> str:
+    parts = []
+    for metric, value in metrics.items():
+        if metric.endswith('rss'):
+            parts.append(f'{metric}={value / 2**20:.1f}MiB')
+        elif metric == 'throughput':
+            parts.append(f'{metric}={value / 2**20:.1f}MiB/s')
+        else:
+            parts.append(f'{metric}={value * 1000:.2f}ms')
+    return ' '.join(parts)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='pyselector benchmarks')
+    parser.add_argument('--menus', default=','.join(MENUS))
+    parser.add_argument('--sizes', default=','.join(map(str, SIZES)))
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--baseline', type=Path, default=BASELINE)
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    parser.add_argument('--save', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--worker', nargs=3, metavar=('MENU', 'SIZE', 'REPEAT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        menu_name, size, repeat = args.worker
+        print(json.dumps(worker(menu_name, int(size), int(repeat))))
+        return 0
+
+    menus = tuple(args.menus.split(','))
+    sizes = tuple(int(s) for s in args.sizes.split(','))
+    results = run(menus, sizes, args.repeat)
+    print(f'import: {format_metrics(results["import"])}', file=sys.stderr)
+
+    if args.save:
+        args.baseline.write_text(json.dumps(results, indent=2, sort_keys=True) + '\n')
+        print(f'baseline saved to {args.baseline}', file=sys.stderr)
+        return 0
+
+    try:
+        baseline = json.loads(args.baseline.read_text())
+    except FileNotFoundError:
+        print(f'no baseline at {args.baseline}, run with --save', file=sys.stderr)
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for line in regressions:
+        print(f'regression: {line}', file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
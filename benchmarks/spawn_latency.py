@@ -0,0 +1,103 @@
+# spawn_latency.py
+#
+# Compares how long it takes to start a menu as the RSS of the parent
+# process grows, for `os.fork` + `execv`, `subprocess.Popen` and the
+# `posix_spawnp` layer in `pyselector.spawn`.
+#
+# fork copies the page tables of the parent, so its cost grows with RSS;
+# vfork-style spawns do not.
+#
+# Usage:
+#   python benchmarks/spawn_latency.py
+#   python benchmarks/spawn_latency.py --rss 0,512,2048 --repeat 50 --command fzf
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent / 'src'))
+
+from pyselector import spawn  # noqa: E402
+
+RSS_MIB = (0, 256, 1024)
+REPEAT = 20
+
+
+def fork_exec(args: list[str]) -> int:
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.execv(args[0], args)
+        finally:
+            os._exit(127)
+    _, status = os.waitpid(pid, 0)
+    return status
+
+
+def popen(args: list[str]) -> int:
+    return subprocess.Popen(args).wait()
+
+
+def posix_spawn(args: list[str]) -> int:
+    return spawn.SpawnedProcess(args).wait()
+
+
+METHODS: dict[str, Callable[[list[str]], int]] = {
+    'fork': fork_exec,
+    'popen': popen,
+    'posix_spawn': posix_spawn,
+}
+
+
+def latency(method: Callable[[list[str]], int], args: list[str], repeat: int) -> float:
+    """Returns the median time in ms to start `args` and wait for it to exit."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        method(args)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def run(rss: list[int], args: list[str], repeat: int) -> dict[int, dict[str, float]]:
+    results: dict[int, dict[str, float]] = {}
+    ballast: list[bytearray] = []
+    allocated = 0
+    for size in sorted(rss):
+        # filled, not zeroed, so the pages are resident
+        ballast.append(bytearray(b'\x01') * ((size - allocated) * 1024 * 1024))
+        allocated = size
+        results[size] = {name: latency(method, args, repeat) for name, method in METHODS.items()}
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='menu start latency by parent RSS')
+    parser.add_argument('--rss', default=','.join(map(str, RSS_MIB)), help='parent RSS sizes in MiB')
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--command', default='true', help='executable to start')
+    opts = parser.parse_args()
+
+    command = shutil.which(opts.command)
+    if command is None:
+        print(f'{opts.command!r} not found', file=sys.stderr)
+        return 1
+
+    results = run([int(s) for s in opts.rss.split(',')], [command], opts.repeat)
+    print(f'{"rss MiB":>8}' + ''.join(f'{name:>14}' for name in METHODS))
+    for size, row in results.items():
+        print(f'{size:>8}' + ''.join(f'{row[name]:>12.3f}ms' for name in METHODS))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
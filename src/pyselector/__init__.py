@@ -5,6 +5,7 @@ Menus available:
 - Rofi
 - Dmenu (work-in-progress)
 - Fzf (work-in-progress)
+- Headless (in-process, answered by a policy)
 
 Usage:
 
@@ -22,11 +23,13 @@ from __future__ import annotations
 
 from pyselector.menus.dmenu import Dmenu
 from pyselector.menus.fzf import Fzf
+from pyselector.menus.headless import Headless
 from pyselector.menus.rofi import Rofi
 from pyselector.selector import Menu
 
 Menu.register('dmenu', Dmenu)
 Menu.register('rofi', Rofi)
 Menu.register('fzf', Fzf)
+Menu.register('headless', Headless)
 
 __version__ = '0.0.41'
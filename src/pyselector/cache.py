@@ -0,0 +1,134 @@
+# cache.py
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections import OrderedDict
+from types import FunctionType
+from typing import Any
+from typing import Callable
+from typing import Hashable
+from typing import NamedTuple
+
+log = logging.getLogger(__name__)
+
+RENDER_CACHE_SIZE = 100_000
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class RenderCache:
+    """
+    A bounded LRU cache for the lines rendered by a preprocessor.
+
+    Items are keyed by the preprocessor that renders them, their hash
+    (or their identity if unhashable) and a version token, so a menu can
+    share one cache across calls with different preprocessors. Change
+    `version` (or call `invalidate`) when a preprocessor's output would
+    change.
+
+    A function is keyed by its code, defaults and the values it closes
+    over, so a lambda created on each call hits the lines of the previous
+    ones. Other callables are keyed by equality, or identity if unhashable.
+
+    Usage:
+        menu = pyselector.Menu.rofi()
+        menu.render_cache = RenderCache(maxsize=50_000)
+        menu.select(items, preprocessor=render_row)
+    """
+
+    def __init__(self, maxsize: int = RENDER_CACHE_SIZE, version: Hashable = 0) -> None:
+        self.maxsize = maxsize
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._cache: OrderedDict[Hashable, tuple[Any, Callable[..., Any], Any]] = OrderedDict()
+
+    def _key(self, item: Any, preprocessor: Hashable) -> tuple[Hashable, bool]:
+        try:
+            hash(item)
+        except TypeError:
+            return (preprocessor, self.version, type(item), id(item)), True
+        # `type` keeps 1 and True apart
+        return (preprocessor, self.version, type(item), item), False
+
+    def render(self, item: Any, preprocessor: Callable[..., Any]) -> Any:
+        """Returns the rendered line of the item, calling `preprocessor` on a miss."""
+        return self._render(item, preprocessor, _preprocessor_key(preprocessor))
+
+    def _render(self, item: Any, preprocessor: Callable[..., Any], preprocessor_key: Hashable) -> Any:
+        key, by_id = self._key(item, preprocessor_key)
+        with self._lock:
+            entry = self._cache.get(key)
+            # an id can be reused, make sure it is the same object
+            if entry is not None and (not by_id or entry[0] is item):
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return entry[2]
+            self.misses += 1
+
+        line = preprocessor(item)
+        # the preprocessor (and unhashable items) are kept alive while
+        # cached, so their id is not reused
+        ref = item if by_id else None
+        with self._lock:
+            self._cache[key] = (ref, preprocessor, line)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return line
+
+    def wrap(self, preprocessor: Callable[..., Any]) -> Callable[[Any], Any]:
+        """Returns the preprocessor with its results cached."""
+        key = _preprocessor_key(preprocessor)
+
+        def cached(item: Any) -> Any:
+            return self._render(item, preprocessor, key)
+
+        return cached
+
+    def invalidate(self) -> None:
+        """Removes all the cached lines."""
+        with self._lock:
+            self._cache.clear()
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._cache))
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+def _preprocessor_key(preprocessor: Callable[..., Any]) -> Hashable:
+    """
+    Returns the key of the preprocessor in a `RenderCache`, equal for
+    functions with the same code, globals, defaults and closed over values.
+    """
+    if not isinstance(preprocessor, FunctionType):
+        # e.g. bound methods and builtins compare equal across lookups
+        try:
+            hash(preprocessor)
+        except TypeError:
+            return id(preprocessor)
+        return preprocessor
+    try:
+        key = (
+            preprocessor.__code__,
+            # equal code objects can read different module globals
+            id(preprocessor.__globals__),
+            preprocessor.__defaults__,
+            tuple((preprocessor.__kwdefaults__ or {}).items()),
+            tuple(cell.cell_contents for cell in preprocessor.__closure__ or ()),
+        )
+        hash(key)
+    except (TypeError, ValueError):
+        # an unhashable default or closed over value, or an empty cell
+        return id(preprocessor)
+    return key
@@ -4,33 +4,364 @@
 
 from __future__ import annotations
 
+import json
 import logging
+import os
 from contextlib import suppress
 from functools import lru_cache
+from pathlib import Path
+from typing import Any
+from typing import NamedTuple
 
-from PIL import ImageColor
-from Xlib.display import Display
-from Xlib.error import DisplayNameError
-from Xlib.Xatom import RESOURCE_MANAGER
-from Xlib.Xatom import STRING
+from pyselector.constants import cache_dir
 
 logger = logging.getLogger(__name__)
 
+# CSS/X11 color names, the same values `PIL.ImageColor` uses.
+NAMED_COLORS: dict[str, str] = {
+    'aliceblue': '#f0f8ff',
+    'antiquewhite': '#faebd7',
+    'aqua': '#00ffff',
+    'aquamarine': '#7fffd4',
+    'azure': '#f0ffff',
+    'beige': '#f5f5dc',
+    'bisque': '#ffe4c4',
+    'black': '#000000',
+    'blanchedalmond': '#ffebcd',
+    'blue': '#0000ff',
+    'blueviolet': '#8a2be2',
+    'brown': '#a52a2a',
+    'burlywood': '#deb887',
+    'cadetblue': '#5f9ea0',
+    'chartreuse': '#7fff00',
+    'chocolate': '#d2691e',
+    'coral': '#ff7f50',
+    'cornflowerblue': '#6495ed',
+    'cornsilk': '#fff8dc',
+    'crimson': '#dc143c',
+    'cyan': '#00ffff',
+    'darkblue': '#00008b',
+    'darkcyan': '#008b8b',
+    'darkgoldenrod': '#b8860b',
+    'darkgray': '#a9a9a9',
+    'darkgrey': '#a9a9a9',
+    'darkgreen': '#006400',
+    'darkkhaki': '#bdb76b',
+    'darkmagenta': '#8b008b',
+    'darkolivegreen': '#556b2f',
+    'darkorange': '#ff8c00',
+    'darkorchid': '#9932cc',
+    'darkred': '#8b0000',
+    'darksalmon': '#e9967a',
+    'darkseagreen': '#8fbc8f',
+    'darkslateblue': '#483d8b',
+    'darkslategray': '#2f4f4f',
+    'darkslategrey': '#2f4f4f',
+    'darkturquoise': '#00ced1',
+    'darkviolet': '#9400d3',
+    'deeppink': '#ff1493',
+    'deepskyblue': '#00bfff',
+    'dimgray': '#696969',
+    'dimgrey': '#696969',
+    'dodgerblue': '#1e90ff',
+    'firebrick': '#b22222',
+    'floralwhite': '#fffaf0',
+    'forestgreen': '#228b22',
+    'fuchsia': '#ff00ff',
+    'gainsboro': '#dcdcdc',
+    'ghostwhite': '#f8f8ff',
+    'gold': '#ffd700',
+    'goldenrod': '#daa520',
+    'gray': '#808080',
+    'grey': '#808080',
+    'green': '#008000',
+    'greenyellow': '#adff2f',
+    'honeydew': '#f0fff0',
+    'hotpink': '#ff69b4',
+    'indianred': '#cd5c5c',
+    'indigo': '#4b0082',
+    'ivory': '#fffff0',
+    'khaki': '#f0e68c',
+    'lavender': '#e6e6fa',
+    'lavenderblush': '#fff0f5',
+    'lawngreen': '#7cfc00',
+    'lemonchiffon': '#fffacd',
+    'lightblue': '#add8e6',
+    'lightcoral': '#f08080',
+    'lightcyan': '#e0ffff',
+    'lightgoldenrodyellow': '#fafad2',
+    'lightgreen': '#90ee90',
+    'lightgray': '#d3d3d3',
+    'lightgrey': '#d3d3d3',
+    'lightpink': '#ffb6c1',
+    'lightsalmon': '#ffa07a',
+    'lightseagreen': '#20b2aa',
+    'lightskyblue': '#87cefa',
+    'lightslategray': '#778899',
+    'lightslategrey': '#778899',
+    'lightsteelblue': '#b0c4de',
+    'lightyellow': '#ffffe0',
+    'lime': '#00ff00',
+    'limegreen': '#32cd32',
+    'linen': '#faf0e6',
+    'magenta': '#ff00ff',
+    'maroon': '#800000',
+    'mediumaquamarine': '#66cdaa',
+    'mediumblue': '#0000cd',
+    'mediumorchid': '#ba55d3',
+    'mediumpurple': '#9370db',
+    'mediumseagreen': '#3cb371',
+    'mediumslateblue': '#7b68ee',
+    'mediumspringgreen': '#00fa9a',
+    'mediumturquoise': '#48d1cc',
+    'mediumvioletred': '#c71585',
+    'midnightblue': '#191970',
+    'mintcream': '#f5fffa',
+    'mistyrose': '#ffe4e1',
+    'moccasin': '#ffe4b5',
+    'navajowhite': '#ffdead',
+    'navy': '#000080',
+    'oldlace': '#fdf5e6',
+    'olive': '#808000',
+    'olivedrab': '#6b8e23',
+    'orange': '#ffa500',
+    'orangered': '#ff4500',
+    'orchid': '#da70d6',
+    'palegoldenrod': '#eee8aa',
+    'palegreen': '#98fb98',
+    'paleturquoise': '#afeeee',
+    'palevioletred': '#db7093',
+    'papayawhip': '#ffefd5',
+    'peachpuff': '#ffdab9',
+    'peru': '#cd853f',
+    'pink': '#ffc0cb',
+    'plum': '#dda0dd',
+    'powderblue': '#b0e0e6',
+    'purple': '#800080',
+    'rebeccapurple': '#663399',
+    'red': '#ff0000',
+    'rosybrown': '#bc8f8f',
+    'royalblue': '#4169e1',
+    'saddlebrown': '#8b4513',
+    'salmon': '#fa8072',
+    'sandybrown': '#f4a460',
+    'seagreen': '#2e8b57',
+    'seashell': '#fff5ee',
+    'sienna': '#a0522d',
+    'silver': '#c0c0c0',
+    'skyblue': '#87ceeb',
+    'slateblue': '#6a5acd',
+    'slategray': '#708090',
+    'slategrey': '#708090',
+    'snow': '#fffafa',
+    'springgreen': '#00ff7f',
+    'steelblue': '#4682b4',
+    'tan': '#d2b48c',
+    'teal': '#008080',
+    'thistle': '#d8bfd8',
+    'tomato': '#ff6347',
+    'turquoise': '#40e0d0',
+    'violet': '#ee82ee',
+    'wheat': '#f5deb3',
+    'white': '#ffffff',
+    'whitesmoke': '#f5f5f5',
+    'yellow': '#ffff00',
+    'yellowgreen': '#9acd32',
+}
 
-@lru_cache
-def load_colors() -> dict[str, str]:
-    with suppress(DisplayNameError):
+
+# a file with the output of `xrdb -query`, read instead of the X server
+XRESOURCES_ENV = 'PYSELECTOR_XRESOURCES'
+XRESOURCES_CACHE = 'xresources.json'
+# files whose change means the resources may have been reloaded
+RESOURCE_FILES = ('.Xresources', '.Xdefaults')
+X11_SOCKET_DIR = '/tmp/.X11-unix'  # noqa: S108
+
+
+def parse_resources(text: str) -> dict[str, str]:
+    """Parses X resources in the `xrdb -query` format, one 'name:\tvalue' per line."""
+    res_kv = (line.split(':', 1) for line in text.split('\n'))
+    return {kv[0]: kv[1].strip() for kv in res_kv if len(kv) == 2}  # noqa: PLR2004
+
+
+def load_resources_file(path: str | Path) -> dict[str, str]:
+    """Loads X resources exported with `xrdb -query > file`."""
+    try:
+        return parse_resources(Path(path).read_text(encoding='utf-8'))
+    except OSError as err:
+        logger.warning('could not read X resources from %s: %s', path, err)
+        return {}
+
+
+def _stat_key(path: str | Path) -> list[int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_ino, st.st_mtime_ns]
+
+
+def _cache_key(display: str) -> dict[str, Any]:
+    """
+    What the cached resources depend on, checked without connecting to X11:
+    the display, its server socket (a restarted server has a new one) and
+    the resource files in $HOME.
+    """
+    host, _, number = display.rpartition(':')
+    server = None
+    if not host or host == 'unix':
+        server = _stat_key(Path(X11_SOCKET_DIR) / f'X{number.split(".")[0]}')
+    home = Path.home()
+    return {
+        'display': display,
+        'server': server,
+        'files': {name: _stat_key(home / name) for name in RESOURCE_FILES},
+    }
+
+
+def _cache_file() -> Path:
+    return cache_dir() / XRESOURCES_CACHE
+
+
+def _load_cache(key: dict[str, Any]) -> dict[str, str] | None:
+    try:
+        with _cache_file().open(encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get('key') != key:
+        return None
+    return data.get('resources')
+
+
+def _save_cache(key: dict[str, Any], resources: dict[str, str]) -> None:
+    cache_file = _cache_file()
+    tmp = cache_file.with_suffix(f'.{os.getpid()}.tmp')
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with tmp.open('w', encoding='utf-8') as f:
+            json.dump({'key': key, 'resources': resources}, f)
+        tmp.replace(cache_file)
+    except OSError as err:
+        logger.debug('could not write X resources cache: %s', err)
+
+
+def _query_resources() -> dict[str, str] | None:
+    """Reads the RESOURCE_MANAGER property of the root window, `None` if X11 is not reachable."""
+    # Xlib is imported here, importing this module must not connect to X11
+    try:
+        from Xlib.display import Display
+        from Xlib.error import DisplayConnectionError
+        from Xlib.error import DisplayNameError
+        from Xlib.Xatom import RESOURCE_MANAGER
+        from Xlib.Xatom import STRING
+    except ImportError:
+        logger.debug('python-xlib not installed, no colors loaded')
+        return None
+
+    try:
         logger.debug('loading colors from X11')
         res_prop = Display().screen().root.get_full_property(RESOURCE_MANAGER, STRING)
-        res_kv = (line.split(':', 1) for line in res_prop.value.decode().split('\n'))
-        return {kv[0]: kv[1].strip() for kv in res_kv if len(kv) == 2}  # noqa: PLR2004
-    logger.debug('no colors found in X11')
-    return {}
+    except (DisplayNameError, DisplayConnectionError):
+        logger.debug('no colors found in X11')
+        return None
+
+    if res_prop is None:
+        return {}
+    return parse_resources(res_prop.value.decode())
+
+
+@lru_cache
+def load_colors() -> dict[str, str]:
+    """
+    Returns the X resources, e.g. '*.color1'.
+
+    Read from the file named by `PYSELECTOR_XRESOURCES` if set, so
+    headless and Wayland sessions never open a display. Otherwise they are
+    read from X11 once and cached under `cache_dir()`, until the X server,
+    $DISPLAY or `~/.Xresources` changes. Call `clear_colors_cache` after
+    `xrdb -merge` without any of those changing.
+    """
+    path = os.environ.get(XRESOURCES_ENV)
+    if path:
+        return load_resources_file(path)
+
+    display = os.environ.get('DISPLAY')
+    if not display:
+        logger.debug('no DISPLAY, no colors loaded')
+        return {}
+
+    key = _cache_key(display)
+    resources = _load_cache(key)
+    if resources is not None:
+        return resources
+
+    resources = _query_resources()
+    if resources is None:
+        return {}
+    _save_cache(key, resources)
+    return resources
+
+
+def clear_colors_cache() -> None:
+    """Drops the cached X resources, in memory and on disk."""
+    with suppress(OSError):
+        _cache_file().unlink()
+    load_colors.cache_clear()
+    supported_colors.cache_clear()
+    sgr_table.cache_clear()
+
+
+def _parse_hex(value: str) -> tuple[int, int, int]:
+    digits = value[1:]
+    if len(digits) in (3, 4):
+        return tuple(int(c * 2, 16) for c in digits[:3])  # type: ignore[return-value]
+    if len(digits) in (6, 8):
+        return tuple(int(digits[i : i + 2], 16) for i in (0, 2, 4))  # type: ignore[return-value]
+    msg = f'invalid hex color: {value!r}'
+    raise ValueError(msg)
+
+
+def _parse_x11_rgb(value: str) -> tuple[int, int, int]:
+    # X11 'rgb:<red>/<green>/<blue>', each channel has 1 to 4 hex digits
+    channels = value[4:].split('/')
+    if len(channels) != 3 or not all(1 <= len(c) <= 4 for c in channels):  # noqa: PLR2004
+        msg = f'invalid X11 color: {value!r}'
+        raise ValueError(msg)
+    return tuple(round(int(c, 16) * 255 / (16 ** len(c) - 1)) for c in channels)  # type: ignore[return-value]
+
+
+def parse_color(color: str) -> tuple[int, int, int]:
+    """
+    Parses a color into a (red, green, blue) tuple.
+
+    Supports '#rgb', '#rrggbb' (with optional alpha), X11 'rgb:r/g/b' and
+    CSS/X11 color names. Other formats fallback to `PIL.ImageColor`.
+
+    Raises:
+        ValueError: If the color can not be parsed.
+    """
+    value = color.strip().lower()
+    with suppress(ValueError):
+        if value.startswith('#'):
+            return _parse_hex(value)
+        if value.startswith('rgb:'):
+            return _parse_x11_rgb(value)
+
+    name = value.replace(' ', '')
+    if name in NAMED_COLORS:
+        return _parse_hex(NAMED_COLORS[name])
+
+    try:
+        from PIL import ImageColor
+    except ImportError:
+        msg = f'unknown color: {color!r}'
+        raise ValueError(msg) from None
+    return ImageColor.getcolor(color, 'RGB')  # type: ignore[return-value]
 
 
 def rgb(color: str) -> str:
-    rgb_tuple = ImageColor.getcolor(color, 'RGB')
-    return ';'.join(str(value) for value in rgb_tuple)
+    return ';'.join(str(value) for value in parse_color(color))
 
 
 class Color:
@@ -111,23 +442,56 @@ class Color:
         return Color._colors().get('*.color15', default)
 
 
-SUPPORTED_COLORS = {
-    'foreground': rgb(Color.foreground()),
-    'background': rgb(Color.background()),
-    'black': rgb(Color.black()),
-    'grey': rgb(Color.grey()),
-    'red': rgb(Color.red()),
-    'dark_red': rgb(Color.dark_red()),
-    'green': rgb(Color.green()),
-    'dark_green': rgb(Color.dark_green()),
-    'yellow': rgb(Color.yellow()),
-    'dark_yellow': rgb(Color.dark_yellow()),
-    'blue': rgb(Color.blue()),
-    'dark_blue': rgb(Color.dark_blue()),
-    'magenta': rgb(Color.magenta()),
-    'dark_magenta': rgb(Color.dark_magenta()),
-    'cyan': rgb(Color.cyan()),
-    'dark_cyan': rgb(Color.dark_cyan()),
-    'light_grey': rgb(Color.light_grey()),
-    'white': rgb(Color.white()),
-}
+@lru_cache
+def supported_colors() -> dict[str, str]:
+    """
+    Returns the supported colors as 'r;g;b' strings.
+
+    Resolved on first access, it reads the X resources (if any).
+    """
+    return {
+        'foreground': rgb(Color.foreground()),
+        'background': rgb(Color.background()),
+        'black': rgb(Color.black()),
+        'grey': rgb(Color.grey()),
+        'red': rgb(Color.red()),
+        'dark_red': rgb(Color.dark_red()),
+        'green': rgb(Color.green()),
+        'dark_green': rgb(Color.dark_green()),
+        'yellow': rgb(Color.yellow()),
+        'dark_yellow': rgb(Color.dark_yellow()),
+        'blue': rgb(Color.blue()),
+        'dark_blue': rgb(Color.dark_blue()),
+        'magenta': rgb(Color.magenta()),
+        'dark_magenta': rgb(Color.dark_magenta()),
+        'cyan': rgb(Color.cyan()),
+        'dark_cyan': rgb(Color.dark_cyan()),
+        'light_grey': rgb(Color.light_grey()),
+        'white': rgb(Color.white()),
+    }
+
+
+class SGR(NamedTuple):
+    """The ANSI escape sequences that set a color."""
+
+    foreground: str
+    background: str
+
+
+ANSI_RESET = '\033[0m'
+
+
+@lru_cache
+def sgr_table() -> dict[str, SGR]:
+    """Returns the SGR sequences of each supported color, built once."""
+    return {
+        name: SGR(f'\033[38;2;{value}m', f'\033[48;2;{value}m') for name, value in supported_colors().items()
+    }
+
+
+def __getattr__(name: str) -> Any:
+    # keeps `colors.SUPPORTED_COLORS` working, resolved on first access
+    if name == 'SUPPORTED_COLORS':
+        return supported_colors()
+    msg = f'module {__name__!r} has no attribute {name!r}'
+    raise AttributeError(msg)
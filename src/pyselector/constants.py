@@ -1,6 +1,8 @@
 # constants.py
 from __future__ import annotations
 
+import os
+from pathlib import Path
 from typing import NewType
 
 HOMEPAGE_ROFI = 'https://github.com/davatorium/rofi'
@@ -9,6 +11,7 @@ HOMEPAGE_FZF = 'https://github.com/junegunn/fzf'
 
 # icons
 BULLET = '\u2022'
+LINE_BREAK = '\u21b5'
 
 # others
 PROMPT = 'PySelector> '
@@ -16,3 +19,9 @@ PROMPT = 'PySelector> '
 # return codes
 UserConfirms = NewType('UserConfirms', int)
 UserCancel = NewType('UserCancel', int)
+
+
+def cache_dir() -> Path:
+    """Returns the pyselector cache directory, `$XDG_CACHE_HOME/pyselector`."""
+    xdg_cache = os.environ.get('XDG_CACHE_HOME') or str(Path.home() / '.cache')
+    return Path(xdg_cache) / 'pyselector'
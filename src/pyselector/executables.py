@@ -0,0 +1,161 @@
+# executables.py
+#
+# A cached index of the executables in $PATH, similar to `dmenu_path`.
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+import threading
+from typing import TYPE_CHECKING
+
+from pyselector.constants import cache_dir
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+CACHE_NAME = 'executables.json'
+
+
+def _path_dirs(path: str) -> list[str]:
+    dirs: list[str] = []
+    for d in path.split(os.pathsep):
+        if d and d not in dirs:
+            dirs.append(d)
+    return dirs
+
+
+def _mtimes(dirs: list[str]) -> dict[str, int]:
+    mtimes: dict[str, int] = {}
+    for d in dirs:
+        try:
+            mtimes[d] = os.stat(d).st_mtime_ns
+        except OSError:
+            mtimes[d] = -1
+    return mtimes
+
+
+def _scan(dirs: list[str]) -> dict[str, str]:
+    """Maps each executable name to its path, the first directory in $PATH wins."""
+    found: dict[str, str] = {}
+    for d in dirs:
+        try:
+            entries = list(os.scandir(d))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.name in found:
+                continue
+            try:
+                if entry.is_file() and os.access(entry.path, os.X_OK):
+                    found[entry.name] = entry.path
+            except OSError:
+                continue
+    return found
+
+
+class ExecutableIndex:
+    """
+    An index of the executables found in $PATH, persisted to disk.
+
+    The index is rebuilt only when $PATH or the modification time of
+    one of its directories changes.
+
+    Attributes:
+        cache_file (Path | None): Where the index is stored, `None` disables persistence.
+    """
+
+    def __init__(self, path: str | None = None, cache_file: Path | None = None) -> None:
+        self._path = path
+        self.cache_file = cache_file
+        self._lock = threading.Lock()
+        self._key: tuple[str, dict[str, int]] | None = None
+        self._executables: dict[str, str] = {}
+
+    @property
+    def path(self) -> str:
+        if self._path is not None:
+            return self._path
+        return os.environ.get('PATH', os.defpath)
+
+    def _load(self, path: str, mtimes: dict[str, int]) -> dict[str, str] | None:
+        if self.cache_file is None:
+            return None
+        try:
+            with self.cache_file.open(encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('path') != path or data.get('mtimes') != mtimes:
+            return None
+        return data.get('executables')
+
+    def _save(self, path: str, mtimes: dict[str, int], executables: dict[str, str]) -> None:
+        if self.cache_file is None:
+            return
+        data = {'path': path, 'mtimes': mtimes, 'executables': executables}
+        tmp = self.cache_file.with_suffix(f'.{os.getpid()}.tmp')
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with tmp.open('w', encoding='utf-8') as f:
+                json.dump(data, f)
+            tmp.replace(self.cache_file)
+        except OSError as err:
+            logger.debug('could not write executables cache: %s', err)
+
+    def executables(self) -> dict[str, str]:
+        """Returns a mapping of executable name to its full path."""
+        path = self.path
+        dirs = _path_dirs(path)
+        mtimes = _mtimes(dirs)
+        with self._lock:
+            if self._key == (path, mtimes):
+                return self._executables
+
+            executables = self._load(path, mtimes)
+            if executables is None:
+                logger.debug('scanning %s directories in $PATH', len(dirs))
+                executables = _scan(dirs)
+                self._save(path, mtimes, executables)
+
+            self._key = (path, mtimes)
+            self._executables = executables
+            return executables
+
+    def names(self) -> list[str]:
+        """Returns the sorted executable names, an item source for launcher menus."""
+        return sorted(self.executables())
+
+    def which(self, name: str) -> str | None:
+        """Like `shutil.which`, resolved from the index."""
+        if os.sep in name:
+            return shutil.which(name)
+        command = self.executables().get(name)
+        if command is None:
+            # the index could be stale within the mtime resolution
+            command = shutil.which(name, path=self.path)
+        return command
+
+
+_default_index: ExecutableIndex | None = None
+
+
+def default_index() -> ExecutableIndex:
+    """Returns the shared index for the current $PATH, stored under `cache_dir()`."""
+    global _default_index  # noqa: PLW0603
+    if _default_index is None:
+        _default_index = ExecutableIndex(cache_file=cache_dir() / CACHE_NAME)
+    return _default_index
+
+
+def which(name: str) -> str | None:
+    return default_index().which(name)
+
+
+def executables() -> list[str]:
+    """Returns the sorted names of the executables in $PATH."""
+    return default_index().names()
@@ -2,23 +2,250 @@
 from __future__ import annotations
 
 import logging
+import threading
+from array import array
+from collections import OrderedDict
 from typing import Any
 from typing import Callable
+from typing import Iterable
+from typing import Iterator
+from typing import Sequence
 from typing import TypeVar
 
+from pyselector import helpers
+
 logger = logging.getLogger(__name__)
 
 T = TypeVar('T')
 
+LABEL_INDEX_CACHE_SIZE = 4
+
+
+class ExtractIndex:
+    """
+    Maps the strings shown in the menu back to the indices of their items.
+
+    Built once per item set, each lookup is O(1). Items with the same
+    string are returned in order for repeated selections, and each line
+    of a multi-line string maps to its item.
+
+    Args:
+        items (Sequence[Any]): The items shown in the menu.
+        preprocessor (Callable[..., Any], optional): Converts an item to its string. Defaults to `str`.
+        strip_ansi (bool, optional): Indexes the strings without their ANSI color codes, as `fzf --ansi` prints them.
+    """
+
+    def __init__(
+        self,
+        items: Sequence[Any],
+        preprocessor: Callable[..., Any] | None = None,
+        strip_ansi: bool = False,
+    ) -> None:
+        self.items = items
+        self.size = len(items)
+        self.preprocessor = preprocessor
+        render: Callable[..., Any] = preprocessor or str
+        texts = [render(item) for item in items]
+        if strip_ansi:
+            texts = helpers.remove_ansi_codes_all(texts)
+        labels = _unique_labels(texts)
+        self._labels = labels if labels is not None else _labels(texts)
+
+    def lookup(self, label: str) -> list[int]:
+        """Returns the indices of all the items with the given string."""
+        found = self._labels.get(label)
+        if found is None:
+            return []
+        return [found] if isinstance(found, int) else list(found)
+
+    def index(self, selected: str) -> int:
+        """Returns the index of the selected string, -1 if not found."""
+        found = self._labels.get(selected.strip())
+        if found is None:
+            return -1
+        return found if isinstance(found, int) else found[0]
+
+    def item(self, selected: str) -> Any:
+        """Returns the selected item, `None` if not found."""
+        idx = self.index(selected)
+        return None if idx == -1 else self.items[idx]
+
+    def _iter_indices(self, selected: str | Iterable[str]) -> Iterator[int]:
+        lines = selected.split('\n') if isinstance(selected, str) else selected
+        used: dict[str, int] = {}
+        seen: set[int] = set()
+        for line in lines:
+            found = self._labels.get(line) if line else None
+            if found is None:
+                continue
+            if isinstance(found, int):
+                idx = found
+            else:
+                n = used.get(line, 0)
+                used[line] = n + 1
+                idx = found[min(n, len(found) - 1)]
+            if idx not in seen:
+                seen.add(idx)
+                yield idx
+
+    def indices(self, selected: str | Iterable[str]) -> list[int]:
+        """Returns the indices of the selected strings, one per line."""
+        return list(self._iter_indices(selected))
+
+    def indices_array(self, selected: str | Iterable[str]) -> array[int]:
+        """Like `indices`, as a compact array for large selections."""
+        return array('q', self._iter_indices(selected))
+
+    def select(self, selected: str | Iterable[str]) -> list[Any]:
+        """Returns the selected items, one per line."""
+        items = self.items
+        return [items[idx] for idx in self._iter_indices(selected)]
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+
+def _unique_labels(texts: list[str]) -> dict[str, int | list[int]] | None:
+    """Indexes single-line, unique texts without a loop in python, `None` otherwise."""
+    if any('\n' in text for text in texts):
+        return None
+    # reversed, so the first index of a text is the one kept
+    labels: dict[str, int | list[int]] = dict(zip(reversed(texts), range(len(texts) - 1, -1, -1)))
+    empty = texts.count('')
+    labels.pop('', None)
+    if len(labels) != len(texts) - empty:
+        return None
+    return labels
+
+
+def _labels(texts: list[str]) -> dict[str, int | list[int]]:
+    # a single index per label, a list only for duplicated labels
+    labels: dict[str, int | list[int]] = {}
+    for idx, text in enumerate(texts):
+        for line in text.split('\n') if '\n' in text else (text,):
+            if not line:
+                continue
+            found = labels.get(line)
+            if found is None:
+                labels[line] = idx
+            elif isinstance(found, int):
+                if found != idx:
+                    labels[line] = [found, idx]
+            elif found[-1] != idx:
+                found.append(idx)
+    return labels
+
+
+class LabelIndexCache:
+    """
+    Keeps the `ExtractIndex` of the last item sequences shown by a menu.
+
+    An index is reused while the same sequence (of the same length) is
+    passed with the same preprocessor. A sequence changed in place is
+    noticed on lookup: if the item found is not shown as the selected
+    string, or nothing is found, the index is built again.
+    """
+
+    def __init__(self, maxsize: int = LABEL_INDEX_CACHE_SIZE) -> None:
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._cache: OrderedDict[tuple[int, int, bool], ExtractIndex] = OrderedDict()
+
+    def get(
+        self,
+        items: Sequence[Any],
+        preprocessor: Callable[..., Any] | None = None,
+        strip_ansi: bool = False,
+    ) -> ExtractIndex:
+        """Returns the index of the items, built on first use."""
+        key = (id(items), id(preprocessor), strip_ansi)
+        with self._lock:
+            index = self._cache.get(key)
+            # the index holds the items and preprocessor, so their ids are not reused while cached
+            if (
+                index is not None
+                and index.items is items
+                and index.preprocessor is preprocessor
+                and index.size == len(items)
+            ):
+                self._cache.move_to_end(key)
+                return index
+        return self._build(key, items, preprocessor, strip_ansi)
+
+    def _build(
+        self,
+        key: tuple[int, int, bool],
+        items: Sequence[Any],
+        preprocessor: Callable[..., Any] | None,
+        strip_ansi: bool,
+    ) -> ExtractIndex:
+        index = ExtractIndex(items, preprocessor, strip_ansi)
+        with self._lock:
+            self._cache[key] = index
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return index
+
+    def index(
+        self,
+        items: Sequence[Any],
+        selected: str,
+        preprocessor: Callable[..., Any] | None = None,
+        strip_ansi: bool = False,
+    ) -> int:
+        """Returns the index of the selected string, -1 if not found."""
+        label = selected.strip()
+        idx = self.get(items, preprocessor, strip_ansi).index(label)
+        if idx != -1 and _shows(items[idx], label, preprocessor, strip_ansi):
+            return idx
+        logger.debug('items changed since they were indexed, indexing them again')
+        key = (id(items), id(preprocessor), strip_ansi)
+        return self._build(key, items, preprocessor, strip_ansi).index(label)
+
+    def item(
+        self,
+        items: Sequence[Any],
+        selected: str,
+        preprocessor: Callable[..., Any] | None = None,
+        strip_ansi: bool = False,
+    ) -> Any:
+        """Returns the selected item, `None` if not found."""
+        idx = self.index(items, selected, preprocessor, strip_ansi)
+        return None if idx == -1 else items[idx]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+def _shows(item: Any, label: str, preprocessor: Callable[..., Any] | None, strip_ansi: bool) -> bool:
+    """Whether the item is still shown with the given label."""
+    text = (preprocessor or str)(item)
+    if strip_ansi:
+        text = helpers.remove_ansi_codes(text)
+    return label in text.split('\n')
+
 
 def get_items_strings(
     items: list[Any],
     preprocessor: Callable[..., Any] | None = None,
+    separator: str = '\n',
 ) -> list[str]:
+    """
+    Returns the strings of the items, each line of a multi-line string on
+    its own. With another `separator` (e.g. NUL) a string is one item
+    however many lines it spans.
+    """
     if not items:
         return []
-    preprocessor = preprocessor or str
-    return list(filter(None, '\n'.join(map(preprocessor, items)).split('\n')))
+    render: Callable[..., Any] = preprocessor or str
+    if separator != '\n':
+        return list(filter(None, map(render, items)))
+    return list(filter(None, '\n'.join(map(render, items)).split('\n')))
 
 
 def item(
@@ -40,15 +267,10 @@ def item(
         logger.debug('items and selected are empty')
         return None
 
-    selected = selected.strip()
-
-    try:
-        items_str = get_items_strings(items, preprocessor)
-        idx = items_str.index(selected)
-        return items[idx]
-    except ValueError as err:
-        logger.debug(f'{err}. returning items={selected}')
-    return None
+    result = ExtractIndex(items, preprocessor).item(selected)
+    if result is None:
+        logger.debug(f'{selected!r} not found. returning None')
+    return result
 
 
 def index(
@@ -69,14 +291,10 @@ def index(
     if not selected and not items:
         return -1
 
-    selected = selected.strip()
-
-    try:
-        items = get_items_strings(items, preprocessor)
-        return items.index(selected)
-    except ValueError as err:
-        logger.warning(f'{err}. Returning -1')
-    return -1
+    idx = ExtractIndex(items, preprocessor).index(selected)
+    if idx == -1:
+        logger.warning(f'{selected!r} not found. Returning -1')
+    return idx
 
 
 def items(
@@ -121,22 +339,11 @@ def parse_multiple_items(
     index: bool = False,
     preprocessor: Callable[..., Any] | None = None,
 ):
-    result: list[Any] = []
     if not items and not selected:
         logger.debug('items and selected are empty')
-        return result
+        return []
 
-    try:
-        items_str = get_items_strings(items, preprocessor)
-        selected_clean = [item for item in selected.split('\n') if item]
-        for selection in selected_clean:
-            if selection not in items_str:
-                continue
-            idx = items_str.index(selection)
-            if index:
-                result.append(idx)
-            else:
-                result.append(items[idx])
-    except ValueError as err:
-        logger.warning(f'{err}. Returning items={selected}')
-    return result
+    extract_index = ExtractIndex(items, preprocessor)
+    if index:
+        return extract_index.indices(selected)
+    return extract_index.select(selected)
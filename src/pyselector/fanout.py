@@ -0,0 +1,188 @@
+# fanout.py
+#
+# Shows the same prompt on several X displays at once, e.g. one per
+# operator screen, and returns the answer of whoever picks first. The
+# menus still open on the other screens are killed.
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import Callable
+from typing import Iterable
+from typing import NamedTuple
+from typing import Sequence
+from typing import TypeVar
+
+from pyselector import helpers
+from pyselector import spawn
+from pyselector import tracing
+from pyselector.constants import UserCancel
+from pyselector.selector import Menu
+
+if TYPE_CHECKING:
+    from pyselector.interfaces import MenuInterface
+    from pyselector.interfaces import PromptReturn
+
+log = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class Target(NamedTuple):
+    """
+    A menu and the environment it is started with.
+
+    Attributes:
+        menu    (MenuInterface): The menu to show the prompt with.
+        env     (dict[str, str]): Added to the environment of the menu process, e.g. `{'DISPLAY': ':1'}`.
+    """
+
+    menu: MenuInterface
+    env: dict[str, str]
+
+
+def displays(name: str, names: Iterable[str]) -> list[Target]:
+    """Returns a target for each X display, each with its own menu `name`, e.g. `displays('rofi', [':0', ':1'])`."""
+    return [Target(Menu.get(name), {'DISPLAY': display}) for display in names]
+
+
+def render(
+    items: Sequence[T],
+    preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+) -> helpers.LineBuffer:
+    """Renders the items once into a buffer every target's menu is fed from, one item per line."""
+    encoding = sys.getdefaultencoding()
+    flatten = helpers.single_line(preprocessor)
+    with tracing.span('preprocess', items=len(items)):
+        data = b''.join(flatten(item).encode(encoding) + b'\n' for item in items)
+    return helpers.LineBuffer(data)
+
+
+class FanOut:
+    """
+    Runs a prompt on several targets concurrently, the first accepted
+    answer wins.
+
+    A target that is cancelled, or whose menu could not start, does not
+    end the prompt while others are still open. Once an answer is
+    accepted the remaining menu processes are killed; if every target
+    cancels, the prompt is cancelled, and if every target failed the
+    first error is raised. The items are rendered once, every
+    menu is fed the same buffer. `winner` is the target that answered.
+
+    Usage:
+        operators = FanOut(fanout.displays('rofi', [':0', ':1', ':2']))
+        host, code = operators.select(hosts, prompt='deploy to> ')
+        if operators.confirm(f'deploy to {host}?'):
+            ...
+    """
+
+    def __init__(self, targets: Sequence[Target]) -> None:
+        if not targets:
+            msg = 'no targets to fan out to'
+            raise ValueError(msg)
+        self.targets = targets
+        self.winner: Target | None = None
+
+    async def _ask(self, target: Target, lines: helpers.LineBuffer, **kwargs) -> tuple[Any, int]:
+        with spawn.environment(**target.env):
+            return await target.menu.aselect_index(lines, **kwargs)
+
+    @tracing.traced('fanout')
+    async def aselect_index(
+        self,
+        items: Sequence[T],
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        **kwargs,
+    ) -> tuple[int | list[int] | None, int]:
+        """Like a menu's `aselect_index`, answered by the first target."""
+        self.winner = None
+        lines = render(items, preprocessor)
+        # each task runs in a copy of the current context, with its own environment
+        tasks = {asyncio.ensure_future(self._ask(target, lines, **kwargs)): target for target in self.targets}
+        result: tuple[int | list[int] | None, int] = (None, UserCancel(1))
+        errors: list[BaseException] = []
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    error = task.exception()
+                    if error is not None:
+                        log.debug('target %s failed: %s', tasks[task].env, error)
+                        errors.append(error)
+                        continue
+                    selected, code = task.result()
+                    if code == UserCancel(1) or selected is None or selected == []:
+                        log.debug('target %s cancelled', tasks[task].env)
+                        continue
+                    if self.winner is None:
+                        self.winner = tasks[task]
+                        result = (selected, code)
+                if self.winner is not None:
+                    break
+        finally:
+            # kills the menus still open
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        if self.winner is None and len(errors) == len(self.targets):
+            raise errors[0]
+        if self.winner is not None:
+            log.debug('answered by %s', self.winner.env)
+        return result
+
+    async def aselect(
+        self,
+        items: Sequence[T],
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        **kwargs,
+    ) -> PromptReturn:
+        """Like a menu's `aselect`, answered by the first target."""
+        selected, code = await self.aselect_index(items, preprocessor, **kwargs)
+        if isinstance(selected, list):
+            return [items[i] for i in selected], code
+        if selected is None:
+            return None, code
+        return items[selected], code
+
+    async def aconfirm(
+        self,
+        question: str,
+        options: Sequence[str] = ('Yes', 'No'),
+        confirm_opts: Sequence[str] = ('Yes'),
+        **kwargs,
+    ) -> bool:
+        selected, _ = await self.aselect(options, prompt=question, **kwargs)
+        if not selected:
+            return False
+        return selected in confirm_opts
+
+    def select_index(
+        self,
+        items: Sequence[T],
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        **kwargs,
+    ) -> tuple[int | list[int] | None, int]:
+        return asyncio.run(self.aselect_index(items, preprocessor, **kwargs))
+
+    def select(
+        self,
+        items: Sequence[T],
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        **kwargs,
+    ) -> PromptReturn:
+        return asyncio.run(self.aselect(items, preprocessor, **kwargs))
+
+    def confirm(
+        self,
+        question: str,
+        options: Sequence[str] = ('Yes', 'No'),
+        confirm_opts: Sequence[str] = ('Yes'),
+        **kwargs,
+    ) -> bool:
+        return asyncio.run(self.aconfirm(question, options, confirm_opts, **kwargs))
@@ -0,0 +1,258 @@
+# frecency.py
+#
+# Ranks items by how often and how recently they were picked, across
+# runs, from a small SQLite file in the pyselector cache directory.
+#
+# A pick adds 1 to the score of its item, and every score halves each
+# `half_life` seconds. Scores are stored as their logarithm scaled to a
+# fixed epoch, `log(sum(2 ** (t_pick / half_life)))`, so decay needs no
+# writes and the order of the stored values is the order of the
+# current scores: the top k are read from an index in O(k log n).
+
+from __future__ import annotations
+
+import logging
+import math
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+from typing import Callable
+from typing import Sequence
+
+from pyselector import helpers
+from pyselector.constants import cache_dir
+
+log = logging.getLogger(__name__)
+
+FRECENCY_DB = 'frecency.sqlite3'
+HALF_LIFE = 7 * 24 * 60 * 60
+# items whose score decayed below this are removed
+MIN_SCORE = 0.01
+RANK_LIMIT = 1_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS frecency (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    weight REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS frecency_weight ON frecency (namespace, weight);
+CREATE TABLE IF NOT EXISTS last_pick (
+    namespace TEXT PRIMARY KEY,
+    key TEXT NOT NULL
+);
+"""
+
+
+def _logaddexp(a: float, b: float) -> float:
+    high, low = (a, b) if a > b else (b, a)
+    return high + math.log1p(math.exp(low - high))
+
+
+class FrecencyStore:
+    """
+    A persistent frecency score per item key.
+
+    Keys are strings, by default the line an item is shown as. Stores
+    sharing a file are kept apart by `namespace`.
+
+    Usage:
+        store = FrecencyStore(namespace='projects')
+        project, _ = menu.select(projects, rank=store)
+
+        # or, with the default store
+        project, _ = menu.select(projects, rank='frecency')
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        namespace: str = '',
+        half_life: float = HALF_LIFE,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = Path(path) if path is not None else cache_dir() / FRECENCY_DB
+        self.namespace = namespace
+        self.half_life = half_life
+        self.clock = clock
+        self._rate = math.log(2) / half_life
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=5, check_same_thread=False)
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _now_weight(self) -> float:
+        """Returns the stored weight of a score of 1 now."""
+        return self.clock() * self._rate
+
+    def record(self, keys: Sequence[str]) -> None:
+        """Adds a pick to each key and removes the keys that decayed away."""
+        if not keys:
+            return
+        weight = self._now_weight()
+        with self._lock, self.conn as conn:
+            for key in dict.fromkeys(keys):
+                row = conn.execute(
+                    'SELECT weight FROM frecency WHERE namespace = ? AND key = ?', (self.namespace, key)
+                ).fetchone()
+                new = weight if row is None else _logaddexp(row[0], weight)
+                conn.execute(
+                    'INSERT OR REPLACE INTO frecency (namespace, key, weight) VALUES (?, ?, ?)',
+                    (self.namespace, key, new),
+                )
+            conn.execute('INSERT OR REPLACE INTO last_pick (namespace, key) VALUES (?, ?)', (self.namespace, keys[-1]))
+            conn.execute(
+                'DELETE FROM frecency WHERE namespace = ? AND weight < ?',
+                (self.namespace, weight + math.log(MIN_SCORE)),
+            )
+        log.debug('recorded %s picks in %s', len(keys), self.path)
+
+    def score(self, key: str) -> float:
+        """Returns the current score of the key, 0 if never picked."""
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT weight FROM frecency WHERE namespace = ? AND key = ?', (self.namespace, key)
+            ).fetchone()
+        return 0.0 if row is None else math.exp(row[0] - self._now_weight())
+
+    def top(self, k: int = RANK_LIMIT) -> list[str]:
+        """Returns the `k` keys with the highest score, highest first."""
+        with self._lock:
+            rows = self.conn.execute(
+                'SELECT key FROM frecency WHERE namespace = ? ORDER BY weight DESC LIMIT ?', (self.namespace, k)
+            ).fetchall()
+        return [key for (key,) in rows]
+
+    def last(self) -> str | None:
+        """Returns the key picked last."""
+        with self._lock:
+            row = self.conn.execute('SELECT key FROM last_pick WHERE namespace = ?', (self.namespace,)).fetchone()
+        return None if row is None else row[0]
+
+    def clear(self) -> None:
+        with self._lock, self.conn as conn:
+            conn.execute('DELETE FROM frecency WHERE namespace = ?', (self.namespace,))
+            conn.execute('DELETE FROM last_pick WHERE namespace = ?', (self.namespace,))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __enter__(self) -> FrecencyStore:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+_default_store: FrecencyStore | None = None
+
+
+def default_store() -> FrecencyStore:
+    """Returns the store used by `rank='frecency'`."""
+    global _default_store  # noqa: PLW0603
+    if _default_store is None:
+        _default_store = FrecencyStore()
+    return _default_store
+
+
+class Ranking:
+    """
+    Items reordered by a `FrecencyStore` for one menu call.
+
+    The `RANK_LIMIT` best scored items come first, the rest keep their
+    order. `selected` is the position of the last pick, moved to the top
+    with `last_first` for menus that cannot preselect a row.
+    """
+
+    def __init__(
+        self,
+        store: FrecencyStore,
+        items: Sequence[Any],
+        preprocessor: Callable[..., Any],
+        last_first: bool = False,
+    ) -> None:
+        self.store = store
+        self.keys = [str(preprocessor(item)) for item in items]
+        positions: dict[str, int] = {}
+        for i, key in enumerate(self.keys):
+            positions.setdefault(key, i)
+
+        ranked = [positions[key] for key in store.top() if key in positions]
+        last = store.last()
+        if last_first and last in positions:
+            # it may be past `RANK_LIMIT`
+            if positions[last] in ranked:
+                ranked.remove(positions[last])
+            ranked.insert(0, positions[last])
+        ranked_set = set(ranked)
+        self.order = ranked + [i for i in range(len(self.keys)) if i not in ranked_set]
+        self.items = [items[i] for i in self.order]
+        self.selected = self.order.index(positions[last]) if last in positions else None
+
+    def row(self, index: int) -> int:
+        """Returns the position in `items` of the item at `index` in the original items."""
+        return self.order.index(index) if 0 <= index < len(self.order) else index
+
+    def finish(self, indices: list[int], code: int) -> list[int]:
+        """Maps the indices picked from `items` back to the original ones, recording accepted picks."""
+        restored = [self.order[i] if 0 <= i < len(self.order) else i for i in indices]
+        if code == 0:
+            self.store.record([self.keys[i] for i in restored if 0 <= i < len(self.keys)])
+        return restored
+
+
+def _store(rank: Any) -> FrecencyStore | None:
+    if rank is None:
+        return None
+    if isinstance(rank, FrecencyStore):
+        return rank
+    if rank == 'frecency':
+        return default_store()
+    msg = f'unknown rank: {rank!r}'
+    raise ValueError(msg)
+
+
+def pop_ranking(
+    kwargs: dict[str, Any],
+    items: Sequence[Any] | helpers.ItemStream,
+    preprocessor: Callable[..., Any],
+    last_first: bool = False,
+) -> Ranking | None:
+    """
+    Returns the ranking asked for with the `rank` kwarg, `'frecency'` or a
+    `FrecencyStore`, if any. A stream is read whole to be ranked.
+    """
+    store = _store(kwargs.pop('rank', None))
+    if store is None:
+        return None
+    if isinstance(items, helpers.ItemStream):
+        items = list(items)
+    return Ranking(store, items, preprocessor, last_first)
+
+
+async def apop_ranking(
+    kwargs: dict[str, Any],
+    items: Sequence[Any] | helpers.ItemStream,
+    preprocessor: Callable[..., Any],
+    last_first: bool = False,
+) -> Ranking | None:
+    """Like `pop_ranking`, reading a stream from the running event loop."""
+    store = _store(kwargs.pop('rank', None))
+    if store is None:
+        return None
+    if isinstance(items, helpers.ItemStream):
+        items = [item async for item in items]
+    return Ranking(store, items, preprocessor, last_first)
@@ -2,19 +2,33 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import os
 import re
-import shutil
-import subprocess
+import sys
+import threading
+import time
 import warnings
+from array import array
+from bisect import bisect_right
+from contextlib import suppress
 from functools import wraps
+from itertools import accumulate
 from typing import IO
 from typing import Any
+from typing import AsyncIterable
+from typing import AsyncIterator
 from typing import Callable
 from typing import Iterable
+from typing import Iterator
 from typing import Sequence
 from typing import TypeVar
 
+from pyselector import constants
+from pyselector import executables
+from pyselector import spawn
+from pyselector import tracing
 from pyselector.constants import UserCancel
 from pyselector.exc import ExecutableNotFoundError
 
@@ -22,52 +36,775 @@ logger = logging.getLogger(__name__)
 
 T = TypeVar('T')
 
+# streamed items are written to the menu in chunks of this size, or sooner
+# if the producer is slow and the interval elapsed since the last write.
+STREAM_CHUNK_SIZE = 64 * 1024
+STREAM_FLUSH_INTERVAL = 0.05
+
+# items that are written to the menu as they are, without encoding
+BUFFER_TYPES = (bytes, bytearray, memoryview)
+
+try:
+    IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = 1024
+
+# byte string items at least this long (on average) are gathered with
+# `os.writev` instead of being joined, below it the copy is cheaper than
+# a buffer per item
+WRITEV_MIN_ITEM_SIZE = 4096
+
+# line offsets are indexed a chunk at a time, bounding the bytes copied
+INDEX_CHUNK_SIZE = 16 * 1024 * 1024
+
+_NEWLINE = b'\n'
+# items separated by NUL may span several lines
+NUL = '\0'
+_LINE_BREAK = re.compile(rb'[\r\n]')
+_LINE_BREAKS = re.compile(r'\r\n|[\r\n]')
+_ANSI_CODES = re.compile(r'\x1b\[[0-9;]*m')
+
+
+def default_preprocessor(item: Any) -> str:
+    """
+    The preprocessor used when none is given, `str` items are written
+    without calling it and byte strings are decoded.
+    """
+    if isinstance(item, str):
+        return item
+    if isinstance(item, BUFFER_TYPES):
+        return bytes(item).decode(sys.getdefaultencoding())
+    return str(item)
+
 
 def check_command(name: str, reference: str) -> str:
-    command = shutil.which(name)
+    with tracing.span('check_command', command=name):
+        command = executables.which(name)
     if not command:
         msg = f"command '{name}' not found in $PATH ({reference})"
         raise ExecutableNotFoundError(msg)
     return command
 
 
-def check_type(items: Sequence[T]) -> None:
+def check_type(items: Iterable[T] | AsyncIterable[T]) -> None:
     items_type = type(items).__name__
-    if not isinstance(items, (tuple, list)):
-        msg = f'items must be a tuple or list, got a {items_type}.'
+    if isinstance(items, (str, bytes)):
+        msg = f'items must be an iterable of items, got a {items_type}.'
+        raise ValueError(msg)
+    if not isinstance(items, (Iterable, AsyncIterable)):
+        msg = f'items must be an iterable or async iterable, got a {items_type}.'
+        raise ValueError(msg)
+
+
+class ItemStream:
+    """
+    Wraps an iterable or async iterable of items that is consumed lazily
+    while it is written to the menu.
+
+    The items already sent to the menu are kept in `consumed`, so an
+    index returned by the menu can be mapped back to its item. An item
+    spanning several lines stops the stream, its error is kept in `error`.
+    """
+
+    def __init__(self, items: Iterable[Any] | AsyncIterable[Any]) -> None:
+        self.items = items
+        self.consumed: list[Any] = []
+        self.error: ValueError | None = None
+        self._cancelled = threading.Event()
+        self._source: Iterator[Any] | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        """Stops the stream, the producer is closed before its next item is written."""
+        self._cancelled.set()
+
+    def _iter_async(self) -> Iterator[Any]:
+        aiterator = self.items.__aiter__()  # type: ignore[union-attr]
+        self._loop = asyncio.new_event_loop()
+        try:
+            while True:
+                try:
+                    yield self._loop.run_until_complete(aiterator.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            if hasattr(aiterator, 'aclose'):
+                self._loop.run_until_complete(aiterator.aclose())
+            self._loop.close()
+
+    def __iter__(self) -> Iterator[Any]:
+        if isinstance(self.items, AsyncIterable):
+            self._source = self._iter_async()
+        else:
+            self._source = iter(self.items)
+
+        for item in self._source:
+            self.consumed.append(item)
+            yield item
+            if self.cancelled:
+                logger.debug('stream cancelled after %s items', len(self.consumed))
+                break
+        self.close()
+
+    async def __aiter__(self) -> AsyncIterator[Any]:
+        """Iterates the stream from a running event loop."""
+        if not isinstance(self.items, AsyncIterable):
+            try:
+                for item in self.__iter__():
+                    yield item
+            finally:
+                self.close()
+            return
+
+        source = self.items.__aiter__()
+        try:
+            async for item in source:
+                self.consumed.append(item)
+                yield item
+                if self.cancelled:
+                    logger.debug('stream cancelled after %s items', len(self.consumed))
+                    break
+        finally:
+            if hasattr(source, 'aclose'):
+                await source.aclose()
+
+    def close(self) -> None:
+        """Closes the producer, calling `generator.close()` if it has one."""
+        source, self._source = self._source, None
+        if source is not None and hasattr(source, 'close'):
+            source.close()
+
+    def __getitem__(self, idx: int) -> Any:
+        return self.consumed[idx]
+
+    def __len__(self) -> int:
+        return len(self.consumed)
+
+
+class LineBuffer(Sequence[bytes]):
+    """
+    A single preformatted buffer of newline separated lines, written to
+    the menu as it is.
+
+    The offset of each line is only indexed when an item is looked up,
+    e.g. to map the selection back.
+
+    Usage:
+        data = Path('~/.cache/files.txt').expanduser().read_bytes()
+        path, _ = menu.select(LineBuffer(data))
+    """
+
+    def __init__(self, data: bytes | bytearray | memoryview) -> None:
+        self.data = memoryview(data).cast('B')
+        self._offsets: array[int] | None = None
+
+    def _lines(self) -> list[bytes]:
+        raw = self.data.obj if isinstance(self.data.obj, bytes) and self.data.contiguous else self.data.tobytes()
+        if len(raw) != len(self.data):
+            raw = self.data.tobytes()
+        lines = raw.split(_NEWLINE)
+        if not lines[-1]:
+            lines.pop()
+        return lines
+
+    @property
+    def offsets(self) -> array[int]:
+        """The start of each line, followed by the end of the buffer."""
+        if self._offsets is None:
+            self._offsets = line_offsets(self.data)
+        return self._offsets
+
+    def source_file(self) -> IO[bytes] | None:
+        """A file holding exactly the buffer, the menu reads it as its stdin instead of a pipe."""
+        return None
+
+    def find(self, text: str | bytes, encoding: str = 'utf-8') -> int:
+        """
+        Returns the index of the first line equal to `text`, or -1.
+
+        Maps back the selection of menus that only print the selected
+        text, without splitting the buffer into lines.
+        """
+        needle = text.encode(encoding) if isinstance(text, str) else text
+        match = re.search(b'(?m)^' + re.escape(needle) + b'$', self.data)
+        if match is None:
+            return -1
+        idx = bisect_right(self.offsets, match.start()) - 1
+        return idx if idx < len(self) else -1
+
+    def line(self, idx: int) -> memoryview:
+        """Returns the line without its newline, as a view into the buffer."""
+        offsets = self.offsets
+        if idx < 0:
+            idx += len(offsets) - 1
+        if not 0 <= idx < len(offsets) - 1:
+            msg = 'line index out of range'
+            raise IndexError(msg)
+        start, end = offsets[idx], offsets[idx + 1]
+        if end > start and self.data[end - 1] == ord(_NEWLINE):
+            end -= 1
+        return self.data[start:end]
+
+    def buffers(self, index_delimiter: str | None = None, encoding: str = 'utf-8') -> list[bytes | memoryview]:
+        """Returns the buffers to write, each line is prefixed with its index if `index_delimiter` is set."""
+        if index_delimiter is None:
+            if self.data and self.data[-1] != ord(_NEWLINE):
+                return [self.data, _NEWLINE]
+            return [self.data]
+        sep = index_delimiter.encode(encoding)
+        return [b''.join(b'%d%b%b\n' % (idx, sep, line) for idx, line in enumerate(self._lines()))]
+
+    def __getitem__(self, idx: int) -> bytes:  # type: ignore[override]
+        return self.line(idx).tobytes()
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+
+def line_offsets(data: memoryview, chunk_size: int = INDEX_CHUNK_SIZE) -> array[int]:
+    """
+    Returns the offset of the start of each line in the buffer, followed
+    by the end of the buffer.
+    """
+    offsets = array('q', [0])
+    size = len(data)
+    pos = 0
+    while pos < size:
+        chunk = data[pos : pos + chunk_size].tobytes()
+        lines = chunk.split(_NEWLINE)
+        # the last part is the start of a line that continues in the next chunk
+        lines.pop()
+        # each line is followed by its newline
+        offsets.extend(map(pos.__add__, accumulate(map((1).__add__, map(len, lines)))))
+        pos += len(chunk)
+    if offsets[-1] != size:
+        offsets.append(size)
+    return offsets
+
+
+def _check_buffer(item: Any, separator: bytes = _NEWLINE) -> None:
+    if not isinstance(item, BUFFER_TYPES):
+        msg = f'element values must be all byte strings, not mixed with {type(item).__name__}: {item!r}'
         raise ValueError(msg)
-    if not isinstance(items, Sequence):
-        msg = f'items must be a sequence or indexable, got a {items_type}.'
+    if separator == _NEWLINE:
+        if _LINE_BREAK.search(item):
+            msg = f'element values must not contain CR/LF: {bytes(item)!r}'
+            raise ValueError(msg)
+    elif separator in item:
+        msg = f'element values must not contain the separator {separator!r}: {bytes(item)!r}'
         raise ValueError(msg)
 
 
+def _join_buffers(
+    items: Sequence[Any],
+    encoding: str,
+    index_delimiter: str | None,
+    trusted: bool,
+    separator: bytes = _NEWLINE,
+) -> bytes:
+    try:
+        if index_delimiter is None:
+            data = separator.join(items) + separator
+        else:
+            sep = index_delimiter.encode(encoding)
+            data = b''.join(b'%d%b%b%b' % (idx, sep, item, separator) for idx, item in enumerate(items))
+    except TypeError:
+        data = b''
+        trusted = False
+
+    # a separator inside an item shows up as an extra item
+    stray_cr = separator == _NEWLINE and b'\r' in data
+    if not trusted and (not data or data.count(separator) != len(items) or stray_cr):
+        for item in items:
+            _check_buffer(item, separator)
+    return data
+
+
+def encode_items(
+    items: Sequence[Any],
+    preprocessor: Callable[..., Any],
+    encoding: str,
+    index_delimiter: str | None = None,
+    trusted: bool = False,
+    separator: str = '\n',
+) -> list[bytes | memoryview]:
+    """
+    Returns the buffers to write to the menu's stdin, one line per item,
+    or items ended by `separator` (e.g. `NUL`).
+
+    Byte strings (with the default preprocessor) are not encoded. Large
+    ones, and a `LineBuffer`, are not copied either, the buffers
+    reference them. Unless `trusted`, the items are checked to be free
+    of line breaks, or of the separator if it is not a newline.
+    """
+    if isinstance(items, LineBuffer) and separator == '\n':
+        return items.buffers(index_delimiter, encoding)
+
+    sep = separator.encode(encoding)
+    default = preprocessor is default_preprocessor
+    if default and len(items) > 0 and isinstance(items[0], BUFFER_TYPES):
+        if index_delimiter is None and _average_size(items) >= WRITEV_MIN_ITEM_SIZE:
+            if not trusted:
+                for item in items:
+                    _check_buffer(item, sep)
+            return [buf for item in items for buf in (item, sep)]
+        return [_join_buffers(items, encoding, index_delimiter, trusted, sep)]
+
+    if default and index_delimiter is None:
+        try:
+            # a list of `str` is joined without a call per item
+            text = separator.join(items)
+        except TypeError:
+            text = separator.join(map(default_preprocessor, items))
+    else:
+        format_line = _format_line(preprocessor, index_delimiter)
+        text = separator.join(format_line(idx, item) for idx, item in enumerate(items))
+    if not trusted and not _single_lines(text, len(items), separator):
+        format_line = _format_line(preprocessor, index_delimiter)
+        for idx, item in enumerate(items):
+            _check_buffer(format_line(idx, item).encode(encoding), sep)
+    return [text.encode(encoding)]
+
+
+def _single_lines(text: str, count: int, separator: str) -> bool:
+    # a separator inside an item shows up as an extra item
+    if separator == '\n' and '\r' in text:
+        return False
+    return text.count(separator) == max(count - 1, 0)
+
+
+def _average_size(items: Sequence[Any]) -> float:
+    try:
+        return sum(map(len, items)) / len(items)
+    except TypeError:
+        return 0
+
+
+def write_buffers(fd: int, buffers: Sequence[bytes | memoryview]) -> int:
+    """
+    Writes the buffers to the file descriptor with `os.writev`, up to
+    `IOV_MAX` buffers per call.
+
+    Returns:
+        int: The number of bytes written.
+    """
+    if not hasattr(os, 'writev'):
+        return _write_all(fd, b''.join(buffers))
+
+    total = 0
+    for start in range(0, len(buffers), IOV_MAX):
+        batch = list(buffers[start : start + IOV_MAX])
+        while batch:
+            written = os.writev(fd, batch)
+            total += written
+            # a short write leaves the rest of the batch for the next call
+            done = 0
+            while done < len(batch) and written >= len(batch[done]):
+                written -= len(batch[done])
+                done += 1
+            batch = batch[done:]
+            if batch and written:
+                batch[0] = memoryview(batch[0])[written:]
+    return total
+
+
+def _write_all(fd: int, data: bytes | memoryview) -> int:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view) :]
+    return len(data)
+
+
+def _format_line(preprocessor: Callable[..., Any], index_delimiter: str | None) -> Callable[[int, Any], Any]:
+    if preprocessor is default_preprocessor:
+        if index_delimiter is None:
+            # byte strings are written as they are
+            return lambda _, item: item if isinstance(item, (str, bytes)) else default_preprocessor(item)
+        return lambda idx, item: f'{idx}{index_delimiter}{default_preprocessor(item)}'
+    if index_delimiter is None:
+        return lambda _, item: preprocessor(item)
+    return lambda idx, item: f'{idx}{index_delimiter}{preprocessor(item)}'
+
+
+def write_stream(
+    stdin: IO[bytes],
+    stream: ItemStream,
+    preprocessor: Callable[..., Any],
+    encoding: str,
+    index_delimiter: str | None = None,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    separator: str = '\n',
+) -> None:
+    """
+    Writes the items of the stream to the menu's stdin in bounded chunks.
+
+    Meant to run in a background thread, it stops (and closes the
+    producer) when the stream is cancelled or the menu closes its stdin.
+    """
+    format_line = _format_line(preprocessor, index_delimiter)
+    sep = separator.encode(encoding)
+    chunk: list[bytes] = []
+    size = 0
+    count = 0
+    total = 0
+    last_write = time.monotonic()
+    with tracing.span('write_stdin', stream=True) as attrs:
+        try:
+            for item in stream:
+                line = format_line(count, item)
+                if not isinstance(line, bytes):
+                    line = line.encode(encoding)
+                if _stray_separator(stream, line, sep):
+                    break
+                chunk.append(line + sep)
+                count += 1
+                size += len(line) + 1
+                now = time.monotonic()
+                if size >= chunk_size or now - last_write >= STREAM_FLUSH_INTERVAL:
+                    stdin.write(b''.join(chunk))
+                    stdin.flush()
+                    chunk.clear()
+                    total += size
+                    size = 0
+                    last_write = now
+            if chunk and not stream.cancelled:
+                stdin.write(b''.join(chunk))
+                total += size
+        except (BrokenPipeError, ValueError) as err:
+            logger.debug('menu closed before the stream ended: %s', err)
+            stream.cancel()
+            stream.close()
+        finally:
+            with suppress(OSError, ValueError):
+                stdin.close()
+            attrs.update(items=count, bytes=total)
+
+
+def _stray_separator(stream: ItemStream, line: bytes, separator: bytes) -> bool:
+    # the menu would show the item as several, and map its index to the wrong one
+    try:
+        _check_buffer(line, separator)
+    except ValueError as err:
+        stream.error = err
+        stream.cancel()
+        return True
+    return False
+
+
+def _run_stream(
+    args: list[str],
+    stream: ItemStream,
+    preprocessor: Callable[..., Any],
+    index_delimiter: str | None = None,
+    separator: str = '\n',
+) -> tuple[str, int]:
+    encoding = sys.getdefaultencoding()
+    with tracing.span('spawn', command=args[0]):
+        proc = spawn.spawn(args, stdin=spawn.PIPE, stdout=spawn.PIPE)
+
+    def write() -> None:
+        write_stream(proc.stdin, stream, preprocessor, encoding, index_delimiter, separator=separator)
+        if stream.error is not None:
+            with suppress(ProcessLookupError):
+                proc.kill()
+
+    # stdin belongs to the writer thread, it is closed when the stream ends
+    writer = threading.Thread(target=write, daemon=True)
+    writer.start()
+    try:
+        with tracing.span('wait'):
+            output = proc.stdout.read() if proc.stdout is not None else b''
+            return_code = proc.wait()
+    finally:
+        # the menu is closed, stop the producer
+        stream.cancel()
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        if proc.stdout is not None:
+            proc.stdout.close()
+    if stream.error is not None:
+        raise stream.error
+    return output.decode(encoding), return_code
+
+
+def _source_file(
+    items: Sequence[Any] | ItemStream,
+    index_delimiter: str | None,
+    separator: str = '\n',
+) -> IO[bytes] | None:
+    if isinstance(items, LineBuffer) and index_delimiter is None and separator == '\n':
+        return items.source_file()
+    return None
+
+
+def _run_file(args: list[str], source: IO[bytes]) -> tuple[str, int]:
+    """Runs the menu with the file as its stdin, its lines are not read by this process."""
+    encoding = sys.getdefaultencoding()
+    with tracing.span('spawn', command=args[0], source=getattr(source, 'name', None)):
+        proc = spawn.spawn(args, stdin=source, stdout=spawn.PIPE)
+    with proc:
+        assert proc.stdout is not None  # noqa: S101
+        with tracing.span('wait'):
+            output = proc.stdout.read()
+            return_code = proc.wait()
+    return output.decode(encoding), return_code
+
+
+def _run_sequence(
+    args: list[str],
+    items: Sequence[Any],
+    preprocessor: Callable[..., Any],
+    index_delimiter: str | None = None,
+    trusted: bool = False,
+    separator: str = '\n',
+) -> tuple[str, int]:
+    encoding = sys.getdefaultencoding()
+    with tracing.span('preprocess') as attrs:
+        buffers = encode_items(items, preprocessor, encoding, index_delimiter, trusted, separator)
+        if tracing.enabled():
+            attrs.update(items=len(items), bytes=sum(len(b) for b in buffers), buffers=len(buffers))
+
+    with tracing.span('spawn', command=args[0]):
+        proc = spawn.spawn(args, stdin=spawn.PIPE, stdout=spawn.PIPE)
+
+    with proc:
+        assert proc.stdin is not None  # noqa: S101
+        assert proc.stdout is not None  # noqa: S101
+        with tracing.span('write_stdin') as attrs:
+            try:
+                attrs['bytes'] = write_buffers(proc.stdin.fileno(), buffers)
+            except BrokenPipeError as err:
+                logger.debug('menu closed before all items were written: %s', err)
+            finally:
+                proc.stdin.close()
+        with tracing.span('wait'):
+            output = proc.stdout.read()
+            return_code = proc.wait()
+    return output.decode(encoding), return_code
+
+
 def run(
     args: list[str],
-    items: Sequence[T],
+    items: Sequence[T] | ItemStream,
     preprocessor: Callable[..., Any],
+    index_delimiter: str | None = None,
+    trusted: bool = False,
+    separator: str = '\n',
 ) -> tuple[str | None, int]:
+    """
+    Runs the menu with the given items and returns the selected text and
+    the return code.
+
+    If `index_delimiter` is set, each line is prefixed with the index of
+    its item followed by the delimiter. If `trusted`, byte string items
+    are not checked for line breaks. With `separator=NUL` items are ended
+    by NUL instead of a newline, so they may span several lines.
+    """
     logger.debug('executing: %s', args)
 
-    with subprocess.Popen(
-        args,
-        stdout=subprocess.PIPE,
-        stdin=subprocess.PIPE,
-        text=True,
-    ) as proc:
-        input_items = '\n'.join(map(preprocessor, items))
-        selected, _ = proc.communicate(input=input_items)
-        return_code = proc.wait()
+    source = _source_file(items, index_delimiter, separator)
+    if source is not None:
+        selected, return_code = _run_file(args, source)
+    elif isinstance(items, ItemStream):
+        selected, return_code = _run_stream(args, items, preprocessor, index_delimiter, separator)
+    else:
+        selected, return_code = _run_sequence(args, items, preprocessor, index_delimiter, trusted, separator)
 
     if not selected:
         return None, return_code
 
-    selected = selected.rstrip('\n')
+    selected = _strip_output(selected, separator)
     if return_code == UserCancel(1):
         return selected, return_code
 
     return selected, return_code
 
 
+def pop_separator(kwargs: dict[str, Any]) -> str:
+    """Pops the `nul` option of a menu call, returns the item separator it selects."""
+    return NUL if kwargs.pop('nul', False) else '\n'
+
+
+def single_line(preprocessor: Callable[..., Any]) -> Callable[[Any], str]:
+    """
+    Wraps the preprocessor so each item is shown on one line, for menus
+    that cannot read NUL separated items. Line breaks are shown as
+    `constants.LINE_BREAK`, the selection is still mapped to its item.
+    """
+
+    def flatten(item: Any) -> str:
+        text = preprocessor(item)
+        if not isinstance(text, str):
+            text = default_preprocessor(text)
+        if '\n' in text or '\r' in text:
+            text = _LINE_BREAKS.sub(constants.LINE_BREAK, text)
+        return text
+
+    return flatten
+
+
+def _strip_output(selected: str, separator: str) -> str:
+    # menus reading NUL separated items may still end their output with a newline
+    return selected.rstrip('\n' if separator == '\n' else '\n' + separator)
+
+
+async def _afeed(
+    stdin: asyncio.StreamWriter,
+    items: Sequence[Any] | ItemStream,
+    preprocessor: Callable[..., Any],
+    encoding: str,
+    index_delimiter: str | None = None,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    buffers: Sequence[bytes | memoryview] = (),
+    separator: str = '\n',
+) -> None:
+    """
+    Writes the items to the menu's stdin in bounded chunks, without blocking the event loop.
+
+    A sequence of items is written as `buffers`, encoded before the menu is spawned.
+    """
+    format_line = _format_line(preprocessor, index_delimiter)
+    sep = separator.encode(encoding)
+    chunk: list[bytes] = []
+    size = 0
+    count = 0
+    total = 0
+    last_write = time.monotonic()
+
+    async def feed(idx: int, item: Any) -> None:
+        nonlocal size, count, total, last_write
+        line = format_line(idx, item)
+        if not isinstance(line, bytes):
+            line = line.encode(encoding)
+        if isinstance(items, ItemStream) and _stray_separator(items, line, sep):
+            # the stream is cancelled, `arun` raises its error
+            return
+        chunk.append(line + sep)
+        count += 1
+        size += len(line) + 1
+        now = time.monotonic()
+        if size >= chunk_size or now - last_write >= STREAM_FLUSH_INTERVAL:
+            stdin.write(b''.join(chunk))
+            chunk.clear()
+            total += size
+            size = 0
+            last_write = now
+            await stdin.drain()
+
+    with tracing.span('write_stdin', stream=isinstance(items, ItemStream)) as attrs:
+        try:
+            if isinstance(items, ItemStream):
+                await _afeed_items(items, feed)
+            else:
+                stdin.writelines(buffers)
+                count = len(items)
+                size = sum(len(b) for b in buffers)
+                await stdin.drain()
+            if chunk:
+                stdin.write(b''.join(chunk))
+                await stdin.drain()
+            total += size
+        except (BrokenPipeError, ConnectionResetError) as err:
+            logger.debug('menu closed before all items were written: %s', err)
+        finally:
+            stdin.close()
+            attrs.update(items=count, bytes=total)
+
+
+async def _afeed_items(items: ItemStream, feed: Callable[[int, Any], Any]) -> None:
+    stream = items.__aiter__()
+    try:
+        idx = 0
+        async for item in stream:
+            await feed(idx, item)
+            idx += 1
+    finally:
+        # only async generators can be closed
+        aclose = getattr(stream, 'aclose', None)
+        if aclose is not None:
+            await aclose()
+
+
+async def arun(
+    args: list[str],
+    items: Sequence[T] | ItemStream,
+    preprocessor: Callable[..., Any],
+    index_delimiter: str | None = None,
+    trusted: bool = False,
+    separator: str = '\n',
+) -> tuple[str | None, int]:
+    """
+    Like `run`, built on `asyncio.create_subprocess_exec`.
+
+    If the task is cancelled, the menu process is killed.
+    """
+    logger.debug('executing: %s', args)
+    encoding = sys.getdefaultencoding()
+    source = _source_file(items, index_delimiter, separator)
+    buffers: Sequence[bytes | memoryview] = ()
+    if source is None and not isinstance(items, ItemStream):
+        # an invalid item raises before the menu opens
+        buffers = encode_items(items, preprocessor, encoding, index_delimiter, trusted, separator)
+    with tracing.span('spawn', command=args[0]):
+        proc = await asyncio.create_subprocess_exec(
+            *args,
+            stdin=asyncio.subprocess.PIPE if source is None else source,
+            stdout=asyncio.subprocess.PIPE,
+            env=spawn.current_environment(),
+        )
+    assert proc.stdout is not None  # noqa: S101
+    if proc.stdin is None:
+        feeder = asyncio.ensure_future(asyncio.sleep(0))
+    else:
+        feeder = asyncio.ensure_future(
+            _afeed(proc.stdin, items, preprocessor, encoding, index_delimiter, buffers=buffers, separator=separator)
+        )
+    if isinstance(items, ItemStream):
+        stream = items
+        feeder.add_done_callback(lambda _: _kill_on_error(proc, stream))
+    try:
+        with tracing.span('wait'):
+            output = await proc.stdout.read()
+            return_code = await proc.wait()
+    except asyncio.CancelledError:
+        logger.debug('cancelled, killing menu pid=%s', proc.pid)
+        with suppress(ProcessLookupError):
+            proc.kill()
+        await proc.wait()
+        raise
+    finally:
+        if isinstance(items, ItemStream):
+            items.cancel()
+        feeder.cancel()
+        await asyncio.gather(feeder, return_exceptions=True)
+
+    if isinstance(items, ItemStream) and items.error is not None:
+        raise items.error
+    selected = output.decode(encoding)
+    if not selected:
+        return None, return_code
+
+    return _strip_output(selected, separator), return_code
+
+
+def _kill_on_error(proc: asyncio.subprocess.Process, stream: ItemStream) -> None:
+    if stream.error is not None:
+        with suppress(ProcessLookupError):
+            proc.kill()
+
+
+def as_indexable(items: Iterable[T] | AsyncIterable[T]) -> Sequence[T] | ItemStream:
+    """Returns the items untouched if they are a sequence, otherwise wraps them in an `ItemStream`."""
+    if isinstance(items, (ItemStream, Sequence)):
+        return items
+    return ItemStream(items)
+
+
 def remove_ansi_codes(text: str) -> str:
     """
     Removes ANSI escape codes representing color information from a string.
@@ -78,21 +815,45 @@ def remove_ansi_codes(text: str) -> str:
     Returns:
         str: The text with color codes removed.
     """
-    color_code_pattern = r'\033\[[\d;]*m'
-    return re.sub(color_code_pattern, '', text)
+    if '\033' not in text:
+        return text
+    return _ANSI_CODES.sub('', text)
+
+
+def remove_ansi_codes_all(texts: list[str]) -> list[str]:
+    """Like `remove_ansi_codes`, for a list of texts. They are stripped as one string."""
+    if not texts:
+        return []
+    joined = NUL.join(texts)
+    if '\033' not in joined:
+        return texts
+    if joined.count(NUL) != len(texts) - 1:
+        # a text contains the separator
+        return [remove_ansi_codes(t) for t in texts]
+    return _ANSI_CODES.sub('', joined).split(NUL)
 
 
 def write_items_to_stdin(stdin: IO[bytes], items: Iterable[Any], encoding: str, preprocessor: Callable[..., Any]):
     byte = None
     newline_char = '\n'
     return_char = '\r'
+    chunk: list[bytes] = []
+    size = 0
     for item in items:
         line = preprocessor(item)
         byte = _check_byte_encoding(line, byte, newline_char, return_char)
         if not byte:
             line = line.encode(encoding)
-        stdin.write(line + b'\n')
-        stdin.flush()
+        chunk.append(line)
+        chunk.append(b'\n')
+        size += len(line) + 1
+        if size >= STREAM_CHUNK_SIZE:
+            stdin.write(b''.join(chunk))
+            chunk.clear()
+            size = 0
+    if chunk:
+        stdin.write(b''.join(chunk))
+    stdin.flush()
 
 
 def _check_byte_encoding(line: Any, byte: bool | None, newline_char: str | bytes, return_char: str | bytes) -> bool:
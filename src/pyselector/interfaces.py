@@ -4,7 +4,9 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import TYPE_CHECKING
 from typing import Any
+from typing import AsyncIterable
 from typing import Callable
+from typing import Iterable
 from typing import Protocol
 from typing import Sequence
 from typing import TypeVar
@@ -13,6 +15,7 @@ from pyselector import constants
 from pyselector import helpers
 
 if TYPE_CHECKING:
+    from pyselector.cache import RenderCache
     from pyselector.key_manager import KeyManager
 
 T = TypeVar('T')
@@ -30,6 +33,7 @@ class MenuInterface(Protocol):
     name: str
     url: str
     keybind: KeyManager
+    render_cache: RenderCache | None
 
     @property
     def command(self) -> str:
@@ -48,15 +52,42 @@ class MenuInterface(Protocol):
 
     def select(
         self,
-        items: Sequence[T],
+        items: Iterable[T] | AsyncIterable[T],
         hide_keys: bool = False,
         **kwargs,
     ) -> PromptReturn:
         """Shows items in the menu and returns the selected item"""
 
+    def select_index(
+        self,
+        items: Iterable[T] | AsyncIterable[T],
+        hide_keys: bool = False,
+        **kwargs,
+    ) -> tuple[int | list[int] | None, int]:
+        """Shows items in the menu and returns the index of the selected item"""
+
+    async def aselect(
+        self,
+        items: Iterable[T] | AsyncIterable[T],
+        hide_keys: bool = False,
+        **kwargs,
+    ) -> PromptReturn:
+        """Like `select`, without blocking the event loop"""
+
+    async def aselect_index(
+        self,
+        items: Iterable[T] | AsyncIterable[T],
+        hide_keys: bool = False,
+        **kwargs,
+    ) -> tuple[int | list[int] | None, int]:
+        """Like `select_index`, without blocking the event loop"""
+
     def input(self, prompt: str = constants.PROMPT, **kwargs) -> str | None:
         """Shows a prompt in the menu and returns the user's input"""
 
+    async def ainput(self, prompt: str = constants.PROMPT, **kwargs) -> str | None:
+        """Like `input`, without blocking the event loop"""
+
     def confirm(
         self,
         question: str,
@@ -66,5 +97,14 @@ class MenuInterface(Protocol):
     ) -> bool:
         """Prompt the user with a question and a list of options."""
 
+    async def aconfirm(
+        self,
+        question: str,
+        options: Sequence[str] = ('Yes', 'No'),
+        confirm_opts: Sequence[str] = ('Yes'),
+        **kwargs,
+    ) -> bool:
+        """Like `confirm`, without blocking the event loop"""
+
     def supported(self) -> str:
         """Shows a list of supported arguments for the menu"""
@@ -0,0 +1,102 @@
+# invocation.py
+#
+# Caches the command line of a menu, so repeated calls with the same
+# options only have to spawn the menu.
+
+from __future__ import annotations
+
+import logging
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import Hashable
+
+from pyselector import tracing
+
+if TYPE_CHECKING:
+    from pyselector.interfaces import MenuInterface
+    from pyselector.key_manager import KeyManager
+
+log = logging.getLogger(__name__)
+
+INVOCATION_CACHE_SIZE = 32
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(_freeze(v) for v in value)
+    hash(value)
+    return value
+
+
+def keybind_state(keybind: KeyManager) -> Hashable:
+    """Returns a snapshot of the keybinds that end up in the command line."""
+    return tuple((k.id, k.bind, k.code, k.description, k.hidden) for k in keybind.current)
+
+
+class Invocation:
+    """
+    A menu command line compiled once from the menu's options and the
+    state of its keybinds.
+
+    The command line is rebuilt only if the keybinds changed since the
+    last build.
+    """
+
+    def __init__(self, menu: MenuInterface, options: dict[str, Any]) -> None:
+        self.menu = menu
+        self.options = options
+        self._state: Hashable = None
+        self._args: list[str] = []
+
+    @property
+    def args(self) -> list[str]:
+        """Returns a copy of the compiled command line."""
+        with tracing.span('build_args', cached=True) as attrs:
+            state = keybind_state(self.menu.keybind)
+            if not self._args or state != self._state:
+                log.debug('building args for options=%s', self.options)
+                # `_build_args` pops the options it handles, pass a copy
+                self._args = self.menu._build_args(**self.options)
+                self._state = state
+                attrs['cached'] = False
+            return list(self._args)
+
+
+class InvocationCache:
+    """
+    Keeps the most recently used `Invocation` of a menu for each set of
+    options.
+    """
+
+    def __init__(self, menu: MenuInterface, maxsize: int = INVOCATION_CACHE_SIZE) -> None:
+        self.menu = menu
+        self.maxsize = maxsize
+        self._cache: OrderedDict[Hashable, Invocation] = OrderedDict()
+
+    def prepare(self, **options) -> Invocation:
+        """Returns the invocation for the given options, compiled on first use."""
+        try:
+            key = _freeze(options)
+        except TypeError:
+            log.debug('options not hashable, invocation not cached')
+            return Invocation(self.menu, options)
+
+        invocation = self._cache.get(key)
+        if invocation is None:
+            invocation = Invocation(self.menu, options)
+            self._cache[key] = invocation
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        return invocation
+
+    def args(self, **options) -> list[str]:
+        """Returns the command line for the given options."""
+        return self.prepare(**options).args
+
+    def clear(self) -> None:
+        self._cache.clear()
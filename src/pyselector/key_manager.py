@@ -3,6 +3,8 @@
 from __future__ import annotations
 
 import logging
+import sys
+import threading
 from dataclasses import dataclass
 from dataclasses import field
 from typing import Any
@@ -10,12 +12,15 @@ from typing import Callable
 
 log = logging.getLogger(__name__)
 
+# `dataclass(slots=True)` is only available since 3.10
+_SLOTS: dict[str, bool] = {'slots': True} if sys.version_info >= (3, 10) else {}
+
 
 class KeybindError(Exception):
     pass
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class Keybind:
     """
     Represents a keybind, which associates a keyboard key or
@@ -62,17 +67,37 @@ class KeyManager:
     A class for managing keybinds, which are associations between key combinations
     and action functions.
 
+    Keybinds are indexed by code, bind and id. The indexes and the ordered
+    `current` view are rebuilt only when a keybind is registered or
+    removed, so a manager can be shared read-only across threads. Modify
+    `keys` only through the methods below.
+
     Attributes:
-        keys        (dict[str, Keybind]): A dictionary mapping keybinds to their corresponding `Keybind` objects.
+        keys        (dict[int, Keybind]): A dictionary mapping codes to their corresponding `Keybind` objects.
+        original_states (dict[int, Keybind]): The keybinds hidden by `toggle_hidden`, by code.
         key_count   (int): A counter for assigning unique IDs to newly added keybinds.
         code_count  (int): A counter for assigning unique codes to newly added keybinds.
-        temp_hidden (list[Keybind]): A list of temporarily hidden keybinds.
     """
 
     keys: dict[int, Keybind] = field(default_factory=dict)
-    key_count = 1
-    code_count = 1
-    original_states: list[Keybind] = field(default_factory=list)
+    original_states: dict[int, Keybind] = field(default_factory=dict)
+    key_count: int = 1
+    code_count: int = 1
+    _by_bind: dict[str, Keybind] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _by_id: dict[int, Keybind] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _current: list[Keybind] = field(default_factory=list, init=False, repr=False, compare=False)
+    _lock: threading.RLock = field(default_factory=threading.RLock, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self._reindex()
+
+    def _reindex(self) -> None:
+        """Rebuilds the indexes after `keys` changed, the views are swapped in whole."""
+        keys = list(self.keys.values())
+        # the first registered keybind wins on duplicates
+        self._by_bind = {k.bind: k for k in reversed(keys)}
+        self._by_id = {k.id: k for k in reversed(keys)}
+        self._current = keys
 
     def add(
         self,
@@ -87,33 +112,41 @@ class KeyManager:
         and associates it with the specified action function.
         """
         log.debug(f'adding keybind={bind} {description}')
-        return self.register(
-            Keybind(
-                id=self.key_count,
-                bind=bind,
-                code=self.code_count,
-                description=description,
-                hidden=hidden,
-                action=action,
-            ),
-            exist_ok=exist_ok,
-        )
+        with self._lock:
+            return self.register(
+                Keybind(
+                    id=self.key_count,
+                    bind=bind,
+                    code=self.code_count,
+                    description=description,
+                    hidden=hidden,
+                    action=action,
+                ),
+                exist_ok=exist_ok,
+            )
 
     def unregister(self, code: int) -> Keybind:
         """Removes the keybind with the specified bind."""
-        if not self.keys.get(code):
-            err_msg = f'No keybind found with {code=}'
-            log.error(err_msg)
-            raise KeybindError(err_msg)
-        log.debug(f'removing keybind={self.keys[code].bind}')
-        return self.keys.pop(code)
+        with self._lock:
+            if not self.keys.get(code):
+                err_msg = f'No keybind found with {code=}'
+                log.error(err_msg)
+                raise KeybindError(err_msg)
+            log.debug(f'removing keybind={self.keys[code].bind}')
+            key = self.keys.pop(code)
+            self.original_states.pop(code, None)
+            self._reindex()
+            return key
 
     def unregister_all(self) -> list[Keybind]:
         """Removes all registered keybinds."""
-        keys = list(self.keys.values())
-        log.debug(f'removing {len(keys)} keybinds')
-        self.keys.clear()
-        return keys
+        with self._lock:
+            keys = list(self.keys.values())
+            log.debug(f'removing {len(keys)} keybinds')
+            self.keys.clear()
+            self.original_states.clear()
+            self._reindex()
+            return keys
 
     def register(self, key: Keybind, exist_ok: bool = False) -> Keybind:
         """
@@ -131,17 +164,19 @@ class KeyManager:
             err = 'key is None'
             raise KeybindError(err)
 
-        if exist_ok and self.keys.get(key.code):
-            self.unregister(key.code)
+        with self._lock:
+            if exist_ok and self.keys.get(key.code):
+                self.unregister(key.code)
 
-        if self.keys.get(key.code):
-            err = f'{key.bind=} already registered'
-            log.error(err)
-            raise KeybindError(err)
+            if self.keys.get(key.code):
+                err = f'{key.bind=} already registered'
+                log.error(err)
+                raise KeybindError(err)
 
-        self.key_count += 1
-        self.code_count += 1
-        self.keys[key.code] = key
+            self.key_count += 1
+            self.code_count += 1
+            self.keys[key.code] = key
+            self._reindex()
         log.debug(f'registered keybind={key}')
         return key
 
@@ -152,17 +187,18 @@ class KeyManager:
 
     @property
     def current(self) -> list[Keybind]:
-        return list(self.keys.values())
+        """A copy of the registered keybinds, in order."""
+        return list(self._current)
 
     def hide_all(self) -> None:
         """Hides all keybinds."""
-        for key in self.current:
+        for key in self._current:
             if not key.hidden:
                 key.hide()
 
     def toggle_all(self) -> None:
         """Toggles the "hidden" property of all non-hidden keybinds."""
-        for k in self.current:
+        for k in self._current:
             k.hidden = not k.hidden
 
     def toggle_hidden(self, restore: bool = False) -> None:
@@ -171,19 +207,20 @@ class KeyManager:
         temporarily stores the original "hidden" state of each keybind.
         If `restore` is True, restores the original "hidden" state of each keybind.
         """
-        for key in self.current:
-            if not key.hidden:
-                key.toggle()
-                self.original_states.append(key)
+        with self._lock:
+            for key in self._current:
+                if not key.hidden:
+                    key.toggle()
+                    self.original_states[key.code] = key
 
-        if restore:
-            for key in self.original_states:
-                key.hidden = not key.hidden
-            self.original_states = []
+            if restore:
+                for key in self.original_states.values():
+                    key.hidden = not key.hidden
+                self.original_states.clear()
 
     def hidden_keys(self) -> list[Keybind]:
         """Returns a list of all hidden keybinds."""
-        return [key for key in self.current if key.hidden]
+        return [key for key in self._current if key.hidden]
 
     def get_by_code(self, code: int) -> Keybind:
         """
@@ -207,12 +244,26 @@ class KeyManager:
         Raises:
             KeybindError: If no keybind is found with the specified bind.
         """
-        for key in self.current:
-            if key.bind == bind:
-                log.debug(f'found keybind={key.bind}')
-                return key
-        msg = f'No keybind found with {bind=}'
-        raise KeybindError(msg) from None
+        try:
+            key = self._by_bind[bind]
+            log.debug(f'found keybind={key.bind}')
+            return key
+        except KeyError:
+            msg = f'No keybind found with {bind=}'
+            raise KeybindError(msg) from None
+
+    def get_by_id(self, id: int) -> Keybind:  # noqa: A002
+        """
+        Returns the keybind with the specified id.
+
+        Raises:
+            KeybindError: If no keybind is found with the specified id.
+        """
+        try:
+            return self._by_id[id]
+        except KeyError:
+            msg = f'No keybind found with {id=}'
+            raise KeybindError(msg) from None
 
     def get_by_code_list(self, code_list: list[int]) -> list[Keybind]:
         """Returns the keybinds with the specified codes."""
@@ -235,7 +286,7 @@ class KeyManager:
         return [self.unregister(k.code) for k in key_list]
 
     def __str__(self) -> str:
-        return '\n'.join([str(k) for k in self.current])
+        return '\n'.join([str(k) for k in self._current])
 
     def __repr__(self):
         return self.__str__()
@@ -0,0 +1,141 @@
+# mapped.py
+#
+# A memory-mapped file of lines used as menu items, without reading the
+# file into a list of strings.
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import mmap
+import os
+from array import array
+from pathlib import Path
+from typing import IO
+from typing import NamedTuple
+
+from pyselector.constants import cache_dir
+from pyselector.helpers import LineBuffer
+from pyselector.helpers import line_offsets
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+# version, file size and mtime stored before the offsets
+INDEX_HEADER = 3
+
+
+class Line(NamedTuple):
+    """
+    A line of a `MappedFile`.
+
+    Attributes:
+        number (int): The line number, starting at 1.
+        offset (int): The byte offset of the line in the file.
+        text (bytes): The line without its newline.
+    """
+
+    number: int
+    offset: int
+    text: bytes
+
+
+def index_path(path: Path) -> Path:
+    """Returns where the line index of the file is persisted, under `cache_dir()`."""
+    digest = hashlib.sha256(str(path.resolve()).encode()).hexdigest()[:32]
+    return cache_dir() / 'lines' / f'{digest}.idx'
+
+
+class MappedFile(LineBuffer):
+    """
+    The lines of a file as menu items, backed by `mmap`.
+
+    The file is given to the menu as its stdin, unless the menu needs
+    each line prefixed with its index (then it is written from the map).
+    The line offsets are indexed on the first lookup, e.g. when the
+    selection is mapped back, and can be persisted to skip indexing an
+    unchanged file again.
+
+    Usage:
+        with MappedFile('/var/log/syslog', persist=True) as lines:
+            idx, _ = menu.select_index(lines)
+            if idx is not None:
+                print(lines.locate(idx))
+    """
+
+    def __init__(self, path: str | Path, persist: bool = False) -> None:
+        self.path = Path(path)
+        self.persist = persist
+        self._file: IO[bytes] = self.path.open('rb')
+        self._stat = os.fstat(self._file.fileno())
+        self._mmap: mmap.mmap | None = None
+        if self._stat.st_size:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            super().__init__(self._mmap)
+        else:
+            super().__init__(b'')
+        self._offsets: array[int] | None = None
+
+    def source_file(self) -> IO[bytes] | None:
+        self._file.seek(0)
+        return self._file
+
+    @property
+    def offsets(self) -> array[int]:
+        if self._offsets is None:
+            self._offsets = self._load_index()
+            if self._offsets is None:
+                self._offsets = line_offsets(self.data)
+                self._save_index(self._offsets)
+        return self._offsets
+
+    def _header(self) -> array[int]:
+        return array('q', (INDEX_VERSION, self._stat.st_size, self._stat.st_mtime_ns))
+
+    def _load_index(self) -> array[int] | None:
+        if not self.persist:
+            return None
+        offsets = array('q')
+        path = index_path(self.path)
+        try:
+            with path.open('rb') as f:
+                offsets.frombytes(f.read())
+        except (OSError, ValueError):
+            return None
+        if offsets[:INDEX_HEADER] != self._header():
+            logger.debug('stale line index %s', path)
+            return None
+        return offsets[INDEX_HEADER:]
+
+    def _save_index(self, offsets: array[int]) -> None:
+        if not self.persist:
+            return
+        path = index_path(self.path)
+        tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with tmp.open('wb') as f:
+                self._header().tofile(f)
+                offsets.tofile(f)
+            tmp.replace(path)
+        except OSError as err:
+            logger.debug('could not write line index: %s', err)
+
+    def locate(self, idx: int) -> Line:
+        """Returns the line number, byte offset and text of the item at `idx`."""
+        text = self[idx]
+        if idx < 0:
+            idx += len(self)
+        return Line(idx + 1, self.offsets[idx], text)
+
+    def close(self) -> None:
+        self.data.release()
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self) -> MappedFile:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
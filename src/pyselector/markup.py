@@ -5,38 +5,137 @@
 from __future__ import annotations
 
 import logging
+import sys
 from dataclasses import dataclass
+from dataclasses import fields
+from typing import Any
+from typing import Iterable
 
-from pyselector.colors import SUPPORTED_COLORS
+from pyselector.colors import ANSI_RESET
+from pyselector.colors import sgr_table
 
 log = logging.getLogger(__name__)
 
+# `dataclass(slots=True)` is only available since 3.10
+_SLOTS: dict[str, bool] = {'slots': True} if sys.version_info >= (3, 10) else {}
+# `PangoSpan` fields that are not span attributes
+_NOT_ATTRS = frozenset(('text', 'markup', 'sub', 'ansi', 'fg_ansi', 'bg_ansi'))
+# joins a column of texts to escape it in one pass
+_BATCH_SEP = '\0'
+
+
+def escape(text: str) -> str:
+    """Escapes the characters of `text` that Pango markup would parse."""
+    if '&' in text:
+        text = text.replace('&', '&amp;')
+    if '<' in text:
+        text = text.replace('<', '&lt;')
+    if '>' in text:
+        text = text.replace('>', '&gt;')
+    return text
+
+
+def escape_all(texts: Iterable[str]) -> list[str]:
+    """Like `escape`, for a column of texts. The texts are escaped as one string."""
+    texts = texts if isinstance(texts, list) else list(texts)
+    if not texts:
+        return []
+    joined = _BATCH_SEP.join(texts)
+    if joined.count(_BATCH_SEP) != len(texts) - 1:
+        # a text contains the separator
+        return [escape(t) for t in texts]
+    return escape(joined).split(_BATCH_SEP)
+
+
+def _escape_attr(value: Any) -> str:
+    return escape(str(value)).replace('"', '&quot;')
+
 
 def _ansi_foreground(text: str, color: str | None) -> str:
     if not color:
         return text
 
-    if color not in SUPPORTED_COLORS:
+    sgr = sgr_table().get(color)
+    if sgr is None:
         log.error("unknown foreground color '%s'", color)
         return text
 
-    text = f'\033[38;2;{SUPPORTED_COLORS[color]}m{text}'
-    return f'{text}\033[0m'
+    return f'{sgr.foreground}{text}{ANSI_RESET}'
 
 
 def _ansi_background(text: str, color: str | None) -> str:
     if not color:
         return text
 
-    if color not in SUPPORTED_COLORS:
+    sgr = sgr_table().get(color)
+    if sgr is None:
         log.error("unknown background color '%s'", color)
         return text
 
-    text = f'\033[48;2;{SUPPORTED_COLORS[color]}m{text}'
-    return f'{text}\033[0m'
+    return f'{sgr.background}{text}{ANSI_RESET}'
+
+
+class PangoStyle:
+    """
+    A span style compiled once into the markup around a text, to render
+    many texts with the same attributes.
+
+    Args:
+        sub (bool): Wraps the text in `<sub>`.
+        escape (bool): Escapes the text as Pango markup. Defaults to True.
+        **attrs: The span attributes, as in `PangoSpan`. `None` values are skipped.
+
+    Raises:
+        ValueError: If an attribute is not a span attribute.
+
+    Usage:
+        style = PangoStyle(foreground='red', weight='bold')
+        rows = style.render_all(names)
+    """
+
+    __slots__ = ('attrs', 'escape', 'prefix', 'sub', 'suffix')
 
+    def __init__(self, sub: bool = False, escape: bool = True, **attrs: Any) -> None:
+        unknown = attrs.keys() - _PANGO_ATTR_SET
+        if unknown:
+            msg = f'unknown span attributes: {sorted(unknown)}'
+            raise ValueError(msg)
 
-@dataclass
+        self.attrs = {k: v for k, v in attrs.items() if v is not None}
+        self.sub = sub
+        self.escape = escape
+        spans = ''.join([f' {k}="{_escape_attr(v)}"' for k, v in self.attrs.items()])
+        self.prefix = f'<span{spans}>' + ('<sub>' if sub else '')
+        self.suffix = ('</sub>' if sub else '') + '</span>'
+
+    def render(self, text: str) -> str:
+        """Returns the text wrapped in the span."""
+        if self.escape:
+            text = escape(text)
+        return f'{self.prefix}{text}{self.suffix}'
+
+    __call__ = render
+
+    def render_all(self, texts: Iterable[str]) -> list[str]:
+        """Returns each text wrapped in the span, escaping the column at once."""
+        prefix, suffix = self.prefix, self.suffix
+        if self.escape:
+            texts = escape_all(texts)
+        return [f'{prefix}{text}{suffix}' for text in texts]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, PangoStyle):
+            return NotImplemented
+        return (self.prefix, self.suffix, self.escape) == (other.prefix, other.suffix, other.escape)
+
+    def __hash__(self) -> int:
+        return hash((self.prefix, self.suffix, self.escape))
+
+    def __repr__(self) -> str:
+        return f'PangoStyle(sub={self.sub}, escape={self.escape}, **{self.attrs!r})'
+
+
+@dataclass(**_SLOTS)
 class PangoSpan:
     text: str
     alpha: str | None = None
@@ -86,15 +185,25 @@ class PangoSpan:
     bg_ansi: str | None = None
 
     def __hash__(self):
-        attrs = tuple(self.__dict__[attr] for attr in sorted(self.__dict__.keys()) if attr not in ('text', 'sub'))
-        return hash((self.text, attrs))
+        return hash((self.text, tuple(getattr(self, name) for name in _HASHED)))
+
+    def compile(self) -> PangoStyle:
+        """Returns the span attributes compiled into a `PangoStyle`, the text is not escaped."""
+        attrs = {}
+        for name in PANGO_ATTRS:
+            value = getattr(self, name)
+            if value is not None:
+                attrs[name] = value
+        return PangoStyle(sub=self.sub, escape=False, **attrs)
 
     def _format_ansi(self) -> str:
+        # renders a copy, `self.text` is not wrapped in place
+        text = self.text
         if self.fg_ansi:
-            self.text = _ansi_foreground(self.text, self.fg_ansi)
+            text = _ansi_foreground(text, self.fg_ansi)
         if self.bg_ansi:
-            self.text = _ansi_background(self.text, self.bg_ansi)
-        return self.text
+            text = _ansi_background(text, self.bg_ansi)
+        return text
 
     def __str__(self) -> str:
         if self.markup and self.ansi:
@@ -108,12 +217,9 @@ class PangoSpan:
         if not self.markup:
             return self.text
 
-        attrs = []
-        for attr in self.__dict__:
-            if attr not in ('text', 'markup', 'sub', 'ansi', 'fg_ansi', 'bg_ansi') and self.__dict__[attr] is not None:
-                attrs.append(f'{attr}="{self.__dict__[attr]}"')
+        return self.compile().render(self.text)
 
-        text = self.text
-        if self.sub:
-            text = f'<sub>{text}</sub>'
-        return f'<span {"".join(attrs)}>{text}</span>'
+
+PANGO_ATTRS: tuple[str, ...] = tuple(f.name for f in fields(PangoSpan) if f.name not in _NOT_ATTRS)
+_PANGO_ATTR_SET = frozenset(PANGO_ATTRS)
+_HASHED: tuple[str, ...] = tuple(sorted(f.name for f in fields(PangoSpan) if f.name not in ('text', 'sub')))
@@ -5,16 +5,23 @@ import logging
 import shlex
 from typing import TYPE_CHECKING
 from typing import Any
+from typing import AsyncIterable
 from typing import Callable
+from typing import Iterable
 from typing import Sequence
 from typing import TypeVar
 
 from pyselector import constants
+from pyselector import extract
+from pyselector import frecency
 from pyselector import helpers
+from pyselector import tracing
 from pyselector.interfaces import Arg
+from pyselector.invocation import InvocationCache
 from pyselector.key_manager import KeyManager
 
 if TYPE_CHECKING:
+    from pyselector.cache import RenderCache
     from pyselector.interfaces import PromptReturn
 
 log = logging.getLogger(__name__)
@@ -41,6 +48,8 @@ class Dmenu:
         self.name = 'dmenu'
         self.url = constants.HOMEPAGE_DMENU
         self.keybind = KeyManager()
+        self.invocations = InvocationCache(self)
+        self.render_cache: RenderCache | None = None
 
     @property
     def command(self) -> str:
@@ -105,7 +114,7 @@ class Dmenu:
         case_sensitive: bool = False,
         multi_select: bool = False,
         prompt: str = constants.PROMPT,
-        preprocessor: Callable[..., Any] = lambda x: str(x),
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
         **kwargs,
     ) -> PromptReturn:
         """Prompts the user with a rofi window containing the given items
@@ -150,43 +159,221 @@ class Dmenu:
 
         return result, code
 
+    @tracing.traced()
     def input(self, prompt: str = constants.PROMPT, **kwargs) -> str | None:
-        args = self._build_args(prompt=prompt, input=True, **kwargs)
+        args = self.invocations.args(prompt=prompt, input=True, **kwargs)
         selected, _ = helpers.run(args, [], lambda: None)
         return selected
 
-    def select(
+    @tracing.traced()
+    async def ainput(self, prompt: str = constants.PROMPT, **kwargs) -> str | None:
+        args = self.invocations.args(prompt=prompt, input=True, **kwargs)
+        selected, _ = await helpers.arun(args, [], lambda: None)
+        return selected
+
+    def _prepare_indexed(
         self,
-        items: Sequence[T] | None = None,
         case_sensitive: bool = False,
         multi_select: bool = False,
         prompt: str = constants.PROMPT,
-        preprocessor: Callable[..., Any] = lambda x: str(x),
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
         **kwargs,
-    ) -> tuple[T | None, int]:
-        helpers.check_type(items)
+    ) -> tuple[list[str], Callable[..., Any]]:
+        args = self.invocations.args(
+            case_sensitive=case_sensitive,
+            multi_select=multi_select,
+            prompt=prompt,
+            **kwargs,
+        )
+        if self.render_cache is not None and preprocessor is not helpers.default_preprocessor:
+            preprocessor = self.render_cache.wrap(preprocessor)
+        return args, preprocessor
+
+    @tracing.traced('parse_output')
+    def _parse_indexed(
+        self,
+        items: Sequence[T] | helpers.ItemStream,
+        preprocessor: Callable[..., Any],
+        selected: str | None,
+        code: int,
+    ) -> tuple[int, str | None, int]:
+        if not selected:
+            return -1, None, code
 
-        if items is None:
-            items = []
+        if isinstance(items, helpers.LineBuffer):
+            # dmenu only prints the text, of equal lines the first one is found
+            return items.find(selected), selected, code
 
-        args = self._build_args(case_sensitive, multi_select, prompt, **kwargs)
-        selected, code = helpers.run(args, items, preprocessor)
+        consumed = items.consumed if isinstance(items, helpers.ItemStream) else items
+        return extract.ExtractIndex(consumed, preprocessor).index(selected), selected, code
 
-        if not selected:
+    def _run_indexed(
+        self,
+        items: Sequence[T] | helpers.ItemStream,
+        case_sensitive: bool = False,
+        multi_select: bool = False,
+        prompt: str = constants.PROMPT,
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        **kwargs,
+    ) -> tuple[int, str | None, int]:
+        """
+        dmenu has no way to print the index of the selected item, the
+        selected text is looked up in an `extract.ExtractIndex` of the items.
+        dmenu cannot read NUL separated items either, with `nul=True` each
+        item is shown on one line (see `helpers.single_line`).
+
+        Returns:
+            A tuple containing the selected index (-1 if not found), the
+            selected text and the return code.
+        """
+        trusted = kwargs.pop('trusted', False)
+        if helpers.pop_separator(kwargs) == helpers.NUL:
+            preprocessor = helpers.single_line(preprocessor)
+        # dmenu starts on the first row, the last pick is moved there
+        ranking = frecency.pop_ranking(kwargs, items, preprocessor, last_first=True)
+        if ranking is not None:
+            items = ranking.items
+        args, preprocessor = self._prepare_indexed(case_sensitive, multi_select, prompt, preprocessor, **kwargs)
+        selected, code = helpers.run(args, items, preprocessor, trusted=trusted)
+        idx, selected, code = self._parse_indexed(items, preprocessor, selected, code)
+        if ranking is not None:
+            idx = ranking.finish([idx], code)[0]
+        return idx, selected, code
+
+    async def _arun_indexed(
+        self,
+        items: Sequence[T] | helpers.ItemStream,
+        case_sensitive: bool = False,
+        multi_select: bool = False,
+        prompt: str = constants.PROMPT,
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        **kwargs,
+    ) -> tuple[int, str | None, int]:
+        trusted = kwargs.pop('trusted', False)
+        if helpers.pop_separator(kwargs) == helpers.NUL:
+            preprocessor = helpers.single_line(preprocessor)
+        # dmenu starts on the first row, the last pick is moved there
+        ranking = await frecency.apop_ranking(kwargs, items, preprocessor, last_first=True)
+        if ranking is not None:
+            items = ranking.items
+        args, preprocessor = self._prepare_indexed(case_sensitive, multi_select, prompt, preprocessor, **kwargs)
+        selected, code = await helpers.arun(args, items, preprocessor, trusted=trusted)
+        idx, selected, code = self._parse_indexed(items, preprocessor, selected, code)
+        if ranking is not None:
+            idx = ranking.finish([idx], code)[0]
+        return idx, selected, code
+
+    @tracing.traced('map_result')
+    def _index_result(self, idx: int, selected: str | None, code: int) -> tuple[int | None, int]:
+        if selected is None:
             return None, code
 
-        result: Any = None
-        for item in items:
-            if preprocessor(item) == selected:
-                result = item
-                break
+        if idx == -1:
+            return None, constants.UserCancel(1)
 
-        if not result:
+        return idx, code
+
+    @tracing.traced('map_result')
+    def _select_result(
+        self,
+        items: Sequence[T] | helpers.ItemStream,
+        idx: int,
+        selected: str | None,
+        code: int,
+    ) -> PromptReturn:
+        if selected is None:
+            return None, code
+
+        if idx == -1:
             log.debug('result is empty')
             return selected, constants.UserCancel(1)
 
-        return result, code
+        return items[idx], code
+
+    @tracing.traced()
+    def select_index(
+        self,
+        items: Iterable[T] | AsyncIterable[T],
+        case_sensitive: bool = False,
+        multi_select: bool = False,
+        prompt: str = constants.PROMPT,
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        **kwargs,
+    ) -> tuple[int | None, int]:
+        helpers.check_type(items)
+        return self._index_result(
+            *self._run_indexed(
+                helpers.as_indexable(items), case_sensitive, multi_select, prompt, preprocessor, **kwargs
+            )
+        )
+
+    @tracing.traced()
+    async def aselect_index(
+        self,
+        items: Iterable[T] | AsyncIterable[T],
+        case_sensitive: bool = False,
+        multi_select: bool = False,
+        prompt: str = constants.PROMPT,
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        **kwargs,
+    ) -> tuple[int | None, int]:
+        """Like `select_index`, without blocking the event loop."""
+        helpers.check_type(items)
+        return self._index_result(
+            *await self._arun_indexed(
+                helpers.as_indexable(items), case_sensitive, multi_select, prompt, preprocessor, **kwargs
+            )
+        )
+
+    @tracing.traced()
+    def select(
+        self,
+        items: Iterable[T] | AsyncIterable[T],
+        case_sensitive: bool = False,
+        multi_select: bool = False,
+        prompt: str = constants.PROMPT,
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        **kwargs,
+    ) -> PromptReturn:
+        """
+        `items` can be any iterable or async iterable, if it is not a
+        sequence it is streamed to dmenu.
+
+        Byte strings and a `helpers.LineBuffer` are written without being
+        copied, `trusted=True` skips checking them for line breaks.
+        With `nul=True` line breaks in items are shown as a symbol, the
+        selected item is returned as it is.
+
+        dmenu only prints the selected text, so of several equal items (or
+        equal lines of a `helpers.LineBuffer`) the first one is returned.
+        """
+        helpers.check_type(items)
+        items = helpers.as_indexable(items)
+        idx, selected, code = self._run_indexed(items, case_sensitive, multi_select, prompt, preprocessor, **kwargs)
+        return self._select_result(items, idx, selected, code)
+
+    @tracing.traced()
+    async def aselect(
+        self,
+        items: Iterable[T] | AsyncIterable[T],
+        case_sensitive: bool = False,
+        multi_select: bool = False,
+        prompt: str = constants.PROMPT,
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        **kwargs,
+    ) -> PromptReturn:
+        """
+        Like `select`, built on `asyncio` subprocesses. Cancelling the
+        task kills dmenu.
+        """
+        helpers.check_type(items)
+        items = helpers.as_indexable(items)
+        idx, selected, code = await self._arun_indexed(
+            items, case_sensitive, multi_select, prompt, preprocessor, **kwargs
+        )
+        return self._select_result(items, idx, selected, code)
 
+    @tracing.traced()
     def confirm(
         self,
         question: str,
@@ -199,5 +386,18 @@ class Dmenu:
             return False
         return selected in confirm_opts
 
+    @tracing.traced()
+    async def aconfirm(
+        self,
+        question: str,
+        options: Sequence[str] = ('Yes', 'No'),
+        confirm_opts: Sequence[str] = ('Yes'),
+        **kwargs,
+    ) -> bool:
+        selected, _ = await self.aselect(items=options, prompt=question, **kwargs)
+        if not selected:
+            return False
+        return selected in confirm_opts
+
     def supported(self) -> str:
         return '\n'.join(f'{k:<10} {v.type.__name__.upper():<5} {v.help}' for k, v in SUPPORTED_ARGS.items())
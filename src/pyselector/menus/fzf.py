@@ -3,22 +3,29 @@ from __future__ import annotations
 
 import logging
 import shlex
-import subprocess
 import sys
 from typing import TYPE_CHECKING
 from typing import Any
+from typing import AsyncIterable
 from typing import Callable
 from typing import Iterable
 from typing import Sequence
 from typing import TypeVar
 
 from pyselector import constants
+from pyselector import extract
+from pyselector import frecency
 from pyselector import helpers
+from pyselector import spawn
+from pyselector import tracing
 from pyselector.constants import UserCancel
 from pyselector.interfaces import Arg
+from pyselector.invocation import InvocationCache
+from pyselector.key_manager import KeybindError
 from pyselector.key_manager import KeyManager
 
 if TYPE_CHECKING:
+    from pyselector.cache import RenderCache
     from pyselector.interfaces import PromptReturn
 
 log = logging.getLogger(__name__)
@@ -26,6 +33,8 @@ log = logging.getLogger(__name__)
 T = TypeVar('T')
 FZF_INTERRUPTED_CODE = 130
 FZF_RETURN_CODE_START = 10
+# items are sent as '<index><delimiter><text>', fzf only shows the text
+FZF_DELIMITER = '\t'
 SUPPORTED_ARGS: dict[str, Arg] = {
     'prompt': Arg('--prompt', 'set prompt', str),
     'cycle': Arg('--cycle', 'enable cyclic scroll', bool),
@@ -35,14 +44,38 @@ SUPPORTED_ARGS: dict[str, Arg] = {
         '--height', 'Display fzf window below the cursor with the given height instead of using the full screen', str
     ),
     'input': Arg('--print-query', 'Print query as the first line', bool),
+    'tiebreak': Arg('--tiebreak', 'Comma-separated list of sort criteria to apply when the scores are tied', str),
 }
 
 
+def parse_indices(lines: Iterable[str]) -> list[int]:
+    """
+    Parses the lines printed by fzf when items are prefixed by their index.
+
+    Args:
+        lines (Iterable[str]): The selected lines, '<index><delimiter><text>'.
+
+    Returns:
+        list[int]: The index of each selected line.
+    """
+    indices: list[int] = []
+    for line in lines:
+        idx, _, _ = line.partition(FZF_DELIMITER)
+        try:
+            indices.append(int(idx))
+        except ValueError:
+            log.debug('invalid index in line=%s', line)
+    return indices
+
+
 class Fzf:
     def __init__(self) -> None:
         self.name = 'fzf'
         self.url = constants.HOMEPAGE_FZF
         self.keybind = KeyManager()
+        self.invocations = InvocationCache(self)
+        self.label_indexes = extract.LabelIndexCache()
+        self.render_cache: RenderCache | None = None
         self.keybind.code_count = FZF_RETURN_CODE_START
 
     @property
@@ -83,18 +116,18 @@ class Fzf:
         return keybinds
 
     def _check_keybind_pressed(self, selected: str, keycode: int) -> tuple[str, int]:
-        selected_with_keybind = 2
         if keycode == FZF_INTERRUPTED_CODE:
             return selected, keycode
 
-        for key in self.keybind.current:
-            selected_split = selected.split('\n')
-            if selected.startswith(key.bind) and len(selected_split) >= selected_with_keybind:
-                selected = selected_split[1]
-                keycode = key.code
-                break
-
-        return selected, keycode
+        # with `--expect`, the first line is the key pressed
+        bind, newline, rest = selected.partition('\n')
+        if not newline:
+            return selected, keycode
+        try:
+            key = self.keybind.get_by_bind(bind)
+        except KeybindError:
+            return selected, keycode
+        return rest.partition('\n')[0], key.code
 
     def fzfrun(
         self,
@@ -102,17 +135,7 @@ class Fzf:
         items: Sequence[T],
         preprocessor: Callable[..., Any],
     ) -> tuple[str | None, int]:
-        log.debug('executing: %s', args)
-
-        with subprocess.Popen(
-            args,
-            stdout=subprocess.PIPE,
-            stdin=subprocess.PIPE,
-            text=True,
-        ) as proc:
-            input_items = '\n'.join(map(preprocessor, items))
-            selected, _ = proc.communicate(input=input_items)
-            return_code = proc.wait()
+        selected, return_code = helpers.run(args, items, preprocessor)
 
         if not selected:
             return None, return_code
@@ -149,6 +172,9 @@ class Fzf:
         if multi_select:
             args.append('--multi')
 
+        if kwargs.get('tiebreak'):
+            args.append(f"--tiebreak={kwargs.pop('tiebreak')}")
+
         args.extend(self._build_mesg(kwargs))
         args.extend(self._build_keybinds())
 
@@ -167,12 +193,12 @@ class Fzf:
         case_sensitive: bool = False,
         multi_select: bool = False,
         prompt: str = constants.PROMPT,
-        preprocessor: Callable[..., Any] = lambda x: str(x),
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
         **kwargs,
     ) -> PromptReturn:
         encoding = sys.getdefaultencoding()
         args = self._build_args(case_sensitive, multi_select, prompt, **kwargs)
-        proc = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=None)
+        proc = spawn.spawn(args, stdin=spawn.PIPE, stdout=spawn.PIPE)
         helpers.write_items_to_stdin(proc.stdin, items, encoding, preprocessor)
         if proc.stdin is not None:
             proc.stdin.close()
@@ -191,10 +217,10 @@ class Fzf:
             keybind, selected = '', output[0]
 
         retcode = self.keybind.get_by_bind(keybind).code if keybind != '' else retcode
-        for item in items:
-            if helpers.remove_ansi_codes(preprocessor(item)) == selected:
-                selected = item
-                break
+        if isinstance(items, Sequence):
+            idx = self.label_indexes.index(items, selected, preprocessor, strip_ansi=True)
+            if idx != -1:
+                selected = items[idx]
         return selected, retcode
 
     def this_prompt_works(
@@ -203,7 +229,7 @@ class Fzf:
         case_sensitive: bool = False,
         multi_select: bool = False,
         prompt: str = constants.PROMPT,
-        preprocessor: Callable[..., Any] = lambda x: str(x),
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
         **kwargs,
     ) -> PromptReturn:
         """
@@ -227,12 +253,8 @@ class Fzf:
         if not selected:
             return selected, code
 
-        result: Any = None
-
-        for item in items:
-            if helpers.remove_ansi_codes(preprocessor(item)) == selected:
-                result = item
-                break
+        # fzf prints the rows without their colors
+        result = self.label_indexes.item(items, selected, preprocessor, strip_ansi=True)
 
         if not result:
             log.warning('result is empty')
@@ -240,48 +262,239 @@ class Fzf:
 
         return result, code
 
-    def select(
+    def _prepare_indexed(
         self,
-        items: Iterable[T],
         case_sensitive: bool = False,
         multi_select: bool = False,
         prompt: str = constants.PROMPT,
-        preprocessor: Callable[..., Any] = lambda x: str(x),
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        separator: str = '\n',
         **kwargs,
-    ) -> PromptReturn:
-        # FIX: Split me...
-        encoding = sys.getdefaultencoding()
-        args = self._build_args(case_sensitive, multi_select, prompt, **kwargs)
-        proc = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=None)
-        helpers.write_items_to_stdin(proc.stdin, items, encoding, preprocessor)
-        if proc.stdin is not None:
-            proc.stdin.close()
+    ) -> tuple[list[str], Callable[..., Any]]:
+        args = self.invocations.args(
+            case_sensitive=case_sensitive,
+            multi_select=multi_select,
+            prompt=prompt,
+            **kwargs,
+        )
+        args.extend([f'--delimiter={FZF_DELIMITER}', '--with-nth=2..'])
+        if separator == helpers.NUL:
+            args.extend(['--read0', '--print0'])
+        if self.render_cache is not None and preprocessor is not helpers.default_preprocessor:
+            preprocessor = self.render_cache.wrap(preprocessor)
+        return args, preprocessor
+
+    @tracing.traced('parse_output')
+    def _parse_indexed(
+        self,
+        selected: str | None,
+        retcode: int,
+        separator: str = '\n',
+    ) -> tuple[list[int], int]:
+        log.debug("selected: '%s', retcode: '%s'", selected, retcode)
 
-        output = helpers.read_output_from_stdout(proc.stdout, encoding)
-        retcode = proc.wait()
-        log.warning("output: '%s', retcode: '%s'", output, retcode)
+        if not selected or retcode in (UserCancel(1), FZF_INTERRUPTED_CODE):
+            return [], UserCancel(1)
 
-        if not output or retcode in (UserCancel(1), FZF_INTERRUPTED_CODE):
-            return None, UserCancel(1)
+        # with `--print0` every line, the pressed key too, is ended by NUL
+        output = selected.split(separator)
 
-        keybind_and_selected = 2
-        if len(output) == keybind_and_selected:
-            keybind, selected = output
-        else:
-            keybind, selected = '', output[0]
+        keybind = ''
+        if self.keybind.current:
+            # `--expect` prints the pressed key (or an empty line) first
+            keybind, *output = output
 
         retcode = self.keybind.get_by_bind(keybind).code if keybind != '' else retcode
-        for item in items:
-            if helpers.remove_ansi_codes(preprocessor(item)) == selected:
-                selected = item
-                break
-        return selected, retcode
+        return parse_indices(output), retcode
+
+    def _run_indexed(
+        self,
+        items: Sequence[T] | helpers.ItemStream,
+        case_sensitive: bool = False,
+        multi_select: bool = False,
+        prompt: str = constants.PROMPT,
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        **kwargs,
+    ) -> tuple[list[int], int]:
+        """
+        Runs fzf with each item prefixed by a hidden index field, the
+        selected lines are mapped back to their indices. With `nul=True`
+        items are read and printed NUL separated (`--read0 --print0`).
+
+        Returns:
+            A tuple containing the selected indices and the return code.
+        """
+        trusted = kwargs.pop('trusted', False)
+        separator = helpers.pop_separator(kwargs)
+        # fzf starts on the first row, the last pick is moved there
+        ranking = frecency.pop_ranking(kwargs, items, preprocessor, last_first=True)
+        if ranking is not None:
+            items = ranking.items
+            kwargs.setdefault('tiebreak', 'index')
+        # a `helpers.LineBuffer` is prefixed too, its equal lines can not be told apart by their text
+        args, preprocessor = self._prepare_indexed(
+            case_sensitive, multi_select, prompt, preprocessor, separator, **kwargs
+        )
+        selected, retcode = helpers.run(
+            args, items, preprocessor, index_delimiter=FZF_DELIMITER, trusted=trusted, separator=separator
+        )
+        indices, retcode = self._parse_indexed(selected, retcode, separator)
+        if ranking is not None:
+            indices = ranking.finish(indices, retcode)
+        return indices, retcode
+
+    async def _arun_indexed(
+        self,
+        items: Sequence[T] | helpers.ItemStream,
+        case_sensitive: bool = False,
+        multi_select: bool = False,
+        prompt: str = constants.PROMPT,
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        **kwargs,
+    ) -> tuple[list[int], int]:
+        trusted = kwargs.pop('trusted', False)
+        separator = helpers.pop_separator(kwargs)
+        # fzf starts on the first row, the last pick is moved there
+        ranking = await frecency.apop_ranking(kwargs, items, preprocessor, last_first=True)
+        if ranking is not None:
+            items = ranking.items
+            kwargs.setdefault('tiebreak', 'index')
+        args, preprocessor = self._prepare_indexed(
+            case_sensitive, multi_select, prompt, preprocessor, separator, **kwargs
+        )
+        selected, retcode = await helpers.arun(
+            args, items, preprocessor, index_delimiter=FZF_DELIMITER, trusted=trusted, separator=separator
+        )
+        indices, retcode = self._parse_indexed(selected, retcode, separator)
+        if ranking is not None:
+            indices = ranking.finish(indices, retcode)
+        return indices, retcode
+
+    @tracing.traced('map_result')
+    def _index_result(
+        self,
+        indices: list[int],
+        retcode: int,
+        multi_select: bool,
+    ) -> tuple[int | list[int] | None, int]:
+        if not indices:
+            return None, retcode
+
+        if multi_select:
+            return indices, retcode
+
+        return indices[0], retcode
+
+    @tracing.traced('map_result')
+    def _select_result(
+        self,
+        items: Sequence[T] | helpers.ItemStream,
+        indices: list[int],
+        retcode: int,
+        multi_select: bool,
+    ) -> PromptReturn:
+        if not indices:
+            return None, retcode
+
+        if multi_select:
+            return [items[i] for i in indices], retcode
+
+        return items[indices[0]], retcode
+
+    @tracing.traced()
+    def select_index(
+        self,
+        items: Iterable[T] | AsyncIterable[T],
+        case_sensitive: bool = False,
+        multi_select: bool = False,
+        prompt: str = constants.PROMPT,
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        **kwargs,
+    ) -> tuple[int | list[int] | None, int]:
+        """
+        Shows items in fzf and returns the index (or indices if `multi_select`
+        enabled) of the selected item and the return code.
+        """
+        helpers.check_type(items)
+        indices, retcode = self._run_indexed(
+            helpers.as_indexable(items), case_sensitive, multi_select, prompt, preprocessor, **kwargs
+        )
+        return self._index_result(indices, retcode, multi_select)
+
+    @tracing.traced()
+    async def aselect_index(
+        self,
+        items: Iterable[T] | AsyncIterable[T],
+        case_sensitive: bool = False,
+        multi_select: bool = False,
+        prompt: str = constants.PROMPT,
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        **kwargs,
+    ) -> tuple[int | list[int] | None, int]:
+        """Like `select_index`, without blocking the event loop."""
+        helpers.check_type(items)
+        indices, retcode = await self._arun_indexed(
+            helpers.as_indexable(items), case_sensitive, multi_select, prompt, preprocessor, **kwargs
+        )
+        return self._index_result(indices, retcode, multi_select)
 
+    @tracing.traced()
+    def select(
+        self,
+        items: Iterable[T] | AsyncIterable[T],
+        case_sensitive: bool = False,
+        multi_select: bool = False,
+        prompt: str = constants.PROMPT,
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        **kwargs,
+    ) -> PromptReturn:
+        """
+        `items` can be any iterable or async iterable, if it is not a
+        sequence it is streamed to fzf and its producer is closed once
+        the user picks an item.
+
+        Byte strings and a `helpers.LineBuffer` are written without being
+        copied, `trusted=True` skips checking them for line breaks.
+        `nul=True` separates the items with NUL, so multi-line items are
+        shown and returned as they are.
+        """
+        helpers.check_type(items)
+        items = helpers.as_indexable(items)
+        indices, retcode = self._run_indexed(items, case_sensitive, multi_select, prompt, preprocessor, **kwargs)
+        return self._select_result(items, indices, retcode, multi_select)
+
+    @tracing.traced()
+    async def aselect(
+        self,
+        items: Iterable[T] | AsyncIterable[T],
+        case_sensitive: bool = False,
+        multi_select: bool = False,
+        prompt: str = constants.PROMPT,
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        **kwargs,
+    ) -> PromptReturn:
+        """
+        Like `select`, built on `asyncio` subprocesses. Cancelling the
+        task kills fzf.
+        """
+        helpers.check_type(items)
+        items = helpers.as_indexable(items)
+        indices, retcode = await self._arun_indexed(items, case_sensitive, multi_select, prompt, preprocessor, **kwargs)
+        return self._select_result(items, indices, retcode, multi_select)
+
+    @tracing.traced()
     def input(self, prompt: str = constants.PROMPT, **kwargs) -> str | None:
-        args = self._build_args(prompt=prompt, input=True, **kwargs)
+        args = self.invocations.args(prompt=prompt, input=True, **kwargs)
         selected, _ = helpers.run(args, [], lambda: None)
         return selected
 
+    @tracing.traced()
+    async def ainput(self, prompt: str = constants.PROMPT, **kwargs) -> str | None:
+        args = self.invocations.args(prompt=prompt, input=True, **kwargs)
+        selected, _ = await helpers.arun(args, [], lambda: None)
+        return selected
+
+    @tracing.traced()
     def confirm(
         self,
         question: str,
@@ -294,5 +507,18 @@ class Fzf:
             return False
         return selected in confirm_opts
 
+    @tracing.traced()
+    async def aconfirm(
+        self,
+        question: str,
+        options: Sequence[str] = ('Yes', 'No'),
+        confirm_opts: Sequence[str] = ('Yes'),
+        **kwargs,
+    ) -> bool:
+        selected, _ = await self.aselect(items=options, prompt=question, **kwargs)
+        if not selected:
+            return False
+        return selected in confirm_opts
+
     def supported(self) -> str:
         return '\n'.join(f'{k:<10} {v.type.__name__.upper():<5} {v.help}' for k, v in SUPPORTED_ARGS.items())
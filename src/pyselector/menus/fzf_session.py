@@ -0,0 +1,312 @@
+# fzf_session.py
+#
+# A long-lived fzf process driven through its HTTP server (`--listen`).
+#
+# https://junegunn.github.io/fzf/tips/using-fzf-as-interactive-chooser/
+
+from __future__ import annotations
+
+import logging
+import os
+import select
+import shlex
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+import urllib.request
+from contextlib import suppress
+from pathlib import Path
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import Callable
+from typing import Iterable
+from typing import Sequence
+from typing import TypeVar
+
+from pyselector import constants
+from pyselector import helpers
+from pyselector.constants import UserCancel
+from pyselector.menus.fzf import FZF_DELIMITER
+from pyselector.menus.fzf import Fzf
+
+if TYPE_CHECKING:
+    from pyselector.interfaces import PromptReturn
+
+log = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# pairs of delimiters fzf accepts around an action argument
+ACTION_DELIMITERS: tuple[tuple[str, str], ...] = (
+    ('(', ')'), ('[', ']'), ('{', '}'), ('<', '>'), ('~', '~'), ('!', '!'), ('@', '@'), ('#', '#'), ('$', '$'),
+    ('%', '%'), ('^', '^'), ('&', '&'), ('*', '*'), (';', ';'), ('/', '/'), ('|', '|'),
+)
+
+SESSION_START_TIMEOUT = 2.0
+# how often a pending pick checks that fzf is still running
+PICK_POLL_INTERVAL = 0.1
+
+
+class FzfSessionError(Exception):
+    pass
+
+
+def action(name: str, arg: str) -> str:
+    """
+    Formats an fzf action with its argument, e.g. `change-prompt(> )`.
+
+    Raises:
+        FzfSessionError: If no delimiter can enclose the argument.
+    """
+    for start, end in ACTION_DELIMITERS:
+        if end not in arg:
+            return f'{name}{start}{arg}{end}'
+    msg = f'can not format action {name!r} with argument {arg!r}'
+    raise FzfSessionError(msg)
+
+
+def free_port(host: str = 'localhost') -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def parse_pick(line: str) -> tuple[int, int | None, list[int]]:
+    """
+    Parses a '<code> <generation>:<index>...' line written by the
+    session's bindings.
+
+    Returns:
+        A tuple containing the return code, the generation of the list
+        the indices belong to (`None` without indices) and the indices.
+    """
+    code, *fields = line.split()
+    generation = None
+    indices = []
+    for field in fields:
+        tag, _, idx = field.partition(':')
+        generation = int(tag)
+        indices.append(int(idx))
+    return int(code), generation, indices
+
+
+class FzfSession:
+    """
+    Keeps a single fzf process alive across many selections.
+
+    Each selection pushes its items, prompt and query to the running fzf
+    through its `--listen` HTTP server, instead of spawning a new process.
+    Picks are written by fzf's `execute-silent` bindings to a FIFO owned
+    by the session. Every list is tagged with a generation, so a pick
+    made on a list from an earlier (e.g. timed out) selection is
+    discarded instead of being applied to the current items.
+
+    Usage:
+        with FzfSession() as session:
+            project, _ = session.select(projects, prompt='project> ')
+            branch, _ = session.select(branches(project), prompt='branch> ')
+    """
+
+    def __init__(
+        self,
+        fzf: Fzf | None = None,
+        host: str = 'localhost',
+        port: int | None = None,
+        api_key: str | None = None,
+        spawn: bool = True,
+    ) -> None:
+        self.fzf = fzf or Fzf()
+        self.host = host
+        self.port = port or free_port(host)
+        self.api_key = api_key
+        self.spawn = spawn
+        self.proc: subprocess.Popen[bytes] | None = None
+        self._tmpdir = Path(tempfile.mkdtemp(prefix='pyselector-fzf-'))
+        self.picks_path = self._tmpdir / 'picks'
+        os.mkfifo(self.picks_path, 0o600)
+        # opened read-write, so it never reaches EOF when fzf's shells close it
+        self._picks_fd = os.open(self.picks_path, os.O_RDWR | os.O_NONBLOCK)
+        self._buffer = b''
+        self._generation = 0
+
+    @property
+    def url(self) -> str:
+        return f'http://{self.host}:{self.port}'
+
+    def _bind(self, key: str, code: int) -> str:
+        picks = shlex.quote(str(self.picks_path))
+        return f'{key}:execute-silent(echo {code} {{+1}} > {picks})+deselect-all'
+
+    def _build_args(self, case_sensitive: bool = False, multi_select: bool = False, **kwargs) -> list[str]:
+        args = shlex.split(self.fzf.command)
+        args.extend(['--ansi', f'--listen={self.host}:{self.port}'])
+        args.extend([f'--delimiter={FZF_DELIMITER}', '--with-nth=2..'])
+        args.append('+i' if case_sensitive else '-i')
+        if multi_select:
+            args.append('--multi')
+        args.extend(self.fzf._build_mesg(kwargs))
+        args.extend(['--bind', self._bind('enter', 0)])
+        args.extend(['--bind', self._bind('esc', UserCancel(1))])
+        for key in self.fzf.keybind.current:
+            args.extend(['--bind', self._bind(key.bind, key.code)])
+        return args
+
+    def start(self, case_sensitive: bool = False, multi_select: bool = False, **kwargs) -> None:
+        """Spawns fzf, the options here are fixed for the whole session."""
+        if not self.spawn or (self.proc is not None and self.proc.poll() is None):
+            return
+        args = self._build_args(case_sensitive, multi_select, **kwargs)
+        log.debug('starting fzf session: %s', args)
+        env = dict(os.environ)
+        if self.api_key is not None:
+            env['FZF_API_KEY'] = self.api_key
+        self.proc = subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, env=env)
+        self._wait_ready()
+
+    def _wait_ready(self, timeout: float = SESSION_START_TIMEOUT) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.proc is not None and self.proc.poll() is not None:
+                msg = f'fzf exited with code {self.proc.returncode}'
+                raise FzfSessionError(msg)
+            try:
+                with socket.create_connection((self.host, self.port), timeout=0.1):
+                    return
+            except OSError:
+                time.sleep(0.01)
+        msg = f'fzf session at {self.url} did not start'
+        raise FzfSessionError(msg)
+
+    def post(self, *actions: str, timeout: float = 2.0) -> None:
+        """Sends actions (e.g. 'reload(cat file)') to the fzf server."""
+        body = '+'.join(actions).encode()
+        request = urllib.request.Request(self.url, data=body, method='POST')  # noqa: S310
+        if self.api_key is not None:
+            request.add_header('x-api-key', self.api_key)
+        log.debug('posting actions=%s', body)
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:  # noqa: S310
+                response.read()
+        except OSError as err:
+            msg = f'fzf session at {self.url} not reachable: {err}'
+            raise FzfSessionError(msg) from err
+
+    def reload(self, items: Iterable[Any], preprocessor: Callable[..., Any] = helpers.default_preprocessor) -> Path:
+        """Writes the items to a file and makes fzf reload its list from it."""
+        self._drain()
+        self._generation += 1
+        path = self._tmpdir / f'items.{self._generation}'
+        with path.open('w', encoding='utf-8') as f:
+            for idx, item in enumerate(items):
+                f.write(f'{self._generation}:{idx}{FZF_DELIMITER}{preprocessor(item)}\n')
+        self.post(action('reload', f'cat {shlex.quote(str(path))}'))
+        # the previous list is no longer shown
+        old = self._tmpdir / f'items.{self._generation - 1}'
+        if old.exists():
+            old.unlink()
+        return path
+
+    def change_prompt(self, prompt: str) -> None:
+        self.post(action('change-prompt', prompt))
+
+    def change_query(self, query: str) -> None:
+        self.post(action('change-query', query))
+
+    def _drain(self) -> None:
+        """Discards the picks not read by an earlier selection."""
+        self._buffer = b''
+        with suppress(BlockingIOError):
+            while os.read(self._picks_fd, 4096):
+                pass
+
+    def _read_line(self, deadline: float | None) -> bytes | None:
+        """Returns the next line written to the FIFO, `None` on timeout or if fzf is gone."""
+        while b'\n' not in self._buffer:
+            if self.proc is not None and self.proc.poll() is not None:
+                log.debug('fzf exited with code %s', self.proc.returncode)
+                return None
+            wait = PICK_POLL_INTERVAL
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    return None
+            ready, _, _ = select.select([self._picks_fd], [], [], wait)
+            if not ready:
+                continue
+            data = os.read(self._picks_fd, 4096)
+            if not data:
+                return None
+            self._buffer += data
+        line, _, self._buffer = self._buffer.partition(b'\n')
+        return line
+
+    def read_pick(self, timeout: float | None = None) -> tuple[int, list[int]]:
+        """
+        Waits for the next pick on the current list.
+
+        Returns:
+            A tuple containing the return code and the selected indices.
+            The code is `UserCancel(1)` if the timeout expired or fzf
+            exited.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            line = self._read_line(deadline)
+            if line is None:
+                return UserCancel(1), []
+            code, generation, indices = parse_pick(line.decode())
+            if generation is not None and generation != self._generation:
+                log.debug('discarding pick from an earlier list: %s', line)
+                continue
+            return code, indices
+
+    def select(
+        self,
+        items: Sequence[T],
+        prompt: str = constants.PROMPT,
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        query: str = '',
+        multi_select: bool = False,
+        timeout: float | None = None,
+        **kwargs,
+    ) -> PromptReturn:
+        """
+        Shows the items in the running fzf and returns the selected item
+        and the return code.
+
+        `multi_select` and the keyword arguments only apply when the
+        session is started by this call.
+        """
+        self.start(multi_select=multi_select, **kwargs)
+        self.reload(items, preprocessor)
+        self.post(action('change-prompt', prompt), action('change-query', query))
+        code, indices = self.read_pick(timeout)
+
+        if code == UserCancel(1) or not indices:
+            return None, UserCancel(1)
+
+        if multi_select:
+            return [items[i] for i in indices], code
+
+        return items[indices[0]], code
+
+    def close(self) -> None:
+        """Stops fzf and removes the session files."""
+        if self.proc is not None and self.proc.poll() is None:
+            try:
+                self.post('abort')
+                self.proc.wait(timeout=2)
+            except (FzfSessionError, subprocess.TimeoutExpired):
+                self.proc.kill()
+                self.proc.wait()
+        self.proc = None
+        os.close(self._picks_fd)
+        shutil.rmtree(self._tmpdir, ignore_errors=True)
+
+    def __enter__(self) -> FzfSession:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
@@ -0,0 +1,404 @@
+# headless.py
+#
+# A menu that never opens a window. Each prompt is answered by a policy:
+# a query matched against the items, a callback, or a script of answers,
+# so pipelines using pyselector run in batch jobs and CI without a menu
+# executable or a fork per selection.
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import AsyncIterable
+from typing import Callable
+from typing import Iterable
+from typing import NamedTuple
+from typing import Sequence
+from typing import TypeVar
+from typing import Union
+
+from pyselector import constants
+from pyselector import frecency
+from pyselector import helpers
+from pyselector import tracing
+from pyselector.constants import UserCancel
+from pyselector.interfaces import Arg
+from pyselector.key_manager import KeybindError
+from pyselector.key_manager import KeyManager
+from pyselector.prefilter import fuzzy_gaps
+
+if TYPE_CHECKING:
+    from pyselector.cache import RenderCache
+    from pyselector.interfaces import PromptReturn
+
+log = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+HEADLESS_RETURN_CODE_START = 10
+SCRIPT_ENV = 'PYSELECTOR_HEADLESS_SCRIPT'
+
+SUPPORTED_ARGS: dict[str, Arg] = {
+    'prompt': Arg('prompt', 'passed to the policy', str),
+    'policy': Arg('policy', 'answers this prompt instead of the menu policy', str),
+}
+
+
+class HeadlessError(Exception):
+    pass
+
+
+class Answer(NamedTuple):
+    """
+    The answer to a prompt, all fields `None` cancels it.
+
+    Attributes:
+        query   (str | None): Text typed in the menu, the items are matched against it.
+        pick    (int | list[int] | None): The index (or indices) of the picked items, instead of a query.
+        key     (str | None): The bind of the keybind that accepts the selection, like 'alt-n'.
+    """
+
+    query: str | None = None
+    pick: int | list[int] | None = None
+    key: str | None = None
+
+
+Policy = Union[str, Callable[[str, Sequence[str]], Any]]
+
+
+def as_answer(value: Any) -> Answer:
+    """Returns an `Answer` from a string (a query), an index or a list of them, a dict of fields or `None`."""
+    if isinstance(value, Answer):
+        return value
+    if value is None:
+        return Answer()
+    if isinstance(value, str):
+        return Answer(query=value)
+    if isinstance(value, (int, list)):
+        return Answer(pick=value)
+    if isinstance(value, dict):
+        try:
+            return Answer(**value)
+        except TypeError:
+            msg = f'invalid answer: {value!r}, the fields are {", ".join(Answer._fields)}'
+            raise HeadlessError(msg) from None
+    msg = f'invalid answer: {value!r}'
+    raise HeadlessError(msg)
+
+
+class Script:
+    """
+    Answers prompts in order from a list of answers (see `as_answer`).
+
+    A script can be loaded from a JSON list, e.g.
+    `["main", 2, null, {"query": "log", "key": "alt-d"}, {"pick": [0, 3]}]`.
+    """
+
+    def __init__(self, answers: Iterable[Any]) -> None:
+        self.answers = [as_answer(answer) for answer in answers]
+        self.position = 0
+
+    @classmethod
+    def load(cls, path: str | Path) -> Script:
+        with Path(path).open() as f:
+            return cls(json.load(f))
+
+    @property
+    def done(self) -> bool:
+        return self.position >= len(self.answers)
+
+    def __call__(self, prompt: str, lines: Sequence[str]) -> Answer:
+        if self.done:
+            msg = f'script ended, no answer for prompt {prompt!r}'
+            raise HeadlessError(msg)
+        answer = self.answers[self.position]
+        self.position += 1
+        return answer
+
+
+def match(lines: Sequence[str], query: str, case_sensitive: bool = False) -> list[int]:
+    """
+    Returns the indices of the lines `query` is a subsequence of, best
+    first: fewer gaps between the matched characters, then shorter
+    lines, then the original order. An empty query keeps all lines in
+    order.
+    """
+    if not query:
+        return list(range(len(lines)))
+    if not case_sensitive:
+        query = query.lower()
+    scored = []
+    for i, line in enumerate(lines):
+        gaps = fuzzy_gaps(line if case_sensitive else line.lower(), query)
+        if gaps is not None:
+            scored.append((gaps, len(line), i))
+    scored.sort()
+    return [i for _, _, i in scored]
+
+
+def _default_policy() -> Policy | None:
+    path = os.environ.get(SCRIPT_ENV)
+    if path:
+        log.debug('loading headless script from %s', path)
+        return Script.load(path)
+    return None
+
+
+def _picked(answer: Answer, lines: Sequence[str], case_sensitive: bool, multi_select: bool) -> list[int]:
+    """Returns the indices of the lines picked by the answer, empty if its query matches none."""
+    if answer.pick is not None:
+        indices = answer.pick if isinstance(answer.pick, list) else [answer.pick]
+        for idx in indices:
+            if not 0 <= idx < len(lines):
+                msg = f'index {idx} out of range for {len(lines)} items'
+                raise HeadlessError(msg)
+        return indices
+    indices = match(lines, answer.query or '', case_sensitive)
+    if multi_select:
+        return sorted(indices)
+    return indices[:1]
+
+
+class Headless:
+    """
+    A menu resolved in-process by a policy, with the same return values
+    and keybind codes as the other menus.
+
+    The policy is a query string used for every prompt, a callback
+    `policy(prompt, lines)` returning an answer, or a `Script`. Answers
+    are described in `as_answer`. Without a policy, the script at
+    `$PYSELECTOR_HEADLESS_SCRIPT` is used if set, otherwise every prompt
+    raises `HeadlessError`: nothing is accepted that no one asked for.
+
+    Usage:
+        menu = Headless(policy=Script(['project-a', {'query': 'main', 'key': 'alt-n'}, None]))
+        menu.keybind.add('alt-n', 'new branch')
+        project, _ = menu.select(projects)
+        branch, code = menu.select(branches)  # code of 'alt-n'
+    """
+
+    def __init__(self, policy: Policy | None = None) -> None:
+        self.name = 'headless'
+        self.url = ''
+        self.keybind = KeyManager()
+        self.keybind.code_count = HEADLESS_RETURN_CODE_START
+        self.render_cache: RenderCache | None = None
+        self.policy: Policy | None = _default_policy() if policy is None else policy
+
+    @property
+    def command(self) -> str:
+        return self.name
+
+    def _ask(self, prompt: str, lines: Sequence[str], policy: Policy | None = None) -> Answer:
+        policy = self.policy if policy is None else policy
+        if policy is None:
+            msg = f'no policy to answer {prompt!r}, pass policy= or set ${SCRIPT_ENV}'
+            raise HeadlessError(msg)
+        if isinstance(policy, str):
+            return Answer(query=policy)
+        return as_answer(policy(prompt, lines))
+
+    def _code(self, answer: Answer) -> int:
+        if answer.key is None:
+            return 0
+        try:
+            return self.keybind.get_by_bind(answer.key).code
+        except KeybindError:
+            msg = f'no keybind registered for {answer.key!r}'
+            raise HeadlessError(msg) from None
+
+    @tracing.traced('headless')
+    def _run_indexed(
+        self,
+        items: Sequence[T],
+        case_sensitive: bool = False,
+        multi_select: bool = False,
+        prompt: str = constants.PROMPT,
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        **kwargs,
+    ) -> tuple[list[int], str | None, int]:
+        """
+        Returns the indices of the items picked by the policy, the typed
+        query and the return code.
+        """
+        policy = kwargs.pop('policy', None)
+        # nothing is written to a menu, items are matched as they are
+        kwargs.pop('trusted', None)
+        helpers.pop_separator(kwargs)
+        ranking = frecency.pop_ranking(kwargs, items, preprocessor)
+        if ranking is not None:
+            items = ranking.items
+        if self.render_cache is not None and preprocessor is not helpers.default_preprocessor:
+            preprocessor = self.render_cache.wrap(preprocessor)
+        for arg, value in kwargs.items():
+            log.debug("'%s=%s' not supported in '%s'", arg, value, self.name)
+
+        lines = [helpers.remove_ansi_codes(str(preprocessor(item))) for item in items]
+        answer = self._ask(prompt, lines, policy)
+        if answer == Answer():
+            return [], None, UserCancel(1)
+
+        code = self._code(answer)
+        indices = _picked(answer, lines, case_sensitive, multi_select)
+        if not indices:
+            # like a custom entry typed in rofi or dmenu
+            return [], answer.query, UserCancel(1)
+
+        if ranking is not None:
+            indices = ranking.finish(indices, code)
+        return indices, answer.query, code
+
+    @staticmethod
+    def _materialize(items: Iterable[T] | AsyncIterable[T]) -> Sequence[T]:
+        helpers.check_type(items)
+        return list(helpers.as_indexable(items))
+
+    @staticmethod
+    async def _amaterialize(items: Iterable[T] | AsyncIterable[T]) -> Sequence[T]:
+        helpers.check_type(items)
+        indexable = helpers.as_indexable(items)
+        if isinstance(indexable, helpers.ItemStream):
+            return [item async for item in indexable]
+        return indexable
+
+    @staticmethod
+    def _index_result(indices: list[int], code: int, multi_select: bool) -> tuple[int | list[int] | None, int]:
+        if not indices:
+            return None, code
+        if multi_select:
+            return indices, code
+        return indices[0], code
+
+    @staticmethod
+    def _select_result(
+        items: Sequence[T],
+        indices: list[int],
+        query: str | None,
+        code: int,
+        multi_select: bool,
+    ) -> PromptReturn:
+        if not indices:
+            return query, code
+        if multi_select:
+            return [items[i] for i in indices], code
+        return items[indices[0]], code
+
+    @helpers.deprecated("method will be deprecated. use 'select' method")
+    def prompt(
+        self,
+        items: list[Any] | tuple[Any] | None = None,
+        case_sensitive: bool | None = None,
+        multi_select: bool = False,
+        prompt: str = constants.PROMPT,
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        **kwargs,
+    ) -> PromptReturn:
+        return self.select(items or [], bool(case_sensitive), multi_select, prompt, preprocessor, **kwargs)
+
+    @tracing.traced()
+    def select_index(
+        self,
+        items: Iterable[T] | AsyncIterable[T],
+        case_sensitive: bool = False,
+        multi_select: bool = False,
+        prompt: str = constants.PROMPT,
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        **kwargs,
+    ) -> tuple[int | list[int] | None, int]:
+        indices, _, code = self._run_indexed(
+            self._materialize(items), case_sensitive, multi_select, prompt, preprocessor, **kwargs
+        )
+        return self._index_result(indices, code, multi_select)
+
+    @tracing.traced()
+    async def aselect_index(
+        self,
+        items: Iterable[T] | AsyncIterable[T],
+        case_sensitive: bool = False,
+        multi_select: bool = False,
+        prompt: str = constants.PROMPT,
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        **kwargs,
+    ) -> tuple[int | list[int] | None, int]:
+        """Like `select_index`, reading a stream from the running event loop."""
+        indices, _, code = self._run_indexed(
+            await self._amaterialize(items), case_sensitive, multi_select, prompt, preprocessor, **kwargs
+        )
+        return self._index_result(indices, code, multi_select)
+
+    @tracing.traced()
+    def select(
+        self,
+        items: Iterable[T] | AsyncIterable[T],
+        case_sensitive: bool = False,
+        multi_select: bool = False,
+        prompt: str = constants.PROMPT,
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        **kwargs,
+    ) -> PromptReturn:
+        """
+        Return Code Value
+            0: Row has been selected accepted by the policy.
+            1: The policy cancelled, or its query matched no item (the
+               query is returned).
+            10-28: Row accepted by custom keybinding.
+
+        `policy=` answers this prompt only.
+        """
+        items = self._materialize(items)
+        indices, query, code = self._run_indexed(items, case_sensitive, multi_select, prompt, preprocessor, **kwargs)
+        return self._select_result(items, indices, query, code, multi_select)
+
+    @tracing.traced()
+    async def aselect(
+        self,
+        items: Iterable[T] | AsyncIterable[T],
+        case_sensitive: bool = False,
+        multi_select: bool = False,
+        prompt: str = constants.PROMPT,
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        **kwargs,
+    ) -> PromptReturn:
+        """Like `select`, reading a stream from the running event loop."""
+        items = await self._amaterialize(items)
+        indices, query, code = self._run_indexed(items, case_sensitive, multi_select, prompt, preprocessor, **kwargs)
+        return self._select_result(items, indices, query, code, multi_select)
+
+    @tracing.traced()
+    def input(self, prompt: str = constants.PROMPT, **kwargs) -> str | None:
+        """Returns the query of the policy's answer."""
+        return self._ask(prompt, [], kwargs.pop('policy', None)).query
+
+    @tracing.traced()
+    async def ainput(self, prompt: str = constants.PROMPT, **kwargs) -> str | None:
+        return self.input(prompt, **kwargs)
+
+    @tracing.traced()
+    def confirm(
+        self,
+        question: str,
+        options: Sequence[str] = ('Yes', 'No'),
+        confirm_opts: Sequence[str] = ('Yes'),
+        **kwargs,
+    ) -> bool:
+        selected, _ = self.select(items=options, prompt=question, **kwargs)
+        if not selected:
+            return False
+        return selected in confirm_opts
+
+    @tracing.traced()
+    async def aconfirm(
+        self,
+        question: str,
+        options: Sequence[str] = ('Yes', 'No'),
+        confirm_opts: Sequence[str] = ('Yes'),
+        **kwargs,
+    ) -> bool:
+        return self.confirm(question, options, confirm_opts, **kwargs)
+
+    def supported(self) -> str:
+        return '\n'.join(f'{k:<10} {v.type.__name__.upper():<5} {v.help}' for k, v in SUPPORTED_ARGS.items())
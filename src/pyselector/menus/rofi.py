@@ -5,17 +5,23 @@ import logging
 import shlex
 from typing import TYPE_CHECKING
 from typing import Any
+from typing import AsyncIterable
 from typing import Callable
+from typing import Iterable
 from typing import Sequence
 from typing import TypeVar
 
 from pyselector import constants
+from pyselector import frecency
 from pyselector import helpers
+from pyselector import tracing
 from pyselector.constants import UserCancel
 from pyselector.interfaces import Arg
+from pyselector.invocation import InvocationCache
 from pyselector.key_manager import KeyManager
 
 if TYPE_CHECKING:
+    from pyselector.cache import RenderCache
     from pyselector.interfaces import PromptReturn
 
 
@@ -23,6 +29,14 @@ log = logging.getLogger(__name__)
 
 T = TypeVar('T')
 ROFI_RETURN_CODE_START = 10
+# each selected row is printed as '<index> <text>', custom input gets index -1
+ROFI_FORMAT = 'i s'
+# with NUL separated items a row may span lines, print the typed filter instead
+ROFI_FORMAT_NUL = 'i f'
+# parsed by rofi as the NUL character
+ROFI_NUL_SEP = '\\0'
+ROFI_CUSTOM_INDEX = -1
+ROFI_ASYNC_PRE_READ = 25
 
 LOCATION = {
     'upper-left': 1,
@@ -48,6 +62,8 @@ SUPPORTED_ARGS = {
     'height': Arg('-height', 'set height in percentage', str),
     'theme': Arg('-theme', 'Path to the new theme file format. This overrides the old theme settings', str),
     'filter': Arg('-filter', 'Filter the list by setting text in input bar to filter', str),
+    'async_pre_read': Arg('-async-pre-read', 'Read N rows before showing the window when items are streamed', int),
+    'selected_row': Arg('-selected-row', 'Select a certain row', int),
 }
 
 
@@ -69,6 +85,26 @@ def location(direction: str = 'center') -> str:
         raise KeyError(msg, e, list(LOCATION.keys())) from e
 
 
+def parse_indices(selected: str) -> list[int]:
+    """
+    Parses the output of rofi called with `-format 'i s'`.
+
+    Args:
+        selected (str): One '<index> <text>' pair per line.
+
+    Returns:
+        list[int]: The index of each selected row, -1 for custom input.
+    """
+    indices: list[int] = []
+    for line in selected.split('\n'):
+        idx, _, _ = line.partition(' ')
+        try:
+            indices.append(int(idx))
+        except ValueError:
+            log.debug('invalid index in line=%s', line)
+    return indices
+
+
 class Rofi:
     """
     A Python wrapper for the rofi application, which provides a simple and
@@ -88,6 +124,8 @@ class Rofi:
         self.name = 'rofi'
         self.url = constants.HOMEPAGE_ROFI
         self.keybind = KeyManager()
+        self.invocations = InvocationCache(self)
+        self.render_cache: RenderCache | None = None
         self.keybind.code_count = ROFI_RETURN_CODE_START
 
     @property
@@ -145,7 +183,12 @@ class Rofi:
         **kwargs,
     ) -> list[str]:
         args = shlex.split(self.command)
-        args.extend(['-dmenu', '-sync'])
+        args.append('-dmenu')
+        if kwargs.pop('stream', False):
+            # show the window as soon as the first rows are read
+            args.extend(['-async-pre-read', str(kwargs.pop('async_pre_read', ROFI_ASYNC_PRE_READ))])
+        else:
+            args.append('-sync')
         args.extend(['-p', prompt])
         args.extend(['-l', str(kwargs.pop('lines', 10))])
 
@@ -162,6 +205,10 @@ class Rofi:
             direction = kwargs.pop('location')
             args.extend(['-location', location(direction)])
 
+        selected_row = kwargs.pop('selected_row', None)
+        if selected_row is not None:
+            args.extend(['-selected-row', str(selected_row)])
+
         if multi_select:
             args.append('-multi-select')
 
@@ -182,7 +229,7 @@ class Rofi:
         case_sensitive: bool = False,
         multi_select: bool = False,
         prompt: str = constants.PROMPT,
-        preprocessor: Callable[..., Any] = lambda x: str(x),
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
         **kwargs,
     ) -> PromptReturn:
         """Prompts the user with a rofi window containing the given items
@@ -242,60 +289,244 @@ class Rofi:
 
         return result, code
 
-    def select(
+    def _prepare_indexed(
         self,
-        items: Sequence[T] | None = None,
+        items: Sequence[T] | helpers.ItemStream,
         case_sensitive: bool = False,
         multi_select: bool = False,
         prompt: str = constants.PROMPT,
-        preprocessor: Callable[..., Any] = lambda x: str(x),
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        separator: str = '\n',
         **kwargs,
-    ) -> PromptReturn:
+    ) -> tuple[list[str], Callable[..., Any]]:
+        stream = isinstance(items, helpers.ItemStream)
+        args = self.invocations.args(
+            case_sensitive=case_sensitive,
+            multi_select=multi_select,
+            prompt=prompt,
+            stream=stream,
+            **kwargs,
+        )
+        if separator == helpers.NUL:
+            args.extend(['-sep', ROFI_NUL_SEP, '-format', ROFI_FORMAT_NUL])
+        else:
+            args.extend(['-format', ROFI_FORMAT])
+        if self.render_cache is not None and preprocessor is not helpers.default_preprocessor:
+            preprocessor = self.render_cache.wrap(preprocessor)
+        return args, preprocessor
+
+    @tracing.traced('parse_output')
+    def _parse_indexed(self, selected: str | None, code: int) -> tuple[list[int], str | None, int]:
+        if not selected or code == UserCancel(1):
+            return [], None, code
+        return parse_indices(selected), selected, code
+
+    def _run_indexed(
+        self,
+        items: Sequence[T] | helpers.ItemStream,
+        case_sensitive: bool = False,
+        multi_select: bool = False,
+        prompt: str = constants.PROMPT,
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        **kwargs,
+    ) -> tuple[list[int], str | None, int]:
         """
-        Return Code Value
-            0: Row has been selected accepted by user.
-            1: User cancelled the selection.
-            10-28: Row accepted by custom keybinding.
+        Runs rofi with `-format 'i s'`, each selected row is returned as
+        its index followed by its text. With `nul=True` items are NUL
+        separated (`-sep '\\0'`) and the typed filter replaces the text.
+
+        Returns:
+            A tuple containing the selected indices, the raw selected text
+            and the return code.
         """
-        helpers.check_type(items)
+        trusted = kwargs.pop('trusted', False)
+        separator = helpers.pop_separator(kwargs)
+        ranking = frecency.pop_ranking(kwargs, items, preprocessor)
+        if ranking is not None:
+            items = ranking.items
+            # a row asked for by the caller wins over the last pick
+            row = kwargs.get('selected_row')
+            kwargs['selected_row'] = ranking.selected if row is None else ranking.row(row)
+        args, preprocessor = self._prepare_indexed(
+            items, case_sensitive, multi_select, prompt, preprocessor, separator, **kwargs
+        )
+        indices, selected, code = self._parse_indexed(
+            *helpers.run(args, items, preprocessor, trusted=trusted, separator=separator)
+        )
+        if ranking is not None:
+            indices = ranking.finish(indices, code)
+        return indices, selected, code
+
+    async def _arun_indexed(
+        self,
+        items: Sequence[T] | helpers.ItemStream,
+        case_sensitive: bool = False,
+        multi_select: bool = False,
+        prompt: str = constants.PROMPT,
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        **kwargs,
+    ) -> tuple[list[int], str | None, int]:
+        trusted = kwargs.pop('trusted', False)
+        separator = helpers.pop_separator(kwargs)
+        ranking = await frecency.apop_ranking(kwargs, items, preprocessor)
+        if ranking is not None:
+            items = ranking.items
+            # a row asked for by the caller wins over the last pick
+            row = kwargs.get('selected_row')
+            kwargs['selected_row'] = ranking.selected if row is None else ranking.row(row)
+        args, preprocessor = self._prepare_indexed(
+            items, case_sensitive, multi_select, prompt, preprocessor, separator, **kwargs
+        )
+        indices, selected, code = self._parse_indexed(
+            *await helpers.arun(args, items, preprocessor, trusted=trusted, separator=separator)
+        )
+        if ranking is not None:
+            indices = ranking.finish(indices, code)
+        return indices, selected, code
+
+    @tracing.traced('map_result')
+    def _index_result(
+        self,
+        indices: list[int],
+        code: int,
+        multi_select: bool,
+    ) -> tuple[int | list[int] | None, int]:
+        if not indices:
+            return None, code
 
-        if items is None:
-            items = []
+        if multi_select:
+            return [i for i in indices if i != ROFI_CUSTOM_INDEX], code
 
-        args = self._build_args(case_sensitive, multi_select, prompt, **kwargs)
-        selected, code = helpers.run(args, items, preprocessor)
+        if indices[0] == ROFI_CUSTOM_INDEX:
+            return None, UserCancel(1)
 
-        if not selected or code == UserCancel(1):
+        return indices[0], code
+
+    @tracing.traced('map_result')
+    def _select_result(
+        self,
+        items: Sequence[T] | helpers.ItemStream,
+        indices: list[int],
+        selected: str | None,
+        code: int,
+        multi_select: bool,
+    ) -> PromptReturn:
+        if selected is None:
             return None, code
 
-        # FIX: find a better way to extract the selected item from items
         if multi_select:
-            result: list[T] = []
-            for i in items:
-                for j in selected.split('\n'):
-                    if preprocessor(i) == j:
-                        result.append(i)
-                        continue
-            return result, code
-
-        # FIX: find a better way to extract the selected item from items
-        found: Any = None
-        for item in items:
-            if preprocessor(item) == selected:
-                found = item
-                break
+            return [items[i] for i in indices if i != ROFI_CUSTOM_INDEX], code
 
-        if not found:
+        if not indices or indices[0] == ROFI_CUSTOM_INDEX:
             log.debug('result is empty')
-            return selected, UserCancel(1)
+            return selected.partition(' ')[2], UserCancel(1)
+
+        return items[indices[0]], code
+
+    @tracing.traced()
+    def select_index(
+        self,
+        items: Iterable[T] | AsyncIterable[T],
+        case_sensitive: bool = False,
+        multi_select: bool = False,
+        prompt: str = constants.PROMPT,
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        **kwargs,
+    ) -> tuple[int | list[int] | None, int]:
+        """
+        Shows items in rofi and returns the index (or indices if `multi_select`
+        enabled) of the selected item and the return code.
+        """
+        helpers.check_type(items)
+        indices, _, code = self._run_indexed(
+            helpers.as_indexable(items), case_sensitive, multi_select, prompt, preprocessor, **kwargs
+        )
+        return self._index_result(indices, code, multi_select)
+
+    @tracing.traced()
+    async def aselect_index(
+        self,
+        items: Iterable[T] | AsyncIterable[T],
+        case_sensitive: bool = False,
+        multi_select: bool = False,
+        prompt: str = constants.PROMPT,
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        **kwargs,
+    ) -> tuple[int | list[int] | None, int]:
+        """Like `select_index`, without blocking the event loop."""
+        helpers.check_type(items)
+        indices, _, code = await self._arun_indexed(
+            helpers.as_indexable(items), case_sensitive, multi_select, prompt, preprocessor, **kwargs
+        )
+        return self._index_result(indices, code, multi_select)
+
+    @tracing.traced()
+    def select(
+        self,
+        items: Iterable[T] | AsyncIterable[T],
+        case_sensitive: bool = False,
+        multi_select: bool = False,
+        prompt: str = constants.PROMPT,
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        **kwargs,
+    ) -> PromptReturn:
+        """
+        Return Code Value
+            0: Row has been selected accepted by user.
+            1: User cancelled the selection.
+            10-28: Row accepted by custom keybinding.
+
+        `items` can be any iterable or async iterable, if it is not a
+        sequence it is streamed to rofi and its producer is closed once
+        the user picks an item.
 
-        return found, code
+        Byte strings and a `helpers.LineBuffer` are written without being
+        copied, `trusted=True` skips checking them for line breaks.
+        `nul=True` separates the items with NUL, so multi-line items are
+        shown and returned as they are.
 
+        `rank='frecency'` (or a `frecency.FrecencyStore`) shows the items
+        picked most often and recently first, with the last pick selected.
+        """
+        helpers.check_type(items)
+        items = helpers.as_indexable(items)
+        indices, selected, code = self._run_indexed(items, case_sensitive, multi_select, prompt, preprocessor, **kwargs)
+        return self._select_result(items, indices, selected, code, multi_select)
+
+    @tracing.traced()
+    async def aselect(
+        self,
+        items: Iterable[T] | AsyncIterable[T],
+        case_sensitive: bool = False,
+        multi_select: bool = False,
+        prompt: str = constants.PROMPT,
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        **kwargs,
+    ) -> PromptReturn:
+        """
+        Like `select`, built on `asyncio` subprocesses. Cancelling the
+        task kills rofi.
+        """
+        helpers.check_type(items)
+        items = helpers.as_indexable(items)
+        indices, selected, code = await self._arun_indexed(
+            items, case_sensitive, multi_select, prompt, preprocessor, **kwargs
+        )
+        return self._select_result(items, indices, selected, code, multi_select)
+
+    @tracing.traced()
     def input(self, prompt: str = constants.PROMPT, **kwargs) -> str | None:
-        args = self._build_args(prompt=prompt, input=True, **kwargs)
+        args = self.invocations.args(prompt=prompt, input=True, **kwargs)
         selected, _ = helpers.run(args, [], lambda: None)
         return selected
 
+    @tracing.traced()
+    async def ainput(self, prompt: str = constants.PROMPT, **kwargs) -> str | None:
+        args = self.invocations.args(prompt=prompt, input=True, **kwargs)
+        selected, _ = await helpers.arun(args, [], lambda: None)
+        return selected
+
+    @tracing.traced()
     def confirm(
         self,
         question: str,
@@ -308,5 +539,18 @@ class Rofi:
             return False
         return selected in confirm_opts
 
+    @tracing.traced()
+    async def aconfirm(
+        self,
+        question: str,
+        options: Sequence[str] = ('Yes', 'No'),
+        confirm_opts: Sequence[str] = ('Yes'),
+        **kwargs,
+    ) -> bool:
+        selected, _ = await self.aselect(items=options, prompt=question, **kwargs)
+        if not selected:
+            return False
+        return selected in confirm_opts
+
     def supported(self) -> str:
         return '\n'.join(f'{k:<10} {v.type.__name__.upper():<5} {v.help}' for k, v in SUPPORTED_ARGS.items())
@@ -0,0 +1,265 @@
+# rofi_script.py
+#
+# Keeps a single rofi window open across many selections, using rofi's
+# script mode (`-modi name:script`).
+#
+# https://davatorium.github.io/rofi/current/rofi-script.5/
+#
+# rofi runs this module as its script. Each run forwards `ROFI_RETV`,
+# `ROFI_INFO` and the selected entry to the host process over a unix
+# socket, then prints the rows the host replies with. The host replies
+# to a pick with the rows of the next level, so rofi shows them in the
+# same window. An empty reply closes rofi.
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shlex
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import Callable
+from typing import Sequence
+from typing import TypeVar
+
+from pyselector import constants
+from pyselector import helpers
+from pyselector.constants import UserCancel
+from pyselector.menus.rofi import Rofi
+from pyselector.menus.rofi import location
+
+if TYPE_CHECKING:
+    from pyselector.interfaces import PromptReturn
+
+log = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+MODE_NAME = 'pyselector'
+SOCKET_ENV = 'PYSELECTOR_ROFI_SOCKET'
+ACCEPT_INTERVAL = 0.05
+
+# ROFI_RETV values
+RETV_INITIAL = 0
+RETV_SELECTED = 1
+RETV_CUSTOM_INPUT = 2
+
+
+def _option(name: str, value: str) -> str:
+    return f'\0{name}\x1f{value}\n'
+
+
+class RofiScript:
+    """
+    A rofi backend that keeps the same window open between selections.
+
+    Moving between the levels of a multi-level menu only sends the new
+    rows to the running rofi, there is no window teardown between them.
+    While the caller handles a pick, rofi waits for the next rows, call
+    `close` when done.
+
+    Usage:
+        with RofiScript() as menu:
+            project, _ = menu.select(projects, prompt='project> ')
+            branch, _ = menu.select(branches(project), prompt='branch> ')
+    """
+
+    def __init__(self, rofi: Rofi | None = None) -> None:
+        self.rofi = rofi or Rofi()
+        self.name = self.rofi.name
+        self.url = self.rofi.url
+        self.keybind = self.rofi.keybind
+        self.proc: subprocess.Popen[bytes] | None = None
+        self._tmpdir: Path | None = None
+        self._server: socket.socket | None = None
+        self._pending: socket.socket | None = None
+
+    @property
+    def command(self) -> str:
+        return self.rofi.command
+
+    def _script(self) -> str:
+        return ' '.join(shlex.quote(arg) for arg in (sys.executable, '-m', __name__))
+
+    def _build_args(self, case_sensitive: bool = False, **kwargs) -> list[str]:
+        args = shlex.split(self.command)
+        args.extend(['-modi', f'{MODE_NAME}:{self._script()}', '-show', MODE_NAME])
+        args.extend(['-l', str(kwargs.pop('lines', 10))])
+
+        if kwargs.get('theme'):
+            args.extend(['-theme', kwargs.pop('theme')])
+
+        if kwargs.get('location'):
+            args.extend(['-location', location(kwargs.pop('location'))])
+
+        self.rofi._build_keybinds(args)
+        args.append('-case-sensitive' if case_sensitive else '-i')
+        args.extend(self.rofi._build_dimensions(kwargs))
+        args.extend(self.rofi._build_title_markup(kwargs))
+
+        for arg, value in kwargs.items():
+            log.debug("'%s=%s' not supported in '%s'", arg, value, self.name)
+        return args
+
+    def _start(self, case_sensitive: bool = False, **kwargs) -> None:
+        self._tmpdir = Path(tempfile.mkdtemp(prefix='pyselector-rofi-'))
+        path = str(self._tmpdir / 'socket')
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(path)
+        self._server.listen()
+        self._server.settimeout(ACCEPT_INTERVAL)
+
+        env = dict(os.environ)
+        env[SOCKET_ENV] = path
+        # the script imports pyselector from the same place as this process
+        package_root = str(Path(__file__).parents[2])
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, (package_root, env.get('PYTHONPATH'))))
+
+        args = self._build_args(case_sensitive, **kwargs)
+        log.debug('starting rofi script mode: %s', args)
+        self.proc = subprocess.Popen(args, env=env)
+
+    def _accept(self) -> tuple[socket.socket, dict[str, Any]] | None:
+        """Waits for the next script call, returns `None` if rofi exited."""
+        assert self._server is not None  # noqa: S101
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except socket.timeout:
+                if self.proc is None or self.proc.poll() is not None:
+                    return None
+                continue
+            conn.settimeout(None)
+            with conn.makefile('rb') as f:
+                request = json.loads(f.readline())
+            log.debug('rofi script request=%s', request)
+            return conn, request
+
+    def _rows(
+        self,
+        items: Sequence[Any],
+        prompt: str,
+        preprocessor: Callable[..., Any],
+        mesg: str | None = None,
+        markup: bool = False,
+    ) -> bytes:
+        lines = [_option('prompt', prompt), _option('use-hot-keys', 'true')]
+        lines.append(_option('markup-rows', 'true' if markup else 'false'))
+        messages = [mesg] if mesg else []
+        messages.extend(
+            f'{constants.BULLET} Use <{key.bind}> {key.description}' for key in self.keybind.current if not key.hidden
+        )
+        if messages:
+            # a row can not span lines
+            lines.append(_option('message', '  '.join(messages)))
+        lines.extend(f'{preprocessor(item)}\0info\x1f{idx}\n' for idx, item in enumerate(items))
+        return ''.join(lines).encode()
+
+    def _reset(self) -> int:
+        code = UserCancel(1)
+        if self._pending is not None:
+            # an empty reply closes rofi
+            self._pending.close()
+            self._pending = None
+        if self.proc is not None:
+            code = self.proc.wait()
+            self.proc = None
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        if self._tmpdir is not None:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+            self._tmpdir = None
+        return code
+
+    def select(
+        self,
+        items: Sequence[T],
+        case_sensitive: bool = False,
+        multi_select: bool = False,
+        prompt: str = constants.PROMPT,
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        **kwargs,
+    ) -> PromptReturn:
+        """
+        Shows the items in the running rofi window (started on the first
+        call) and returns the selected item and the return code.
+
+        `case_sensitive` and the window options only apply when rofi is
+        started. `mesg` and `markup` can change on every call.
+
+        Return Code Value
+            0: Row has been selected accepted by user.
+            1: User cancelled the selection.
+            10-28: Row accepted by custom keybinding.
+        """
+        if multi_select:
+            log.debug('not supported in rofi script mode: %s', 'multi-select')
+
+        rows = self._rows(items, prompt, preprocessor, kwargs.pop('mesg', None), kwargs.pop('markup', False))
+
+        if self.proc is None:
+            self._start(case_sensitive, **kwargs)
+            call = self._accept()
+            conn = call[0] if call else None
+        else:
+            # the script call of the last pick is waiting for these rows
+            conn, self._pending = self._pending, None
+
+        if conn is None:
+            return None, self._reset()
+
+        with conn:
+            conn.sendall(rows)
+
+        call = self._accept()
+        if call is None:
+            return None, self._reset()
+
+        self._pending, request = call
+        retv = request['retv']
+        if retv == RETV_CUSTOM_INPUT or request.get('info') is None:
+            return request.get('arg'), UserCancel(1)
+
+        code = 0 if retv == RETV_SELECTED else retv
+        return items[int(request['info'])], code
+
+    def close(self) -> int:
+        """Closes rofi, returns its exit code."""
+        return self._reset()
+
+    def __enter__(self) -> RofiScript:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def main() -> int:
+    """Entry point run by rofi for each script call."""
+    request = {
+        'retv': int(os.environ.get('ROFI_RETV', RETV_INITIAL)),
+        'info': os.environ.get('ROFI_INFO'),
+        'arg': sys.argv[1] if len(sys.argv) > 1 else None,
+    }
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(os.environ[SOCKET_ENV])
+        sock.sendall(json.dumps(request).encode() + b'\n')
+        while True:
+            chunk = sock.recv(64 * 1024)
+            if not chunk:
+                break
+            sys.stdout.buffer.write(chunk)
+    sys.stdout.flush()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,229 @@
+# prefilter.py
+#
+# Narrows a large item set down to the best fuzzy matches of a query
+# before it reaches the menu. rofi and dmenu rescore every row on each
+# keystroke, so a menu showing a few thousand rows stays responsive
+# where one showing millions does not.
+#
+# Scoring uses NumPy when it is installed, a pure Python matcher with
+# the same results otherwise.
+
+from __future__ import annotations
+
+import heapq
+import logging
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import Callable
+from typing import Generic
+from typing import Sequence
+from typing import TypeVar
+
+from pyselector import helpers
+from pyselector import tracing
+
+if TYPE_CHECKING:
+    from pyselector.interfaces import MenuInterface
+    from pyselector.interfaces import PromptReturn
+
+log = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+PREFILTER_LIMIT = 5_000
+BATCH_SIZE = 1 << 16
+
+
+def _load_numpy() -> Any:
+    try:
+        import numpy as np
+    except ImportError:
+        return None
+    return np
+
+
+def fuzzy_gaps(key: str, query: str) -> int | None:
+    """
+    Returns the number of characters between the matched characters of
+    `query` in `key`, or `None` if `query` is not a subsequence of `key`.
+
+    The leftmost match is found first, then tightened from its end
+    backwards, like fzf's v1 algorithm.
+    """
+    pos = 0
+    for char in query:
+        pos = key.find(char, pos)
+        if pos < 0:
+            return None
+        pos += 1
+    last = pos - 1
+    for char in reversed(query):
+        pos = key.rfind(char, 0, pos)
+    return last - pos + 1 - len(query)
+
+
+class Prefilter(Generic[T]):
+    """
+    Keeps the `limit` items that best match a query, in front of any menu.
+
+    Items are rendered and encoded once, a prefilter is meant to be built
+    once and queried many times. A match is a subsequence of the rendered
+    line, matches with fewer gaps rank first, then shorter lines, then
+    the original order. Spaces in the query are ignored. Without a query
+    the first `limit` items are kept.
+
+    The selection is mapped back to the original items, so indices
+    returned by `select_index` refer to `items`.
+
+    Usage:
+        prefilter = Prefilter(paths, limit=2_000)
+        path, code = prefilter.select(pyselector.Menu.rofi(), filter='src py')
+    """
+
+    def __init__(
+        self,
+        items: Sequence[T],
+        preprocessor: Callable[..., Any] = helpers.default_preprocessor,
+        case_sensitive: bool = False,
+        limit: int = PREFILTER_LIMIT,
+        batch_size: int = BATCH_SIZE,
+        use_numpy: bool | None = None,
+    ) -> None:
+        self.items = items
+        self.case_sensitive = case_sensitive
+        self.limit = limit
+        self.batch_size = batch_size
+        self.query = ''
+        # the numpy module, `None` uses the pure python matcher
+        self.np: Any = _load_numpy() if use_numpy is not False else None
+        if use_numpy and self.np is None:
+            msg = 'numpy is not installed'
+            raise ImportError(msg)
+
+        with tracing.span('prefilter_build', items=len(items), numpy=self.np is not None):
+            self.labels = [str(preprocessor(item)) for item in items]
+            self.keys = self.labels if case_sensitive else [label.lower() for label in self.labels]
+            if self.np is not None:
+                self._encode()
+
+    def _encode(self) -> None:
+        """Concatenates the keys into one array of code points, with their bounds."""
+        np = self.np
+        joined = '\0'.join(self.keys)
+        if joined.isascii():
+            self._codes = np.frombuffer(joined.encode('ascii'), dtype=np.uint8)
+        else:
+            self._codes = np.frombuffer(joined.encode('utf-32-le'), dtype=np.uint32)
+        self._lengths = np.fromiter(map(len, self.keys), dtype=np.int64, count=len(self.keys))
+        self._starts = np.cumsum(self._lengths + 1) - (self._lengths + 1)
+        self._ends = self._starts + self._lengths
+        self._scale = int(self._lengths.max(initial=0)) + 1
+        self._occurrences: dict[str, Any] = {}
+
+    def _positions(self, char: str) -> Any:
+        """Returns the sorted positions of `char` in the encoded keys."""
+        positions = self._occurrences.get(char)
+        if positions is None:
+            np = self.np
+            code = ord(char)
+            if code > np.iinfo(self._codes.dtype).max:
+                positions = np.empty(0, dtype=np.int64)
+            else:
+                positions = np.flatnonzero(self._codes == code)
+            self._occurrences[char] = positions
+        return positions
+
+    def _score_batch(self, query: str, lo: int, hi: int) -> tuple[Any, Any]:
+        """Returns the indices in `lo:hi` matching `query` and their ranks."""
+        np = self.np
+        idx = np.arange(lo, hi)
+        pos = self._starts[lo:hi]
+        end = self._ends[lo:hi]
+        for char in query:
+            positions = self._positions(char)
+            j = np.searchsorted(positions, pos)
+            found = j < len(positions)
+            idx, j, end = idx[found], j[found], end[found]
+            nxt = positions[j]
+            inside = nxt < end
+            idx, end = idx[inside], end[inside]
+            pos = nxt[inside] + 1
+            if not len(idx):
+                break
+
+        last = pos - 1
+        pos = last + 1
+        for char in reversed(query):
+            positions = self._positions(char)
+            pos = positions[np.searchsorted(positions, pos, side='left') - 1]
+        gaps = last - pos + 1 - len(query)
+        # ranks by gaps, then length, then index; unique, so a cut keeps exactly `limit`
+        return idx, (gaps * self._scale + self._lengths[idx]) * len(self.keys) + idx
+
+    def _top_numpy(self, query: str, limit: int) -> list[int]:
+        np = self.np
+        best_idx = np.empty(0, dtype=np.int64)
+        best_ranks = np.empty(0, dtype=np.int64)
+        for lo in range(0, len(self.keys), self.batch_size):
+            idx, ranks = self._score_batch(query, lo, min(lo + self.batch_size, len(self.keys)))
+            best_idx = np.concatenate((best_idx, idx))
+            best_ranks = np.concatenate((best_ranks, ranks))
+            if len(best_idx) > limit:
+                keep = np.argpartition(best_ranks, limit - 1)[:limit]
+                best_idx, best_ranks = best_idx[keep], best_ranks[keep]
+        return best_idx[np.argsort(best_ranks)].tolist()
+
+    def _top_python(self, query: str, limit: int) -> list[int]:
+        scored = []
+        for i, key in enumerate(self.keys):
+            gaps = fuzzy_gaps(key, query)
+            if gaps is not None:
+                scored.append((gaps, len(key), i))
+        return [i for _, _, i in heapq.nsmallest(limit, scored)]
+
+    def top(self, query: str = '', limit: int | None = None) -> list[int]:
+        """Returns the indices of the best matches of `query`, best first."""
+        limit = self.limit if limit is None else limit
+        if not self.case_sensitive:
+            query = query.lower()
+        query = query.replace(' ', '').replace('\0', '')
+        if not query or limit <= 0:
+            return list(range(min(max(limit, 0), len(self.keys))))
+        with tracing.span('prefilter', items=len(self.keys), numpy=self.np is not None) as attrs:
+            indices = self._top_numpy(query, limit) if self.np is not None else self._top_python(query, limit)
+            attrs['matches'] = len(indices)
+        log.debug('prefilter query=%r kept %s of %s items', query, len(indices), len(self.keys))
+        return indices
+
+    def select_index(
+        self,
+        menu: MenuInterface,
+        query: str | None = None,
+        **kwargs,
+    ) -> tuple[int | list[int] | None, int]:
+        """
+        Shows the best matches of `query` in the menu and returns the index
+        in `items` of the selected item (or indices if `multi_select`).
+
+        `query` defaults to the `filter` kwarg, then to the previous query.
+        `kwargs` are passed to the menu.
+        """
+        if query is None:
+            query = kwargs.get('filter') or self.query
+        self.query = query
+        indices = self.top(query)
+        selected, code = menu.select_index([self.labels[i] for i in indices], **kwargs)
+        if isinstance(selected, list):
+            return [indices[i] for i in selected], code
+        if selected is None:
+            return None, code
+        return indices[selected], code
+
+    def select(self, menu: MenuInterface, query: str | None = None, **kwargs) -> PromptReturn:
+        """Like `select_index`, returns the selected item(s)."""
+        selected, code = self.select_index(menu, query, **kwargs)
+        if isinstance(selected, list):
+            return [self.items[i] for i in selected], code
+        if selected is None:
+            return None, code
+        return self.items[selected], code
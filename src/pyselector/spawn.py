@@ -0,0 +1,169 @@
+# spawn.py
+#
+# Starts menus with `os.posix_spawnp`, which glibc implements with
+# vfork semantics: the parent's memory is not copied, so the cost of
+# opening a menu does not grow with the RSS of the host process.
+#
+# Falls back to `subprocess.Popen` where `posix_spawnp` is not available.
+
+from __future__ import annotations
+
+import logging
+import os
+import signal
+import subprocess
+from contextlib import contextmanager
+from contextlib import suppress
+from contextvars import ContextVar
+from typing import IO
+from typing import Any
+from typing import Iterator
+from typing import Union
+
+logger = logging.getLogger(__name__)
+
+PIPE = subprocess.PIPE
+SPAWN_ENV = 'PYSELECTOR_SPAWN'
+
+# `subprocess` restores these in the child, python ignores them
+_RESET_SIGNALS = tuple(getattr(signal, name) for name in ('SIGPIPE', 'SIGXFSZ') if hasattr(signal, name))
+
+Stdio = Union[int, IO[Any], None]
+
+# the environment of the menus started in the current context, `None` inherits `os.environ`
+_environment: ContextVar[dict[str, str] | None] = ContextVar('pyselector_environment', default=None)
+
+
+@contextmanager
+def environment(**overrides: str) -> Iterator[dict[str, str]]:
+    """
+    Starts the menus opened in this context, and in the asyncio tasks
+    created in it, with `overrides` added to their environment.
+
+    Usage:
+        with spawn.environment(DISPLAY=':1'):
+            item, code = menu.select(items)
+    """
+    env = {**(current_environment() or os.environ), **overrides}
+    token = _environment.set(env)
+    try:
+        yield env
+    finally:
+        _environment.reset(token)
+
+
+def current_environment() -> dict[str, str] | None:
+    """Returns the environment set by `environment`, `None` if the menus inherit `os.environ`."""
+    return _environment.get()
+
+
+def posix_spawn_available() -> bool:
+    """`posix_spawnp` is used unless unavailable or `PYSELECTOR_SPAWN=popen` is set."""
+    return hasattr(os, 'posix_spawnp') and os.environ.get(SPAWN_ENV, '') != 'popen'
+
+
+def _exit_code(status: int) -> int:
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+class SpawnedProcess:
+    """
+    The parts of `subprocess.Popen` the menus use, for a process started
+    with `os.posix_spawnp`.
+
+    Only the standard streams are set up in the child. Descriptors
+    created by python are not inheritable (PEP 446), so there is no
+    close_fds pass over the descriptor table.
+    """
+
+    def __init__(self, args: list[str], stdin: Stdio = None, stdout: Stdio = None) -> None:
+        self.args = args
+        self.returncode: int | None = None
+        self.stdin: IO[bytes] | None = None
+        self.stdout: IO[bytes] | None = None
+
+        actions: list[tuple[Any, ...]] = []
+        # descriptors the parent closes once the child has them
+        child_ends: list[int] = []
+        try:
+            if stdin == PIPE:
+                read_end, write_end = os.pipe()
+                child_ends.append(read_end)
+                self.stdin = open(write_end, 'wb')  # noqa: SIM115, PTH123
+                actions.append((os.POSIX_SPAWN_DUP2, read_end, 0))
+            elif stdin is not None:
+                actions.append((os.POSIX_SPAWN_DUP2, _fileno(stdin), 0))
+
+            if stdout == PIPE:
+                read_end, write_end = os.pipe()
+                child_ends.append(write_end)
+                self.stdout = open(read_end, 'rb')  # noqa: SIM115, PTH123
+                actions.append((os.POSIX_SPAWN_DUP2, write_end, 1))
+            elif stdout is not None:
+                actions.append((os.POSIX_SPAWN_DUP2, _fileno(stdout), 1))
+
+            self.pid = os.posix_spawnp(
+                args[0],
+                args,
+                current_environment() or os.environ,
+                file_actions=actions,
+                setsigdef=_RESET_SIGNALS,
+            )
+        except BaseException:
+            self._close_streams()
+            raise
+        finally:
+            for fd in child_ends:
+                os.close(fd)
+
+    def poll(self) -> int | None:
+        if self.returncode is None:
+            pid, status = os.waitpid(self.pid, os.WNOHANG)
+            if pid == self.pid:
+                self.returncode = _exit_code(status)
+        return self.returncode
+
+    def wait(self) -> int:
+        if self.returncode is None:
+            try:
+                _, status = os.waitpid(self.pid, 0)
+            except ChildProcessError:
+                # reaped elsewhere, e.g. by a SIGCHLD handler
+                self.returncode = 0
+            else:
+                self.returncode = _exit_code(status)
+        return self.returncode
+
+    def kill(self) -> None:
+        if self.returncode is None:
+            with suppress(ProcessLookupError):
+                os.kill(self.pid, signal.SIGKILL)
+
+    def _close_streams(self) -> None:
+        for stream in (self.stdin, self.stdout):
+            if stream is not None:
+                with suppress(BrokenPipeError, ValueError):
+                    stream.close()
+
+    def __enter__(self) -> SpawnedProcess:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._close_streams()
+        self.wait()
+
+
+def _fileno(stream: int | IO[Any]) -> int:
+    return stream if isinstance(stream, int) else stream.fileno()
+
+
+def spawn(args: list[str], stdin: Stdio = None, stdout: Stdio = None) -> SpawnedProcess | subprocess.Popen[bytes]:
+    """
+    Starts the menu in binary mode, with `stdin` and `stdout` being
+    `PIPE`, a file, a descriptor or `None` (inherited).
+    """
+    if posix_spawn_available():
+        return SpawnedProcess(args, stdin=stdin, stdout=stdout)
+    return subprocess.Popen(args, stdin=stdin, stdout=stdout, env=current_environment())
@@ -0,0 +1,221 @@
+# tracing.py
+#
+# Timed spans for the phases of a menu call (building the command line,
+# preprocessing, spawning the menu, writing its stdin, waiting for the
+# user and mapping the result), delivered to registered hooks.
+#
+# Setting `PYSELECTOR_TRACE=<path>` writes every span to <path> as a
+# Chrome trace-event JSON file when the process exits, it can be opened
+# in `chrome://tracing` or https://ui.perfetto.dev.
+
+from __future__ import annotations
+
+import atexit
+import functools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+from typing import Callable
+from typing import Iterator
+from typing import NamedTuple
+from typing import TypeVar
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+TRACE_ENV = 'PYSELECTOR_TRACE'
+TRACE_MAX_EVENTS = 100_000
+
+
+class Span(NamedTuple):
+    """
+    A timed phase of a menu call.
+
+    Attributes:
+        name (str): The phase, e.g. 'spawn' or 'write_stdin'.
+        start (float): `time.perf_counter()` when the phase started.
+        end (float): `time.perf_counter()` when the phase ended.
+        attrs (dict): Details of the phase, e.g. `items` and `bytes` counts.
+        thread_id (int): The thread the phase ran in.
+    """
+
+    name: str
+    start: float
+    end: float
+    attrs: dict[str, Any]
+    thread_id: int
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+Hook = Callable[[Span], Any]
+
+# replaced, never mutated, so it can be read without the lock
+_hooks: tuple[Hook, ...] = ()
+_lock = threading.Lock()
+
+
+def add_hook(hook: Hook) -> None:
+    """Registers a callable that receives each `Span` when it ends."""
+    global _hooks  # noqa: PLW0603
+    with _lock:
+        _hooks = (*_hooks, hook)
+
+
+def remove_hook(hook: Hook) -> None:
+    global _hooks  # noqa: PLW0603
+    with _lock:
+        _hooks = tuple(h for h in _hooks if h != hook)
+
+
+def enabled() -> bool:
+    return bool(_hooks)
+
+
+def _emit(s: Span) -> None:
+    for hook in _hooks:
+        try:
+            hook(s)
+        except Exception:
+            logger.debug('trace hook %r failed', hook, exc_info=True)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[dict[str, Any]]:
+    """
+    Times the enclosed block, yields the span's attributes so counts can
+    be added once they are known.
+
+    Without hooks the block is not timed.
+    """
+    if not _hooks:
+        yield attrs
+        return
+
+    start = time.perf_counter()
+    try:
+        yield attrs
+    except BaseException as err:
+        attrs['error'] = type(err).__name__
+        raise
+    finally:
+        _emit(Span(name, start, time.perf_counter(), attrs, threading.get_ident()))
+
+
+def traced(name: str | None = None) -> Callable[[F], F]:
+    """Wraps a menu method (sync or async) in a span, tagged with the menu's name."""
+
+    def decorator(func: F) -> F:
+        span_name = name or func.__name__
+
+        if _is_coroutine_function(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+                with span(span_name, menu=getattr(self, 'name', None)):
+                    return await func(self, *args, **kwargs)
+
+            return async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(func)
+        def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+            with span(span_name, menu=getattr(self, 'name', None)):
+                return func(self, *args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def _is_coroutine_function(func: Callable[..., Any]) -> bool:
+    # CO_COROUTINE, avoids importing `inspect` for a flag check
+    return bool(getattr(func, '__code__', None) and func.__code__.co_flags & 0x80)
+
+
+@contextmanager
+def capture() -> Iterator[list[Span]]:
+    """
+    Collects the spans that end inside the block.
+
+    Usage:
+        with tracing.capture() as spans:
+            menu.select(items)
+        for s in spans:
+            print(s.name, s.duration, s.attrs)
+    """
+    spans: list[Span] = []
+    add_hook(spans.append)
+    try:
+        yield spans
+    finally:
+        remove_hook(spans.append)
+
+
+def _json_value(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return repr(value)
+
+
+class ChromeTraceExporter:
+    """
+    A hook that keeps spans as Chrome trace-event 'complete' events and
+    writes them to a JSON file on `flush`.
+
+    Only the last `maxlen` events are kept, so a long-running host does
+    not grow without bound.
+    """
+
+    def __init__(self, path: str | Path, maxlen: int = TRACE_MAX_EVENTS) -> None:
+        self.path = Path(path)
+        self.events: deque[dict[str, Any]] = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def __call__(self, s: Span) -> None:
+        event = {
+            'name': s.name,
+            'cat': 'pyselector',
+            'ph': 'X',
+            'ts': s.start * 1e6,
+            'dur': s.duration * 1e6,
+            'pid': self._pid,
+            'tid': s.thread_id,
+            'args': {k: _json_value(v) for k, v in s.attrs.items()},
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def flush(self) -> None:
+        import json
+
+        with self._lock:
+            data = {'traceEvents': list(self.events), 'displayTimeUnit': 'ms'}
+        try:
+            with self.path.open('w', encoding='utf-8') as f:
+                json.dump(data, f)
+        except OSError as err:
+            logger.warning('could not write trace to %s: %s', self.path, err)
+
+
+def install_from_env() -> ChromeTraceExporter | None:
+    """Installs a `ChromeTraceExporter` if `PYSELECTOR_TRACE` is set, written at exit."""
+    path = os.environ.get(TRACE_ENV)
+    if not path:
+        return None
+    exporter = ChromeTraceExporter(path)
+    add_hook(exporter)
+    atexit.register(exporter.flush)
+    logger.debug('tracing to %s', path)
+    return exporter
+
+
+install_from_env()
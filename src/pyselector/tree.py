@@ -0,0 +1,261 @@
+# tree.py
+#
+# Hierarchical menus, e.g. projects -> branches -> commits, where each
+# node loads its children only when they are needed.
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from dataclasses import field
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import Callable
+from typing import Generic
+from typing import Iterable
+from typing import TypeVar
+
+from pyselector import tracing
+from pyselector.cache import CacheInfo
+from pyselector.constants import UserCancel
+
+if TYPE_CHECKING:
+    from pyselector.interfaces import MenuInterface
+    from pyselector.key_manager import Keybind
+
+log = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+TREE_CACHE_SIZE = 64
+PREFETCH_COUNT = 8
+PREFETCH_WORKERS = 2
+
+
+@dataclass(eq=False)
+class Node(Generic[T]):
+    """
+    A node of a menu tree.
+
+    Attributes:
+        value   (T): The value returned when the node is picked.
+        children (Callable[[], Iterable[Node]] | None): Loads the child nodes, `None` for a leaf.
+        label   (str | None): The line shown in the menu. Defaults to `str(value)`.
+    """
+
+    value: T
+    children: Callable[[], Iterable[Node[Any]]] | None = None
+    label: str | None = None
+
+    @property
+    def leaf(self) -> bool:
+        return self.children is None
+
+    def __str__(self) -> str:
+        return str(self.value) if self.label is None else self.label
+
+
+@dataclass
+class Level:
+    """The loaded children of a node, with their lines rendered once."""
+
+    node: Node[Any]
+    nodes: list[Node[Any]]
+    lines: list[bytes] = field(repr=False)
+
+    @classmethod
+    def load(cls, node: Node[Any], encoding: str = 'utf-8') -> Level:
+        if node.children is None:
+            err_msg = f'node {node} has no children'
+            raise ValueError(err_msg)
+        with tracing.span('load_level', node=str(node)) as attrs:
+            nodes = list(node.children())
+            lines = [str(n).encode(encoding) for n in nodes]
+            attrs['items'] = len(nodes)
+        return cls(node, nodes, lines)
+
+
+class MenuTree:
+    """
+    Navigates a tree of `Node` with any menu, one level per prompt.
+
+    Loaded levels are kept in a bounded LRU cache, by node. While a level
+    is shown, the children of its first `prefetch` nodes are loaded in the
+    background, so picking one of them usually does not wait for its
+    loader. The levels on the path to the current one are held until the
+    user goes back, going back shows them again without calling a loader
+    or rendering a line.
+
+    Cancelling (or pressing `back_key`) goes back one level, cancelling at
+    the root ends the selection.
+
+    Usage:
+        root = Node('projects', children=lambda: [Node(p, children=branches_of(p)) for p in projects])
+        with MenuTree(pyselector.Menu.rofi(), root, back_key='alt-h') as tree:
+            node, code = tree.select(prompt='git> ')
+            print([n.value for n in tree.path])
+    """
+
+    def __init__(
+        self,
+        menu: MenuInterface,
+        root: Node[Any],
+        maxsize: int = TREE_CACHE_SIZE,
+        prefetch: int = PREFETCH_COUNT,
+        workers: int = PREFETCH_WORKERS,
+        back_key: str | None = None,
+    ) -> None:
+        self.menu = menu
+        self.root = root
+        self.maxsize = maxsize
+        self.prefetch = prefetch
+        self.workers = workers
+        self.path: list[Node[Any]] = []
+        self.hits = 0
+        self.misses = 0
+        self.back: Keybind | None = None
+        if back_key is not None:
+            self.back = menu.keybind.add(back_key, 'go back', hidden=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._cache: OrderedDict[int, tuple[Node[Any], Future[Level]]] = OrderedDict()
+        self._executor: ThreadPoolExecutor | None = None
+
+    def _submit(self, node: Node[Any]) -> Future[Level]:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='pyselector-tree')
+        return self._executor.submit(Level.load, node)
+
+    def _future(self, node: Node[Any], background: bool) -> Future[Level]:
+        """Returns the cached load of the node's children, starting it on a miss."""
+        key = id(node)
+        with self._lock:
+            entry = self._cache.get(key)
+            # an id can be reused, make sure it is the same node
+            if entry is not None and entry[0] is node:
+                if not background:
+                    self.hits += 1
+                self._cache.move_to_end(key)
+                return entry[1]
+            if not background:
+                self.misses += 1
+
+            if background:
+                future = self._submit(node)
+            else:
+                future = Future()
+                future.set_running_or_notify_cancel()
+            self._cache[key] = (node, future)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+        if not background:
+            try:
+                future.set_result(Level.load(node))
+            except Exception as e:  # noqa: BLE001
+                # raised by `children` from the future
+                future.set_exception(e)
+            finally:
+                if not future.done():
+                    # interrupted (e.g. KeyboardInterrupt), nothing is cached
+                    self._discard(node, future)
+        return future
+
+    def _discard(self, node: Node[Any], future: Future[Level]) -> None:
+        with self._lock:
+            entry = self._cache.get(id(node))
+            if entry is not None and entry[1] is future:
+                del self._cache[id(node)]
+
+    def children(self, node: Node[Any]) -> Level:
+        """Returns the children of the node, loading them unless cached."""
+        future = self._future(node, background=False)
+        try:
+            return future.result()
+        except Exception:
+            # do not cache failures, the next call retries
+            self._discard(node, future)
+            raise
+
+    def _prefetch(self, level: Level) -> list[tuple[Node[Any], Future[Level]]]:
+        if self.prefetch <= 0:
+            return []
+        pending: list[tuple[Node[Any], Future[Level]]] = []
+        for node in level.nodes:
+            if len(pending) >= self.prefetch:
+                break
+            if not node.leaf:
+                pending.append((node, self._future(node, background=True)))
+        return pending
+
+    def _cancel(self, pending: list[tuple[Node[Any], Future[Level]]]) -> None:
+        """Drops the prefetches that did not start, the user moved elsewhere."""
+        for node, future in pending:
+            if future.cancel():
+                self._discard(node, future)
+
+    def select(self, **kwargs) -> tuple[Node[Any] | None, int]:
+        """
+        Shows the tree from the root until a leaf is picked.
+
+        `kwargs` are passed to the menu's `select_index` for every level.
+
+        Returns:
+            The picked leaf and the return code, or `None` if cancelled at
+            the root. A custom keybind returns the node it was pressed on
+            and its code. `path` holds the nodes leading to the result.
+        """
+        levels = [self.children(self.root)]
+        self.path = []
+        while levels:
+            level = levels[-1]
+            pending = self._prefetch(level)
+            try:
+                idx, code = self.menu.select_index(level.lines, **kwargs)
+            finally:
+                self._cancel(pending)
+
+            if code == UserCancel(1) or (self.back is not None and code == self.back.code):
+                log.debug('going back from %s', level.node)
+                levels.pop()
+                if self.path:
+                    self.path.pop()
+                continue
+
+            if not isinstance(idx, int):
+                return None, code
+
+            node = level.nodes[idx]
+            if code != 0 or node.leaf:
+                self.path.append(node)
+                return node, code
+
+            self.path.append(node)
+            levels.append(self.children(node))
+        return None, UserCancel(1)
+
+    def invalidate(self, node: Node[Any] | None = None) -> None:
+        """Removes the children of `node` from the cache, or all of them."""
+        with self._lock:
+            if node is None:
+                self._cache.clear()
+            elif id(node) in self._cache and self._cache[id(node)][0] is node:
+                del self._cache[id(node)]
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._cache))
+
+    def close(self) -> None:
+        """Stops the prefetch workers, waiting for the running loads."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self) -> MenuTree:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
@@ -0,0 +1,50 @@
+# test_bench.py
+
+from __future__ import annotations
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from pyselector import executables
+
+BENCHMARKS = Path(__file__).resolve().parents[1] / 'benchmarks'
+sys.path.insert(0, str(BENCHMARKS))
+
+import bench  # noqa: E402
+
+
+@pytest.mark.parametrize(
+    ('name', 'args', 'expected'),
+    (
+        ('rofi', ['-dmenu', '-format', 'i s'], b'2 c\n'),
+        ('dmenu', [], b'c\n'),
+        ('fzf', ['--expect=alt-n'], b'\nc\n'),
+    ),
+)
+def test_fake_menu(name, args, expected) -> None:
+    proc = subprocess.run(
+        [str(BENCHMARKS / 'bin' / name), *args], input=b'a\nb\nc\n', stdout=subprocess.PIPE, check=False
+    )
+    assert proc.stdout == expected
+    assert proc.returncode == 0
+
+
+def test_worker(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    for key, value in bench.env().items():
+        monkeypatch.setenv(key, value)
+    # the executables index is written under the test's cache, not the user's
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    monkeypatch.setattr(executables, '_default_index', None)
+    metrics = bench.worker('rofi', 10, 1)
+    assert metrics['latency'] > 0
+    assert metrics['menu_peak_rss'] > 0
+
+
+def test_compare() -> None:
+    baseline = {'rofi/1000': {'latency': 0.1, 'throughput': 100.0}}
+    assert bench.compare({'rofi/1000': {'latency': 0.11, 'throughput': 90.0}}, baseline, 0.25) == []
+    regressions = bench.compare({'rofi/1000': {'latency': 0.2, 'throughput': 50.0}}, baseline, 0.25)
+    assert len(regressions) == 2
+    assert bench.compare({'fzf/1000': {'latency': 1.0}}, baseline) == []
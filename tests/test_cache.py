@@ -0,0 +1,89 @@
+# test_cache.py
+
+from __future__ import annotations
+
+from pyselector.cache import RenderCache
+
+
+def test_render_cache_hits() -> None:
+    calls: list[str] = []
+
+    def preprocessor(item: str) -> str:
+        calls.append(item)
+        return item.upper()
+
+    cache = RenderCache()
+    render = cache.wrap(preprocessor)
+    assert [render(i) for i in ('a', 'b', 'a')] == ['A', 'B', 'A']
+    assert calls == ['a', 'b']
+    assert cache.info() == (1, 2, cache.maxsize, 2)
+
+
+def test_render_cache_keeps_types_apart() -> None:
+    render = RenderCache().wrap(str)
+    assert render(1) == '1'
+    assert render(True) == 'True'
+
+
+def test_render_cache_per_preprocessor() -> None:
+    cache = RenderCache()
+    hosts = ['alpha', 'beta']
+    assert [cache.render(h, str.upper) for h in hosts] == ['ALPHA', 'BETA']
+    assert [cache.render(h, str.title) for h in hosts] == ['Alpha', 'Beta']
+    assert cache.wrap(str.upper)('alpha') == 'ALPHA'
+    assert cache.info() == (1, 4, cache.maxsize, 4)
+
+
+def test_render_cache_unhashable_items() -> None:
+    cache = RenderCache()
+    render = cache.wrap(lambda item: ','.join(item))
+    item = ['a', 'b']
+    assert render(item) == 'a,b'
+    assert render(item) == 'a,b'
+    assert render(['a', 'b']) == 'a,b'
+    assert cache.hits == 1
+
+
+def test_render_cache_lru_eviction() -> None:
+    cache = RenderCache(maxsize=2)
+    render = cache.wrap(str)
+    render(1)
+    render(2)
+    render(1)
+    render(3)
+    assert len(cache) == 2
+    render(1)
+    assert cache.hits == 2
+    render(2)
+    assert cache.misses == 4
+
+
+def test_render_cache_version() -> None:
+    cache = RenderCache()
+    render = cache.wrap(str)
+    render(1)
+    cache.version = 1
+    render(1)
+    assert cache.misses == 2
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+def test_render_cache_equal_lambdas() -> None:
+    # a lambda created on each call is keyed by its code and closed over values
+    cache = RenderCache()
+
+    def select(prefix: str) -> list[str]:
+        render = cache.wrap(lambda item: f'{prefix}{item}')
+        return [render(i) for i in ('a', 'b')]
+
+    assert select('> ') == ['> a', '> b']
+    assert select('> ') == ['> a', '> b']
+    assert cache.info() == (2, 2, cache.maxsize, 2)
+    assert select('- ') == ['- a', '- b']
+    assert cache.misses == 4
+    # an unhashable closed over value falls back to the identity
+    sep = [',']
+    for _ in range(2):
+        assert cache.render('ab', lambda item: sep[0].join(item).upper()) == 'A,B'
+    assert cache.misses == 6
@@ -0,0 +1,102 @@
+# test_colors.py
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from pyselector import colors
+
+
+@pytest.mark.parametrize(
+    ('input', 'expected'),
+    (
+        ('#fff', (255, 255, 255)),
+        ('#ff000080', (255, 0, 0)),
+        ('#1e90ff', (30, 144, 255)),
+        ('rgb:ff/80/00', (255, 128, 0)),
+        ('rgb:f/8/0', (255, 136, 0)),
+        ('grey', (128, 128, 128)),
+        ('Dark Red', (139, 0, 0)),
+        ('white', (255, 255, 255)),
+    ),
+)
+def test_parse_color(input, expected) -> None:
+    assert colors.parse_color(input) == expected
+
+
+def test_rgb() -> None:
+    assert colors.rgb('black') == '0;0;0'
+
+
+def test_supported_colors() -> None:
+    supported = colors.supported_colors()
+    assert 'dark_yellow' in supported
+    assert colors.SUPPORTED_COLORS is supported
+
+
+def test_import_is_lazy() -> None:
+    code = (
+        'import sys, pyselector, pyselector.markup;'
+        "print(any(m.split('.')[0] in ('Xlib', 'PIL') for m in sys.modules))"
+    )
+    env = {**os.environ, 'PYTHONPATH': str(Path(colors.__file__).parents[1])}
+    output = subprocess.check_output([sys.executable, '-c', code], text=True, env=env)
+    assert output.strip() == 'False'
+
+
+def test_sgr_table() -> None:
+    red = colors.sgr_table()['red']
+    assert red.foreground == f"\033[38;2;{colors.supported_colors()['red']}m"
+    assert red.background.startswith('\033[48;2;')
+
+
+@pytest.fixture
+def no_colors_cache():
+    colors.load_colors.cache_clear()
+    yield
+    colors.load_colors.cache_clear()
+
+
+def test_parse_resources() -> None:
+    text = '*.color1:\t#ff0000\nrofi.font: Mono 12\ninvalid\n'
+    assert colors.parse_resources(text) == {'*.color1': '#ff0000', 'rofi.font': 'Mono 12'}
+
+
+@pytest.mark.usefixtures('no_colors_cache')
+def test_load_colors_from_file(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    path = tmp_path / 'xrdb'
+    path.write_text('*.color9:\t#ff0000\n')
+    monkeypatch.setenv(colors.XRESOURCES_ENV, str(path))
+    monkeypatch.setattr(colors, '_query_resources', lambda: pytest.fail('X11 queried'))
+    assert colors.load_colors() == {'*.color9': '#ff0000'}
+
+
+@pytest.mark.usefixtures('no_colors_cache')
+def test_load_colors_cached(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv(colors.XRESOURCES_ENV, raising=False)
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.setenv('DISPLAY', ':99')
+    queries = []
+
+    def query():
+        queries.append(1)
+        return {'*.color1': '#800000'}
+
+    monkeypatch.setattr(colors, '_query_resources', query)
+    assert colors.load_colors() == {'*.color1': '#800000'}
+    colors.load_colors.cache_clear()
+    assert colors.load_colors() == {'*.color1': '#800000'}
+    assert len(queries) == 1
+
+    # a changed ~/.Xresources invalidates the cache
+    (tmp_path / '.Xresources').write_text('*.color1: red\n')
+    colors.load_colors.cache_clear()
+    colors.load_colors()
+    assert len(queries) == 2
+
+    colors.clear_colors_cache()
+    colors.load_colors()
+    assert len(queries) == 3
@@ -0,0 +1,70 @@
+# test_executables.py
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pytest
+from pyselector import executables
+from pyselector.executables import ExecutableIndex
+
+
+def _touch(path: Path, mode: int = 0o755) -> Path:
+    path.write_text('')
+    path.chmod(mode)
+    return path
+
+
+@pytest.fixture
+def bin_dirs(tmp_path: Path) -> tuple[Path, Path]:
+    first = tmp_path / 'bin1'
+    second = tmp_path / 'bin2'
+    first.mkdir()
+    second.mkdir()
+    _touch(first / 'foo')
+    _touch(first / 'not-executable', mode=0o644)
+    _touch(second / 'foo')
+    _touch(second / 'bar')
+    return first, second
+
+
+@pytest.fixture
+def index(tmp_path: Path, bin_dirs: tuple[Path, Path]) -> ExecutableIndex:
+    path = os.pathsep.join(str(d) for d in bin_dirs)
+    return ExecutableIndex(path=path, cache_file=tmp_path / 'cache' / 'executables.json')
+
+
+def test_executables(index: ExecutableIndex, bin_dirs: tuple[Path, Path]) -> None:
+    first, second = bin_dirs
+    assert index.executables() == {'foo': str(first / 'foo'), 'bar': str(second / 'bar')}
+    assert index.names() == ['bar', 'foo']
+
+
+def test_which(index: ExecutableIndex, bin_dirs: tuple[Path, Path]) -> None:
+    first, _ = bin_dirs
+    assert index.which('foo') == str(first / 'foo')
+    assert index.which('not-executable') is None
+
+
+def test_persisted_index(index: ExecutableIndex, monkeypatch: pytest.MonkeyPatch) -> None:
+    expected = index.executables()
+    assert index.cache_file is not None
+    assert index.cache_file.exists()
+
+    def scan(_):
+        raise AssertionError('index should be loaded from the cache')
+
+    monkeypatch.setattr(executables, '_scan', scan)
+    other = ExecutableIndex(path=index.path, cache_file=index.cache_file)
+    assert other.executables() == expected
+
+
+def test_invalidated_by_mtime(index: ExecutableIndex, bin_dirs: tuple[Path, Path]) -> None:
+    _, second = bin_dirs
+    index.executables()
+    new = _touch(second / 'baz')
+    stat = second.stat()
+    os.utime(second, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert index.which('baz') == str(new)
+    assert 'baz' in index.names()
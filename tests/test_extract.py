@@ -178,3 +178,66 @@ def test_extract_items(_, input, selected, expected):
 )
 def test_extract_indices(_, input, selected, expected):
     assert extract.indices(input, selected) == expected
+
+
+def test_extract_index_duplicates() -> None:
+    extract_index = extract.ExtractIndex(['a', 'b', 'a', 'c', 'a'])
+    assert extract_index.lookup('a') == [0, 2, 4]
+    assert extract_index.index('a') == 0
+    assert extract_index.indices('a\nc\na') == [0, 3, 2]
+
+
+def test_extract_index_multiline() -> None:
+    items = [('first', 'line 1\nline 2'), ('second', 'line 3')]
+    extract_index = extract.ExtractIndex(items, preprocessor=lambda x: x[1])
+    assert extract_index.index('line 2') == 0
+    assert extract_index.item('line 3') == items[1]
+    assert extract_index.indices('line 1\nline 2\nline 3') == [0, 1]
+
+
+def test_extract_index_preprocessor() -> None:
+    items = [1, 2, 3]
+    extract_index = extract.ExtractIndex(items, preprocessor=lambda x: f'item {x}')
+    assert extract_index.select('item 3\nitem 1\nitem 9') == [3, 1]
+    assert extract_index.item('item 9') is None
+
+
+def test_extract_index_array() -> None:
+    extract_index = extract.ExtractIndex(ITEMS)
+    result = extract_index.indices_array(['kiwi', 'apple'])
+    assert result.typecode == 'q'
+    assert list(result) == [5, 0]
+
+
+def test_extract_index_strip_ansi() -> None:
+    items = ['\033[38;2;255;0;0mred\033[0m row', 'plain', '\033[1mbold\033[0m']
+    index = extract.ExtractIndex(items, strip_ansi=True)
+    assert index.index('red row') == 0
+    assert index.index('bold') == 2
+    assert extract.ExtractIndex(items).index('red row') == -1
+
+
+def test_label_index_cache_is_reused() -> None:
+    cache = extract.LabelIndexCache()
+    items = ['a', 'b']
+    index = cache.get(items, str)
+    assert cache.get(items, str) is index
+    assert cache.get(items, str, strip_ansi=True) is not index
+    items.append('c')
+    assert cache.index(items, 'c', str) == 2
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.get(items, str) is not index
+
+
+def test_label_index_cache_notices_changes() -> None:
+    cache = extract.LabelIndexCache()
+    items = ['a', 'b', 'c']
+    assert cache.item(items, 'a') == 'a'
+    # changed in place, same length
+    items[0] = 'x'
+    items[1] = 'a'
+    assert cache.index(items, 'x') == 0
+    assert cache.item(items, 'a') == 'a'
+    assert cache.index(items, 'a') == 1
+    assert cache.index(items, 'missing') == -1
@@ -0,0 +1,84 @@
+# test_fanout.py
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from pyselector import fanout
+from pyselector import spawn
+from pyselector.exc import ExecutableNotFoundError
+from pyselector.fanout import FanOut
+from pyselector.fanout import Target
+from pyselector.menus.dmenu import Dmenu
+from pyselector.menus.fzf import Fzf
+from pyselector.menus.rofi import Rofi
+
+FAKE_MENUS = Path(__file__).resolve().parents[1] / 'benchmarks' / 'bin'
+ITEMS = ['alpha', 'beta', 'gamma\ndelta']
+
+
+@pytest.fixture(autouse=True)
+def fake_menus(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv('PATH', str(FAKE_MENUS), prepend=os.pathsep)
+
+
+def test_environment() -> None:
+    code = 'import os, sys; sys.stdout.write(os.environ.get("DISPLAY", ""))'
+    with spawn.environment(DISPLAY=':7'), spawn.spawn([sys.executable, '-c', code], stdout=spawn.PIPE) as proc:
+        assert proc.stdout is not None
+        assert proc.stdout.read() == b':7'
+    assert spawn.current_environment() is None
+
+
+def test_render() -> None:
+    lines = fanout.render(ITEMS, str.upper)
+    assert bytes(lines.data) == 'ALPHA\nBETA\nGAMMA↵DELTA\n'.encode()
+    assert len(lines) == 3
+
+
+def test_displays() -> None:
+    targets = fanout.displays('rofi', [':0', ':1'])
+    assert [t.env for t in targets] == [{'DISPLAY': ':0'}, {'DISPLAY': ':1'}]
+    assert all(isinstance(t.menu, Rofi) for t in targets)
+
+
+def test_first_answer_wins() -> None:
+    slow = Target(Rofi(), {'FAKE_MENU_DELAY': '10', 'FAKE_MENU_PICK': '0'})
+    fast = Target(Fzf(), {'FAKE_MENU_DELAY': '0.1', 'FAKE_MENU_PICK': '2'})
+    operators = FanOut([slow, Target(Dmenu(), {'FAKE_MENU_DELAY': '10'}), fast])
+    start = time.perf_counter()
+    assert operators.select(ITEMS) == ('gamma\ndelta', 0)
+    # the slow menus were killed, not waited for
+    assert time.perf_counter() - start < 5
+    assert operators.winner is fast
+
+
+def test_cancelled_targets_do_not_end_the_prompt() -> None:
+    cancelled = Target(Rofi(), {'FAKE_MENU_CODE': '1'})
+    answers = Target(Rofi(), {'FAKE_MENU_DELAY': '0.3', 'FAKE_MENU_PICK': '1'})
+    operators = FanOut([cancelled, answers])
+    assert operators.select_index(ITEMS) == (1, 0)
+    assert operators.winner is answers
+
+    everyone_cancels = FanOut([cancelled, Target(Dmenu(), {'FAKE_MENU_CODE': '1'})])
+    assert everyone_cancels.select(ITEMS) == (None, 1)
+    assert everyone_cancels.winner is None
+
+
+def test_confirm() -> None:
+    operators = FanOut([Target(Rofi(), {'FAKE_MENU_PICK': '0'})])
+    assert asyncio.run(operators.aconfirm('sure?'))
+    assert not operators.confirm('sure?', options=('No', 'Yes'))
+
+
+def test_all_targets_fail(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv('PATH', '/nonexistent')
+    with pytest.raises(ExecutableNotFoundError):
+        FanOut([Target(Rofi(), {}), Target(Fzf(), {})]).select(ITEMS)
+    with pytest.raises(ValueError, match='no targets'):
+        FanOut([])
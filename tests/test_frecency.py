@@ -0,0 +1,158 @@
+# test_frecency.py
+
+from __future__ import annotations
+
+import asyncio
+import os
+from pathlib import Path
+from typing import Any
+from typing import AsyncIterator
+
+import pytest
+from pyselector import Menu
+from pyselector import frecency
+from pyselector import helpers
+from pyselector.frecency import FrecencyStore
+from pyselector.frecency import Ranking
+from pyselector.menus.fzf import Fzf
+from pyselector.menus.rofi import Rofi
+
+FAKE_MENUS = Path(__file__).resolve().parents[1] / 'benchmarks' / 'bin'
+DAY = 24 * 60 * 60
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1_700_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> Clock:
+    return Clock()
+
+
+@pytest.fixture
+def store(tmp_path: Path, clock: Clock) -> FrecencyStore:
+    with FrecencyStore(tmp_path / 'frecency.sqlite3', half_life=DAY, clock=clock) as store:
+        yield store
+
+
+def test_score_decays(store: FrecencyStore, clock: Clock) -> None:
+    # a key is counted once per pick
+    store.record(['a', 'a'])
+    assert store.score('a') == pytest.approx(1)
+    store.record(['a'])
+    assert store.score('a') == pytest.approx(2)
+    clock.now += DAY
+    assert store.score('a') == pytest.approx(1)
+    assert store.score('missing') == 0
+
+
+def test_top_and_last(store: FrecencyStore, clock: Clock) -> None:
+    for _ in range(3):
+        store.record(['often'])
+    clock.now += DAY
+    store.record(['recent'])
+    store.record(['recent'])
+    assert store.top() == ['recent', 'often']
+    assert store.top(1) == ['recent']
+    store.record(['often'])
+    assert store.last() == 'often'
+
+
+def test_decayed_keys_are_removed(store: FrecencyStore, clock: Clock) -> None:
+    store.record(['old'])
+    clock.now += 10 * DAY
+    store.record(['new'])
+    assert store.top() == ['new']
+
+
+def test_namespaces(store: FrecencyStore, clock: Clock) -> None:
+    other = FrecencyStore(store.path, namespace='other', half_life=DAY, clock=clock)
+    store.record(['a'])
+    other.record(['b'])
+    assert store.top() == ['a']
+    assert other.top() == ['b']
+    other.clear()
+    assert other.top() == []
+    assert store.top() == ['a']
+    other.close()
+
+
+def test_ranking(store: FrecencyStore, clock: Clock) -> None:
+    store.record(['c', 'b'])
+    store.record(['c'])
+    clock.now += 1
+    store.record(['a'])
+    items = ['a', 'b', 'c', 'd']
+    ranking = Ranking(store, items, str)
+    # 'a' was picked once, after 'b'
+    assert ranking.items == ['c', 'a', 'b', 'd']
+    assert ranking.selected == 1
+    assert Ranking(store, items, str, last_first=True).items == ['a', 'c', 'b', 'd']
+
+    assert ranking.finish([3, -1], code=1) == [3, -1]
+    assert store.score('d') == 0
+    assert ranking.finish([3], code=0) == [3]
+    assert store.last() == 'd'
+
+
+def test_unknown_rank() -> None:
+    with pytest.raises(ValueError, match='unknown rank'):
+        frecency.pop_ranking({'rank': 'alpha'}, [], str)
+    assert frecency.pop_ranking({}, [], str) is None
+
+
+def test_menu_args(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv('PATH', str(FAKE_MENUS), prepend=os.pathsep)
+    assert '-selected-row' not in Rofi()._build_args()
+    args = Rofi()._build_args(selected_row=0)
+    assert args[args.index('-selected-row') + 1] == '0'
+    assert '--tiebreak=index' in Fzf()._build_args(tiebreak='index')
+
+
+def test_rank_keeps_caller_args(store: FrecencyStore, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv('PATH', str(FAKE_MENUS), prepend=os.pathsep)
+    calls: list[list[str]] = []
+    run = helpers.run
+
+    def spy(args: list[str], *rest: Any, **kwargs: Any) -> Any:
+        calls.append(args)
+        return run(args, *rest, **kwargs)
+
+    monkeypatch.setattr(helpers, 'run', spy)
+    # cancelled, the picks are not recorded
+    monkeypatch.setenv('FAKE_MENU_CODE', '1')
+    store.record(['c'])
+    items = ['a', 'b', 'c']
+    Rofi().select(items, rank=store)
+    assert calls[-1][calls[-1].index('-selected-row') + 1] == '0'
+    # ranked as c, a, b: the caller's row 1 ('b') is shown at row 2
+    Rofi().select(items, rank=store, selected_row=1)
+    assert calls[-1][calls[-1].index('-selected-row') + 1] == '2'
+    Fzf().select(items, rank=store)
+    assert '--tiebreak=index' in calls[-1]
+    Fzf().select(items, rank=store, tiebreak='length')
+    assert '--tiebreak=length' in calls[-1]
+
+
+@pytest.mark.parametrize('name', ('rofi', 'dmenu', 'fzf'))
+def test_select_ranks_and_records(name: str, store: FrecencyStore, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv('PATH', str(FAKE_MENUS), prepend=os.pathsep)
+    menu = Menu.get(name)
+    items = ['a', 'b', 'c']
+    monkeypatch.setenv('FAKE_MENU_PICK', '-1')
+    assert menu.select(items, rank=store) == ('c', 0)
+    # the last pick is now the first row
+    monkeypatch.setenv('FAKE_MENU_PICK', '0')
+    assert menu.select_index(items, rank=store) == (2, 0)
+    assert store.score('c') == pytest.approx(2)
+
+    async def stream() -> AsyncIterator[str]:
+        for item in items:
+            yield item
+
+    assert asyncio.run(menu.aselect(stream(), rank=store)) == ('c', 0)
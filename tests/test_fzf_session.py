@@ -0,0 +1,128 @@
+# test_fzf_session.py
+
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler
+from http.server import HTTPServer
+from typing import Iterator
+
+import pytest
+from pyselector.constants import UserCancel
+from pyselector.menus.fzf_session import FzfSession
+from pyselector.menus.fzf_session import action
+from pyselector.menus.fzf_session import parse_pick
+
+
+class StubServer(HTTPServer):
+    actions: list[str]
+    # written to the session's FIFO after a prompt is shown, as fzf's bindings would
+    picks: list[str]
+    session: FzfSession
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server: StubServer
+
+    def do_POST(self) -> None:  # noqa: N802
+        length = int(self.headers['Content-Length'])
+        body = self.rfile.read(length).decode()
+        self.server.actions.append(body)
+        if body.startswith('change-prompt') and self.server.picks:
+            session = self.server.session
+            _pick(session, self.server.picks.pop(0).format(gen=session._generation))
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def server() -> Iterator[StubServer]:
+    server = StubServer(('localhost', 0), StubHandler)
+    server.actions = []
+    server.picks = []
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.01}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def session(server: StubServer) -> Iterator[FzfSession]:
+    session = FzfSession(port=server.server_address[1], spawn=False)
+    server.session = session
+    yield session
+    session.close()
+
+
+def _pick(session: FzfSession, line: str) -> None:
+    fd = os.open(session.picks_path, os.O_WRONLY)
+    os.write(fd, line.encode())
+    os.close(fd)
+
+
+@pytest.mark.parametrize(
+    ('name', 'arg', 'expected'),
+    (
+        ('change-prompt', '> ', 'change-prompt(> )'),
+        ('change-query', 'a)b', 'change-query[a)b]'),
+    ),
+)
+def test_action(name, arg, expected) -> None:
+    assert action(name, arg) == expected
+
+
+def test_parse_pick() -> None:
+    assert parse_pick('0 1:2') == (0, 1, [2])
+    assert parse_pick('10 3:1 3:3') == (10, 3, [1, 3])
+    assert parse_pick('1') == (1, None, [])
+
+
+def test_select(session: FzfSession, server: StubServer) -> None:
+    server.picks = ['0 {gen}:2\n']
+    assert session.select(['a', 'b', 'c'], prompt='letter> ') == ('c', 0)
+    reload, prompt = server.actions
+    assert reload.startswith('reload(cat ')
+    assert prompt == 'change-prompt(letter> )+change-query()'
+
+
+def test_select_reuses_session(session: FzfSession, server: StubServer) -> None:
+    server.picks = ['0 {gen}:0\n', '0 {gen}:1 {gen}:2\n']
+    assert session.select(['a', 'b']) == ('a', 0)
+    assert session.select(['x', 'y', 'z'], multi_select=True) == (['y', 'z'], 0)
+    assert len(server.actions) == 4
+
+
+def test_select_cancel(session: FzfSession, server: StubServer) -> None:
+    server.picks = [f'{UserCancel(1)} {{gen}}:0\n']
+    assert session.select(['a']) == (None, UserCancel(1))
+
+
+def test_select_timeout(session: FzfSession) -> None:
+    assert session.select(['a'], timeout=0.05) == (None, UserCancel(1))
+
+
+def test_late_picks_are_discarded(session: FzfSession, server: StubServer) -> None:
+    assert session.select(['a', 'b'], timeout=0.05) == (None, UserCancel(1))
+    # picked after the first selection timed out, before the next one
+    _pick(session, '0 1:0\n')
+    # picked on the first list, while the second one was loading
+    server.picks = ['0 1:0\n0 {gen}:1\n']
+    assert session.select(['x', 'y']) == ('y', 0)
+
+
+def test_fzf_exited(session: FzfSession) -> None:
+    session.proc = subprocess.Popen([sys.executable, '-c', ''])
+    session.proc.wait()
+    assert session.read_pick() == (UserCancel(1), [])
+
+
+def test_reload_file(session: FzfSession) -> None:
+    path = session.reload([1, 2], preprocessor=lambda x: f'item {x}')
+    assert path.read_text() == '1:0\titem 1\n1:1\titem 2\n'
@@ -0,0 +1,113 @@
+# test_headless.py
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import AsyncIterator
+from typing import Sequence
+
+import pytest
+from pyselector import Menu
+from pyselector.menus.headless import Answer
+from pyselector.menus.headless import Headless
+from pyselector.menus.headless import HeadlessError
+from pyselector.menus.headless import Script
+from pyselector.menus.headless import match
+
+ITEMS = ['main', 'feature/login', 'fix/main-crash', 'release']
+
+
+def test_registered() -> None:
+    assert isinstance(Menu.get('headless'), Headless)
+
+
+def test_match() -> None:
+    assert match(ITEMS, 'main') == [0, 2]
+    assert match(ITEMS, 'FLG') == [1]
+    assert match(ITEMS, 'FLG', case_sensitive=True) == []
+    assert match(ITEMS, '') == [0, 1, 2, 3]
+
+
+def test_query_policy() -> None:
+    menu = Headless(policy='login')
+    assert menu.select(ITEMS) == ('feature/login', 0)
+    assert menu.select_index(ITEMS) == (1, 0)
+    assert menu.select(ITEMS, policy='ma', multi_select=True) == (['main', 'fix/main-crash'], 0)
+    # no match, like a custom entry typed in rofi
+    assert menu.select(ITEMS, policy='zzz') == ('zzz', 1)
+    assert menu.select_index(ITEMS, policy='zzz') == (None, 1)
+    assert menu.select(ITEMS, policy='zzz', multi_select=True) == ('zzz', 1)
+    assert menu.select_index(ITEMS, policy='zzz', multi_select=True) == (None, 1)
+
+
+def test_no_policy(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv('PYSELECTOR_HEADLESS_SCRIPT', raising=False)
+    menu = Menu.get('headless')
+    # nothing is accepted on its own, e.g. in CI
+    with pytest.raises(HeadlessError, match='no policy'):
+        menu.confirm('Delete everything?')
+    assert menu.select(ITEMS, policy='') == ('main', 0)
+
+
+def test_callback_policy() -> None:
+    seen: list[tuple[str, Sequence[str]]] = []
+
+    def policy(prompt: str, lines: Sequence[str]) -> int | None:
+        seen.append((prompt, lines))
+        return None if prompt == 'cancel> ' else len(lines) - 1
+
+    menu = Headless(policy=policy)
+    assert menu.select([1, 2, 3], prompt='num> ', preprocessor=lambda n: f'\033[1m{n}\033[0m') == (3, 0)
+    assert seen == [('num> ', ['1', '2', '3'])]
+    assert menu.select(ITEMS, prompt='cancel> ') == (None, 1)
+    assert menu.confirm('sure?', options=('No', 'Yes'))
+    with pytest.raises(HeadlessError, match='out of range'):
+        menu.select(ITEMS, policy=lambda *_: 10)
+
+
+def test_script_and_keybinds(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    path = tmp_path / 'script.json'
+    script = ['release', {'query': 'login', 'key': 'alt-n'}, [0, 3], {'pick': 1}, None, 'branch-x']
+    path.write_text(json.dumps(script))
+    monkeypatch.setenv('PYSELECTOR_HEADLESS_SCRIPT', str(path))
+    menu = Menu.get('headless')
+    key = menu.keybind.add('alt-n', 'new')
+    assert key.code == 10
+
+    assert menu.select(ITEMS) == ('release', 0)
+    assert menu.select(ITEMS) == ('feature/login', key.code)
+    assert menu.select(ITEMS, multi_select=True) == (['main', 'release'], 0)
+    assert menu.select(ITEMS) == ('feature/login', 0)
+    assert menu.select(ITEMS) == (None, 1)
+    assert menu.input('name> ') == 'branch-x'
+    with pytest.raises(HeadlessError, match='script ended'):
+        menu.select(ITEMS)
+
+    with pytest.raises(HeadlessError, match='alt-x'):
+        menu.select(ITEMS, policy=Script([Answer(key='alt-x')]))
+    with pytest.raises(HeadlessError, match='invalid answer'):
+        Script([{'index': 2}])
+
+
+def test_streams() -> None:
+    async def stream() -> AsyncIterator[str]:
+        for item in ITEMS:
+            yield item
+
+    menu = Headless(policy='rel')
+    assert menu.select(iter(ITEMS)) == ('release', 0)
+    assert menu.select(stream()) == ('release', 0)
+    assert asyncio.run(menu.aselect(stream())) == ('release', 0)
+    assert asyncio.run(menu.aselect_index(ITEMS)) == (3, 0)
+    assert asyncio.run(menu.ainput()) == 'rel'
+
+
+def test_thousands_per_second() -> None:
+    menu = Headless(policy='fix')
+    start = time.perf_counter()
+    for _ in range(2_000):
+        menu.select(ITEMS)
+    assert time.perf_counter() - start < 2
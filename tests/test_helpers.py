@@ -1,6 +1,12 @@
 # test_helpers.py
 
+import asyncio
+import io
+import os
 import shutil
+import sys
+import time
+from pathlib import Path
 from typing import Any
 from typing import Iterable
 from typing import NamedTuple
@@ -10,6 +16,7 @@ from typing import Union
 import pytest
 from pyselector import helpers
 from pyselector.exc import ExecutableNotFoundError
+from pyselector.selector import Menu
 
 
 class Case(NamedTuple):
@@ -49,6 +56,14 @@ def test_check_command_failure() -> None:
             input=[],
             expected=None,
         ),
+        Case(
+            input=(str(i) for i in range(3)),
+            expected=None,
+        ),
+        Case(
+            input=None,
+            expected=ValueError,
+        ),
     ],
 )
 def test_check_type(input, expected):
@@ -58,3 +73,212 @@ def test_check_type(input, expected):
 
     with pytest.raises(expected):
         helpers.check_type(input)
+
+
+def test_check_type_async_iterable() -> None:
+    async def agen():
+        yield 'a'
+
+    assert helpers.check_type(agen()) is None
+
+
+def test_item_stream_consumed() -> None:
+    stream = helpers.ItemStream(iter(['a', 'b', 'c']))
+    assert list(stream) == ['a', 'b', 'c']
+    assert len(stream) == 3
+    assert stream[1] == 'b'
+
+
+def test_item_stream_async_iterable() -> None:
+    async def agen():
+        for i in range(3):
+            yield i
+
+    stream = helpers.ItemStream(agen())
+    assert list(stream) == [0, 1, 2]
+
+
+def test_item_stream_cancel_closes_producer() -> None:
+    closed = []
+
+    def gen():
+        try:
+            yield from range(100)
+        finally:
+            closed.append(True)
+
+    stream = helpers.ItemStream(gen())
+    for item in stream:
+        if item == 2:
+            stream.cancel()
+
+    assert stream.consumed == [0, 1, 2]
+    assert closed == [True]
+
+
+def test_write_stream() -> None:
+    stdin = io.BytesIO()
+    stdin.close = lambda: None
+    stream = helpers.ItemStream(iter([1, 2, 3]))
+    helpers.write_stream(stdin, stream, str, 'utf-8', index_delimiter='\t')
+    assert stdin.getvalue() == b'0\t1\n1\t2\n2\t3\n'
+
+
+def test_as_indexable() -> None:
+    items = ['a', 'b']
+    assert helpers.as_indexable(items) is items
+    assert isinstance(helpers.as_indexable(iter(items)), helpers.ItemStream)
+
+
+FAKE_MENU = 'import sys; lines = sys.stdin.read().splitlines(); print(lines[1])'
+
+
+def test_arun() -> None:
+    args = [sys.executable, '-c', FAKE_MENU]
+    selected, code = asyncio.run(helpers.arun(args, ['a', 'b', 'c'], str))
+    assert selected == 'b'
+    assert code == 0
+
+
+def test_arun_stream() -> None:
+    async def agen():
+        for i in range(3):
+            yield i
+
+    stream = helpers.ItemStream(agen())
+    args = [sys.executable, '-c', FAKE_MENU]
+    selected, _ = asyncio.run(helpers.arun(args, stream, str, index_delimiter='\t'))
+    assert selected == '1\t1'
+    assert stream[1] == 1
+
+
+def test_arun_cancel_kills_menu() -> None:
+    args = [sys.executable, '-c', 'import time; time.sleep(30)']
+
+    async def main() -> None:
+        task = asyncio.ensure_future(helpers.arun(args, ['a'], str))
+        await asyncio.sleep(0.2)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    start = time.monotonic()
+    asyncio.run(main())
+    assert time.monotonic() - start < 5
+
+
+def test_default_preprocessor() -> None:
+    assert helpers.default_preprocessor('a') == 'a'
+    assert helpers.default_preprocessor(b'b') == 'b'
+    assert helpers.default_preprocessor(memoryview(b'c')) == 'c'
+    assert helpers.default_preprocessor(1) == '1'
+
+
+def test_encode_items() -> None:
+    encode = helpers.encode_items
+    assert encode(['a', 'b'], helpers.default_preprocessor, 'utf-8') == [b'a\nb']
+    assert encode([1, 'b'], helpers.default_preprocessor, 'utf-8') == [b'1\nb']
+    assert encode([b'a', b'b'], helpers.default_preprocessor, 'utf-8') == [b'a\nb\n']
+    assert b''.join(encode([b'a', b'b'], helpers.default_preprocessor, 'utf-8', '\t')) == b'0\ta\n1\tb\n'
+    assert encode(['a'], str.upper, 'utf-8', '\t') == [b'0\tA']
+
+
+def test_encode_items_gathers_large_buffers(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(helpers, 'WRITEV_MIN_ITEM_SIZE', 2)
+    large = memoryview(b'large')
+    buffers = helpers.encode_items([large, b'xy'], helpers.default_preprocessor, 'utf-8')
+    assert buffers == [large, b'\n', b'xy', b'\n']
+    assert buffers[0] is large
+
+
+@pytest.mark.parametrize('size', (1, 4096))
+@pytest.mark.parametrize('items', ([b'a', 'b'], [b'a\nb'], [b'a', b'b\r']))
+def test_encode_items_checks_buffers(monkeypatch: pytest.MonkeyPatch, items, size) -> None:
+    monkeypatch.setattr(helpers, 'WRITEV_MIN_ITEM_SIZE', size)
+    with pytest.raises(ValueError):
+        helpers.encode_items(items, helpers.default_preprocessor, 'utf-8')
+    with pytest.raises(ValueError):
+        helpers.encode_items(items, helpers.default_preprocessor, 'utf-8', '\t')
+
+
+@pytest.mark.parametrize('items', (['a', 'b\nc'], ['a\r', 'b'], [1, 'b\nc']))
+def test_encode_items_checks_lines(items) -> None:
+    with pytest.raises(ValueError, match='CR/LF'):
+        helpers.encode_items(items, helpers.default_preprocessor, 'utf-8')
+    with pytest.raises(ValueError, match='CR/LF'):
+        helpers.encode_items(items, str, 'utf-8', '\t')
+    assert helpers.encode_items(items, str, 'utf-8', trusted=True) == ['\n'.join(map(str, items)).encode()]
+
+
+def test_arun_checks_lines() -> None:
+    args = [sys.executable, '-c', FAKE_MENU]
+    with pytest.raises(ValueError, match='CR/LF'):
+        asyncio.run(helpers.arun(args, ['a', 'b\nc'], str))
+
+
+def test_line_buffer() -> None:
+    lines = helpers.LineBuffer(b'a\nbb\n\nccc')
+    assert len(lines) == 4
+    assert list(lines) == [b'a', b'bb', b'', b'ccc']
+    assert lines[-1] == b'ccc'
+    with pytest.raises(IndexError):
+        lines[4]
+    assert b''.join(lines.buffers()) == b'a\nbb\n\nccc\n'
+    assert b''.join(lines.buffers('\t')) == b'0\ta\n1\tbb\n2\t\n3\tccc\n'
+
+
+def test_write_buffers(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(helpers, 'IOV_MAX', 2)
+    read_fd, write_fd = os.pipe()
+    buffers = [b'a', memoryview(b'bc'), b'', b'def', b'\n']
+    try:
+        assert helpers.write_buffers(write_fd, buffers) == 7
+        assert os.read(read_fd, 100) == b'abcdef\n'
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+
+
+def test_run_bytes() -> None:
+    args = [sys.executable, '-c', FAKE_MENU]
+    assert helpers.run(args, [b'a', b'b'], helpers.default_preprocessor) == ('b', 0)
+    assert helpers.run(args, helpers.LineBuffer(b'a\nb\n'), helpers.default_preprocessor) == ('b', 0)
+
+
+@pytest.mark.parametrize('size', (1, 4096))
+def test_encode_items_nul(monkeypatch: pytest.MonkeyPatch, size) -> None:
+    monkeypatch.setattr(helpers, 'WRITEV_MIN_ITEM_SIZE', size)
+    encode = helpers.encode_items
+    nul = helpers.NUL
+    assert encode(['a\nb', 'c'], helpers.default_preprocessor, 'utf-8', separator=nul) == [b'a\nb\0c']
+    assert b''.join(encode([b'a\r\nb', b'c'], helpers.default_preprocessor, 'utf-8', separator=nul)) == b'a\r\nb\0c\0'
+    assert b''.join(encode(helpers.LineBuffer(b'a\nb'), helpers.default_preprocessor, 'utf-8', separator=nul)) == (
+        b'a\0b\0'
+    )
+    with pytest.raises(ValueError):
+        encode([b'a\0b'], helpers.default_preprocessor, 'utf-8', separator=nul)
+
+
+def test_single_line() -> None:
+    flatten = helpers.single_line(helpers.default_preprocessor)
+    assert flatten('a\nb\r\nc') == 'a↵b↵c'
+    assert flatten(b'a\nb') == 'a↵b'
+    assert flatten(1) == '1'
+
+
+@pytest.mark.parametrize('name', ('rofi', 'dmenu', 'fzf'))
+def test_nul_items_round_trip(name: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    fake_menus = Path(__file__).resolve().parents[1] / 'benchmarks' / 'bin'
+    monkeypatch.setenv('PATH', str(fake_menus), prepend=os.pathsep)
+    monkeypatch.setenv('FAKE_MENU_PICK', '1')
+    menu = Menu.get(name)
+    menu.keybind.add('alt-n', 'new')
+    items = ['first\nitem', 'second\r\nitem\n', b'third']
+    assert menu.select(items, nul=True) == ('second\r\nitem\n', 0)
+    assert menu.select_index([b'a\nb', b'c\nd'], nul=True) == (1, 0)
+
+
+def test_remove_ansi_codes() -> None:
+    assert helpers.remove_ansi_codes('\033[38;2;1;2;3ma\033[0m b') == 'a b'
+    assert helpers.remove_ansi_codes_all(['\033[1ma\033[0m', 'b', '']) == ['a', 'b', '']
+    assert helpers.remove_ansi_codes_all(['\0\033[1ma']) == ['\0a']
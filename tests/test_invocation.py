@@ -0,0 +1,72 @@
+# test_invocation.py
+
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+from pyselector.invocation import InvocationCache
+from pyselector.key_manager import KeyManager
+
+
+class FakeMenu:
+    def __init__(self) -> None:
+        self.keybind = KeyManager()
+        self.builds = 0
+
+    def _build_args(self, prompt: str = '> ', **kwargs: Any) -> list[str]:
+        self.builds += 1
+        args = ['menu', '-p', prompt]
+        args.extend(f'-kb-{k.id}' for k in self.keybind.current if not k.hidden)
+        kwargs.pop('lines', None)
+        return args
+
+
+@pytest.fixture
+def menu() -> FakeMenu:
+    return FakeMenu()
+
+
+def test_args_built_once(menu: FakeMenu) -> None:
+    cache = InvocationCache(menu)
+    first = cache.args(prompt='a> ', lines=5)
+    second = cache.args(prompt='a> ', lines=5)
+    assert first == second == ['menu', '-p', 'a> ']
+    assert menu.builds == 1
+
+
+def test_args_returns_copy(menu: FakeMenu) -> None:
+    cache = InvocationCache(menu)
+    cache.args(prompt='a> ').append('-format')
+    assert cache.args(prompt='a> ') == ['menu', '-p', 'a> ']
+
+
+def test_options_changed(menu: FakeMenu) -> None:
+    cache = InvocationCache(menu)
+    cache.args(prompt='a> ')
+    assert cache.args(prompt='b> ') == ['menu', '-p', 'b> ']
+    assert menu.builds == 2
+
+
+def test_keybinds_changed(menu: FakeMenu) -> None:
+    cache = InvocationCache(menu)
+    cache.args(prompt='a> ')
+    key = menu.keybind.add('alt-a', 'testing')
+    assert cache.args(prompt='a> ') == ['menu', '-p', 'a> ', f'-kb-{key.id}']
+    key.hide()
+    assert cache.args(prompt='a> ') == ['menu', '-p', 'a> ']
+    assert menu.builds == 3
+
+
+def test_unhashable_options(menu: FakeMenu) -> None:
+    cache = InvocationCache(menu)
+    cache.args(prompt='a> ', extra=[{'a': 1}])
+    cache.args(prompt='a> ', extra=[{'a': 1}])
+    assert menu.builds == 1
+
+
+def test_maxsize(menu: FakeMenu) -> None:
+    cache = InvocationCache(menu, maxsize=2)
+    for prompt in ('a', 'b', 'c', 'a'):
+        cache.args(prompt=prompt)
+    assert menu.builds == 4
@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import sys
+
 import pytest
 from pyselector.key_manager import Keybind
 from pyselector.key_manager import KeybindError
@@ -117,3 +119,45 @@ def test_toggle_hidden_keybinds(key_manager: KeyManager) -> None:
     key_manager.toggle_hidden()
     for keybind in key_manager.hidden_keys():
         assert keybind.hidden
+
+
+def test_lookups(key_manager: KeyManager) -> None:
+    save = key_manager.add('CTRL+S', 'Save file')
+    undo = key_manager.add('CTRL+Z', 'Undo')
+    assert key_manager.get_by_bind('CTRL+Z') is undo
+    assert key_manager.get_by_code(save.code) is save
+    assert key_manager.get_by_id(undo.id) is undo
+
+    # a copy, changing it does not change the registered keybinds
+    key_manager.current.clear()
+    assert key_manager.current == [save, undo]
+    key_manager.unregister(save.code)
+    assert key_manager.current == [undo]
+    with pytest.raises(KeybindError):
+        key_manager.get_by_bind('CTRL+S')
+    with pytest.raises(KeybindError):
+        key_manager.get_by_id(save.id)
+
+
+def test_counters_per_instance() -> None:
+    first = KeyManager()
+    first.add('CTRL+S', 'Save file')
+    first.add('CTRL+Z', 'Undo')
+    assert KeyManager().add('CTRL+S', 'Save file').code == 1
+
+
+def test_toggle_hidden_is_bounded(key_manager: KeyManager) -> None:
+    key = key_manager.add('CTRL+S', 'Save file')
+    for _ in range(3):
+        key_manager.toggle_hidden()
+        key.show()
+    assert list(key_manager.original_states.values()) == [key]
+    key_manager.toggle_hidden(restore=True)
+    assert not key.hidden
+    assert key_manager.original_states == {}
+
+
+def test_keybind_is_slotted(key_manager: KeyManager) -> None:
+    key = key_manager.add('CTRL+S', 'Save file')
+    if sys.version_info >= (3, 10):
+        assert not hasattr(key, '__dict__')
@@ -0,0 +1,103 @@
+# test_mapped.py
+
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+from pyselector import helpers
+from pyselector import mapped
+from pyselector import tracing
+from pyselector.mapped import Line
+from pyselector.mapped import MappedFile
+from pyselector.selector import Menu
+
+FAKE_MENUS = Path(__file__).resolve().parents[1] / 'benchmarks' / 'bin'
+FAKE_MENU = 'import sys; lines = sys.stdin.read().splitlines(); print(lines[1])'
+
+
+@pytest.fixture
+def path(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    path = tmp_path / 'items.log'
+    path.write_bytes(b'first\nsecond line\n\nlast')
+    return path
+
+
+@pytest.fixture
+def lines(path: Path) -> Iterator[MappedFile]:
+    with MappedFile(path) as lines:
+        yield lines
+
+
+def test_lines(lines: MappedFile) -> None:
+    assert len(lines) == 4
+    assert list(lines) == [b'first', b'second line', b'', b'last']
+    assert lines.locate(1) == Line(2, 6, b'second line')
+    assert lines.locate(-1) == Line(4, 19, b'last')
+    assert lines.find('last') == 3
+    assert lines.find(b'') == 2
+    assert lines.find('second') == -1
+
+
+def test_empty_file(tmp_path: Path) -> None:
+    path = tmp_path / 'empty'
+    path.touch()
+    with MappedFile(path) as lines:
+        assert len(lines) == 0
+        assert lines.find('x') == -1
+
+
+def test_persisted_index(path: Path) -> None:
+    with MappedFile(path, persist=True) as lines:
+        assert len(lines) == 4
+    assert mapped.index_path(path).exists()
+
+    with MappedFile(path, persist=True) as lines:
+        assert lines._load_index() == lines.offsets
+
+    path.write_bytes(b'changed\n')
+    os.utime(path, ns=(0, 0))
+    with MappedFile(path, persist=True) as lines:
+        assert lines._load_index() is None
+        assert list(lines) == [b'changed']
+
+
+def test_run_reads_file_as_stdin(lines: MappedFile) -> None:
+    args = [sys.executable, '-c', FAKE_MENU]
+    with tracing.capture() as spans:
+        assert helpers.run(args, lines, helpers.default_preprocessor) == ('second line', 0)
+    assert 'write_stdin' not in [s.name for s in spans]
+    # the file is read from the start on each run
+    assert helpers.run(args, lines, helpers.default_preprocessor) == ('second line', 0)
+
+
+@pytest.mark.parametrize('name', ('rofi', 'dmenu', 'fzf'))
+def test_menu_select_index(name: str, lines: MappedFile, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv('PATH', str(FAKE_MENUS), prepend=os.pathsep)
+    monkeypatch.setenv('FAKE_MENU_PICK', '1')
+    menu = Menu.get(name)
+    assert menu.select_index(lines) == (1, 0)
+    assert menu.select(lines) == (b'second line', 0)
+
+
+@pytest.mark.parametrize(
+    ('name', 'expected'),
+    (
+        ('rofi', Line(3, 11, b'same')),
+        ('fzf', Line(3, 11, b'same')),
+        # dmenu only prints the text, the first equal line is returned
+        ('dmenu', Line(1, 0, b'same')),
+    ),
+)
+def test_menu_duplicate_lines(name: str, expected: Line, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv('PATH', str(FAKE_MENUS), prepend=os.pathsep)
+    monkeypatch.setenv('FAKE_MENU_PICK', '2')
+    path = tmp_path / 'items.log'
+    path.write_bytes(b'same\nother\nsame\n')
+    with MappedFile(path) as lines:
+        idx, _ = Menu.get(name).select_index(lines)
+        assert lines.locate(idx) == expected
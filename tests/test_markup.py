@@ -0,0 +1,48 @@
+# test_markup.py
+
+from __future__ import annotations
+
+import pytest
+from pyselector import markup
+from pyselector.markup import PangoSpan
+from pyselector.markup import PangoStyle
+
+
+def test_escape() -> None:
+    assert markup.escape('plain') == 'plain'
+    assert markup.escape('a & <b>') == 'a &amp; &lt;b&gt;'
+    assert markup.escape_all(['<a>', '', 'b&c']) == ['&lt;a&gt;', '', 'b&amp;c']
+    assert markup.escape_all(iter(['x\0<y'])) == ['x\0&lt;y']
+    assert markup.escape_all([]) == []
+
+
+def test_style() -> None:
+    style = PangoStyle(foreground='red', weight='bold', font_desc='Sans "Bold"', size=None)
+    assert style.prefix == '<span foreground="red" weight="bold" font_desc="Sans &quot;Bold&quot;">'
+    assert style.render('a<b') == f'{style.prefix}a&lt;b</span>'
+    assert style.render_all(['a', '<b>']) == [style.render('a'), style.render('<b>')]
+    assert PangoStyle(sub=True, escape=False).render('<i>x</i>') == '<span><sub><i>x</i></sub></span>'
+    assert style == PangoStyle(foreground='red', weight='bold', font_desc='Sans "Bold"')
+    assert 'size' not in style.attrs
+
+
+def test_style_unknown_attribute() -> None:
+    with pytest.raises(ValueError, match='colour'):
+        PangoStyle(colour='red')
+
+
+def test_span() -> None:
+    span = PangoSpan('text', foreground='red', weight='bold', sub=True)
+    assert str(span) == '<span foreground="red" weight="bold"><sub>text</sub></span>'
+    assert span.compile() == PangoStyle(foreground='red', weight='bold', sub=True, escape=False)
+    assert hash(span) == hash(PangoSpan('text', foreground='red', weight='bold'))
+    assert str(PangoSpan('text', markup=False)) == 'text'
+
+
+def test_span_ansi_renders_once() -> None:
+    span = PangoSpan('text', markup=False, ansi=True, fg_ansi='red', bg_ansi='black')
+    first = str(span)
+    # rendering again does not apply the colors to the text a second time
+    assert str(span) == first
+    assert span.text == 'text'
+    assert first.count('\033[0m') == 2
@@ -0,0 +1,89 @@
+# test_prefilter.py
+
+from __future__ import annotations
+
+import importlib.util
+
+import pytest
+from pyselector.prefilter import Prefilter
+from pyselector.prefilter import fuzzy_gaps
+
+HAS_NUMPY = importlib.util.find_spec('numpy') is not None
+
+ITEMS = [
+    'src/pyselector/helpers.py',
+    'README.md',
+    'src/pyselector/menus/rofi.py',
+    'tests/test_helpers.py',
+    'scripts/py',
+    'Über/Café.txt',
+    'src/py',
+]
+
+engines = pytest.mark.parametrize(
+    'use_numpy',
+    [False, pytest.param(True, marks=pytest.mark.skipif(not HAS_NUMPY, reason='numpy not installed'))],
+)
+
+
+class RecordingMenu:
+    def __init__(self, pick: int | list[int] | None, code: int = 0) -> None:
+        self.pick = pick
+        self.code = code
+        self.shown: list[str] = []
+        self.kwargs: dict = {}
+
+    def select_index(self, items: list[str], **kwargs) -> tuple[int | list[int] | None, int]:
+        self.shown = items
+        self.kwargs = kwargs
+        return self.pick, self.code
+
+
+def test_fuzzy_gaps() -> None:
+    assert fuzzy_gaps('src/py', 'srcpy') == 1
+    assert fuzzy_gaps('abc', 'abc') == 0
+    assert fuzzy_gaps('abc', 'cb') is None
+    # tightened from the end: the second 'a' starts the match
+    assert fuzzy_gaps('a__ab', 'ab') == 0
+
+
+@engines
+def test_top(use_numpy: bool) -> None:
+    prefilter = Prefilter(ITEMS, use_numpy=use_numpy)
+    assert prefilter.top('srcpy') == [6, 0, 2]
+    assert prefilter.top('SRC PY', limit=2) == [6, 0]
+    assert prefilter.top('spy') == [4, 3, 6, 0, 2]
+    assert prefilter.top('café') == [5]
+    assert prefilter.top('zzz') == []
+    assert prefilter.top('') == list(range(len(ITEMS)))
+    assert Prefilter(ITEMS, case_sensitive=True, use_numpy=use_numpy).top('readme') == []
+
+
+@engines
+def test_batches_match_one_pass(use_numpy: bool) -> None:
+    items = [f'item/{i % 7}/{i}' for i in range(500)]
+    whole = Prefilter(items, limit=20, use_numpy=use_numpy).top('i3')
+    assert Prefilter(items, limit=20, batch_size=16, use_numpy=use_numpy).top('i3') == whole
+    assert len(whole) == 20
+
+
+@pytest.mark.skipif(not HAS_NUMPY, reason='numpy not installed')
+def test_engines_agree() -> None:
+    items = [f'{i:x}/{i * 7919 % 1000:03}/{"abc"[i % 3] * (i % 5)}' for i in range(3000)]
+    for query in ('a1', '9/b', 'ff0', 'c0c'):
+        expected = Prefilter(items, limit=50, use_numpy=False).top(query)
+        assert Prefilter(items, limit=50, batch_size=256, use_numpy=True).top(query) == expected
+
+
+def test_select_maps_back() -> None:
+    prefilter = Prefilter(ITEMS)
+    menu = RecordingMenu(pick=1)
+    assert prefilter.select(menu, filter='srcpy', prompt='> ') == (ITEMS[0], 0)
+    assert menu.shown == ['src/py', ITEMS[0], ITEMS[2]]
+    assert menu.kwargs == {'filter': 'srcpy', 'prompt': '> '}
+
+    # the previous query is reused
+    menu = RecordingMenu(pick=[0, 2])
+    assert prefilter.select_index(menu, multi_select=True) == ([6, 2], 0)
+
+    assert prefilter.select(RecordingMenu(pick=None, code=1), query='md') == (None, 1)
@@ -0,0 +1,108 @@
+# test_rofi_script.py
+
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+from pyselector.constants import UserCancel
+from pyselector.menus.rofi_script import RofiScript
+
+# plays back `FAKE_ROFI_PICKS` ('<retv>:<row>,...') through the script
+# protocol, and logs the rows it was sent to `FAKE_ROFI_LOG`
+FAKE_ROFI = """\
+import json, os, shlex, subprocess, sys
+
+args = sys.argv[1:]
+script = shlex.split(args[args.index('-modi') + 1].partition(':')[2])
+
+
+def call(retv, info=None, arg=None):
+    env = dict(os.environ, ROFI_RETV=str(retv))
+    if info is not None:
+        env['ROFI_INFO'] = info
+    out = subprocess.run(script + ([arg] if arg else []), env=env, stdout=subprocess.PIPE).stdout.decode()
+    rows = [line for line in out.split('\\n') if line and not line.startswith('\\0')]
+    options = [line[1:].split('\\x1f') for line in out.split('\\n') if line.startswith('\\0')]
+    with open(os.environ['FAKE_ROFI_LOG'], 'a') as f:
+        f.write(json.dumps({'rows': rows, 'options': dict(options)}) + '\\n')
+    return rows
+
+
+rows = call(0)
+picks = os.environ['FAKE_ROFI_PICKS']
+for pick in picks.split(',') if picks else []:
+    retv, row = pick.split(':')
+    if int(retv) == 2:
+        rows = call(2, arg=row)
+    else:
+        text, _, info = rows[int(row)].partition('\\0info\\x1f')
+        rows = call(int(retv), info, text)
+    if not rows:
+        break
+sys.exit(1 if rows else 0)
+"""
+
+
+@pytest.fixture
+def log_file(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    rofi = bin_dir / 'rofi'
+    rofi.write_text(f'#!{sys.executable}\n{FAKE_ROFI}')
+    rofi.chmod(0o755)
+    monkeypatch.setenv('PATH', str(bin_dir), prepend=':')
+    log_file = tmp_path / 'rofi.log'
+    monkeypatch.setenv('FAKE_ROFI_LOG', str(log_file))
+    return log_file
+
+
+@pytest.fixture
+def menu() -> Iterator[RofiScript]:
+    menu = RofiScript()
+    yield menu
+    menu.close()
+
+
+def _calls(log_file: Path) -> list[dict]:
+    return [json.loads(line) for line in log_file.read_text().splitlines()]
+
+
+def test_select_levels(menu: RofiScript, log_file: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv('FAKE_ROFI_PICKS', '1:1,1:0')
+    assert menu.select(['a', 'b', 'c'], prompt='letter> ') == ('b', 0)
+    proc = menu.proc
+    assert menu.select([1, 2], prompt='number> ', preprocessor=lambda x: f'n{x}') == (1, 0)
+    # the same rofi shows both levels
+    assert menu.proc is proc
+    assert menu.close() == 0
+
+    first, second, last = _calls(log_file)
+    assert first['rows'] == ['a\0info\x1f0', 'b\0info\x1f1', 'c\0info\x1f2']
+    assert first['options']['prompt'] == 'letter> '
+    assert second['rows'] == ['n1\0info\x1f0', 'n2\0info\x1f1']
+    assert second['options']['prompt'] == 'number> '
+    assert last['rows'] == []
+
+
+def test_select_keybind(menu: RofiScript, log_file: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv('FAKE_ROFI_PICKS', '10:2')
+    menu.keybind.add(bind='alt-n', description='new', action=lambda: None)
+    assert menu.select(['a', 'b', 'c']) == ('c', 10)
+    assert 'alt-n' in _calls(log_file)[0]['options']['message']
+
+
+@pytest.mark.usefixtures('log_file')
+def test_select_custom_input(menu: RofiScript, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv('FAKE_ROFI_PICKS', '2:typed')
+    assert menu.select(['a']) == ('typed', UserCancel(1))
+
+
+@pytest.mark.usefixtures('log_file')
+def test_select_cancel(menu: RofiScript, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv('FAKE_ROFI_PICKS', '')
+    assert menu.select(['a']) == (None, UserCancel(1))
+    assert menu.proc is None
@@ -0,0 +1,76 @@
+# test_select_index.py
+
+from __future__ import annotations
+
+import asyncio
+import os
+from pathlib import Path
+
+import pytest
+from pyselector import Menu
+from pyselector.menus import fzf
+from pyselector.menus import rofi
+
+FAKE_MENUS = Path(__file__).resolve().parents[1] / 'benchmarks' / 'bin'
+ITEMS = ['Option 1', 'same label', 'same label']
+
+
+@pytest.fixture(autouse=True)
+def fake_menus(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv('PATH', str(FAKE_MENUS), prepend=os.pathsep)
+
+
+@pytest.mark.parametrize(
+    ('input', 'expected'),
+    (
+        (('0\tOption 1',), [0]),
+        (('0\tOption 1', '2\tOption 3'), [0, 2]),
+        (('1\tsame label', '2\tsame label'), [1, 2]),
+        (('not an index',), []),
+    ),
+)
+def test_fzf_parse_indices(input, expected) -> None:
+    assert fzf.parse_indices(input) == expected
+
+
+@pytest.mark.parametrize(
+    ('input', 'expected'),
+    (
+        ('0 Option 1', [0]),
+        ('0 Option 1\n2 Option 3', [0, 2]),
+        ('-1 custom input', [-1]),
+        ('1 same label\n2 same label', [1, 2]),
+    ),
+)
+def test_rofi_parse_indices(input, expected) -> None:
+    assert rofi.parse_indices(input) == expected
+
+
+@pytest.mark.parametrize('name', ('rofi', 'fzf'))
+def test_duplicate_labels(name: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv('FAKE_MENU_PICK', '2')
+    assert Menu.get(name).select_index(ITEMS) == (2, 0)
+
+
+@pytest.mark.parametrize('name', ('rofi', 'fzf'))
+@pytest.mark.parametrize('kwargs', ({}, {'multi_select': True}))
+def test_cancel(name: str, kwargs: dict[str, bool], monkeypatch: pytest.MonkeyPatch) -> None:
+    # every menu returns None on cancel, with or without multi_select
+    monkeypatch.setenv('FAKE_MENU_CODE', '1')
+    menu = Menu.get(name)
+    assert menu.select(ITEMS, **kwargs) == (None, 1)
+    assert menu.select_index(ITEMS, **kwargs) == (None, 1)
+
+
+@pytest.mark.parametrize('name', ('rofi', 'fzf'))
+@pytest.mark.parametrize('as_items', (list, iter))
+def test_multi_line_items(name: str, as_items, monkeypatch: pytest.MonkeyPatch) -> None:
+    # a row index can not be mapped back if an item spans several rows
+    monkeypatch.setenv('FAKE_MENU_PICK', '2')
+    menu = Menu.get(name)
+    items = ['a', 'b\nc', 'd']
+    with pytest.raises(ValueError, match='CR/LF'):
+        menu.select(as_items(items))
+    with pytest.raises(ValueError, match='CR/LF'):
+        asyncio.run(menu.aselect(as_items(items)))
+    assert menu.select(items, nul=True) == ('d', 0)
@@ -0,0 +1,77 @@
+# test_spawn.py
+
+from __future__ import annotations
+
+import os
+import signal
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from pyselector import helpers
+from pyselector import spawn
+
+ECHO = 'import sys; sys.stdout.write(sys.stdin.read().upper())'
+
+
+def test_pipes() -> None:
+    with spawn.SpawnedProcess([sys.executable, '-c', ECHO], stdin=spawn.PIPE, stdout=spawn.PIPE) as proc:
+        assert proc.stdin is not None
+        assert proc.stdout is not None
+        proc.stdin.write(b'a\nb\n')
+        proc.stdin.close()
+        assert proc.stdout.read() == b'A\nB\n'
+    assert proc.returncode == 0
+
+
+def test_file_as_stdin(tmp_path: Path) -> None:
+    path = tmp_path / 'items'
+    path.write_bytes(b'x\ny\n')
+    with path.open('rb') as f, spawn.SpawnedProcess([sys.executable, '-c', ECHO], stdin=f, stdout=spawn.PIPE) as proc:
+        assert proc.stdout is not None
+        assert proc.stdout.read() == b'X\nY\n'
+
+
+def test_exit_code_and_kill() -> None:
+    proc = spawn.SpawnedProcess([sys.executable, '-c', 'import sys; sys.exit(3)'])
+    assert proc.wait() == 3
+
+    proc = spawn.SpawnedProcess([sys.executable, '-c', 'import time; time.sleep(10)'])
+    assert proc.poll() is None
+    proc.kill()
+    assert proc.wait() == -signal.SIGKILL
+
+
+def test_no_descriptors_leak() -> None:
+    # a descriptor python opened, not inherited by the menu
+    read_end, write_end = os.pipe()
+    try:
+        code = f'import os, sys; sys.stdout.write(str(os.path.exists("/proc/self/fd/{read_end}")))'
+        with spawn.SpawnedProcess([sys.executable, '-c', code], stdout=spawn.PIPE) as proc:
+            assert proc.stdout is not None
+            assert proc.stdout.read() == b'False'
+    finally:
+        os.close(read_end)
+        os.close(write_end)
+
+
+@pytest.mark.skipif(not Path('/proc/self/status').exists(), reason='needs procfs')
+def test_sigpipe_is_restored() -> None:
+    # python ignores SIGPIPE, the menu must not inherit it
+    with spawn.SpawnedProcess(['grep', 'SigIgn', '/proc/self/status'], stdout=spawn.PIPE) as proc:
+        assert proc.stdout is not None
+        ignored = int(proc.stdout.read().split()[1], 16)
+    assert not ignored & 1 << (signal.SIGPIPE - 1)
+
+
+def test_missing_executable() -> None:
+    with pytest.raises(FileNotFoundError):
+        spawn.SpawnedProcess(['pyselector-missing-menu'], stdin=spawn.PIPE, stdout=spawn.PIPE)
+
+
+def test_popen_fallback(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv(spawn.SPAWN_ENV, 'popen')
+    assert isinstance(spawn.spawn([sys.executable, '-c', '']), subprocess.Popen)
+    args = [sys.executable, '-c', 'import sys; print(sys.stdin.read().splitlines()[1])']
+    assert helpers.run(args, ['a', 'b'], str) == ('b', 0)
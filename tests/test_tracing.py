@@ -0,0 +1,118 @@
+# test_tracing.py
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from pyselector import helpers
+from pyselector import tracing
+
+FAKE_MENU = 'import sys; lines = sys.stdin.read().splitlines(); print(lines[1])'
+
+
+def test_span_without_hooks() -> None:
+    assert not tracing.enabled()
+    with tracing.span('phase', items=1) as attrs:
+        attrs['bytes'] = 2
+    assert attrs == {'items': 1, 'bytes': 2}
+
+
+def test_capture() -> None:
+    with tracing.capture() as spans:
+        assert tracing.enabled()
+        with tracing.span('outer'), tracing.span('inner', items=3) as attrs:
+            attrs['bytes'] = 10
+    assert not tracing.enabled()
+    inner, outer = spans
+    assert (inner.name, inner.attrs) == ('inner', {'items': 3, 'bytes': 10})
+    assert outer.name == 'outer'
+    assert outer.start <= inner.start <= inner.end <= outer.end
+
+
+def test_span_error() -> None:
+    with tracing.capture() as spans, pytest.raises(KeyError), tracing.span('phase'):
+        raise KeyError
+    assert spans[0].attrs == {'error': 'KeyError'}
+
+
+def test_failing_hook_is_ignored() -> None:
+    def hook(_: tracing.Span) -> None:
+        raise RuntimeError
+
+    tracing.add_hook(hook)
+    try:
+        with tracing.capture() as spans, tracing.span('phase'):
+            pass
+    finally:
+        tracing.remove_hook(hook)
+    assert len(spans) == 1
+
+
+def test_run_phases() -> None:
+    args = [sys.executable, '-c', FAKE_MENU]
+    with tracing.capture() as spans:
+        assert helpers.run(args, ['a', 'b', 'c'], str) == ('b', 0)
+    assert [s.name for s in spans] == ['preprocess', 'spawn', 'write_stdin', 'wait']
+    assert spans[0].attrs == {'items': 3, 'bytes': 5, 'buffers': 1}
+
+
+def test_arun_phases() -> None:
+    args = [sys.executable, '-c', FAKE_MENU]
+    with tracing.capture() as spans:
+        assert asyncio.run(helpers.arun(args, ['a', 'b'], str)) == ('b', 0)
+    names = {s.name: s for s in spans}
+    assert set(names) == {'spawn', 'write_stdin', 'wait'}
+    assert names['write_stdin'].attrs == {'stream': False, 'items': 2, 'bytes': 3}
+
+
+def test_traced() -> None:
+    class Menu:
+        name = 'fake'
+
+        @tracing.traced()
+        def select(self) -> int:
+            return 1
+
+        @tracing.traced('aselect')
+        async def _aselect(self) -> int:
+            return 2
+
+    with tracing.capture() as spans:
+        assert Menu().select() == 1
+        assert asyncio.run(Menu()._aselect()) == 2
+    assert [(s.name, s.attrs) for s in spans] == [('select', {'menu': 'fake'}), ('aselect', {'menu': 'fake'})]
+
+
+def test_chrome_trace_exporter(tmp_path: Path) -> None:
+    exporter = tracing.ChromeTraceExporter(tmp_path / 'trace.json')
+    exporter(tracing.Span('spawn', 1.0, 1.5, {'command': 'rofi', 'args': ['-dmenu']}, 7))
+    exporter.flush()
+    (event,) = json.loads((tmp_path / 'trace.json').read_text())['traceEvents']
+    assert event['ph'] == 'X'
+    assert (event['ts'], event['dur'], event['tid']) == (1e6, 0.5e6, 7)
+    assert event['args'] == {'command': 'rofi', 'args': "['-dmenu']"}
+
+
+def test_chrome_trace_exporter_maxlen(tmp_path: Path) -> None:
+    exporter = tracing.ChromeTraceExporter(tmp_path / 'trace.json', maxlen=2)
+    for name in ('spawn', 'write_stdin', 'wait'):
+        exporter(tracing.Span(name, 1.0, 1.5, {}, 7))
+    exporter.flush()
+    events = json.loads((tmp_path / 'trace.json').read_text())['traceEvents']
+    assert [e['name'] for e in events] == ['write_stdin', 'wait']
+
+
+def test_trace_env(tmp_path: Path) -> None:
+    trace = tmp_path / 'trace.json'
+    env = dict(os.environ, PYSELECTOR_TRACE=str(trace))
+    env['PYTHONPATH'] = str(Path(helpers.__file__).parents[1])
+    code = f'from pyselector import helpers; helpers.run([{sys.executable!r}, "-c", {FAKE_MENU!r}], ["a", "b"], str)'
+    subprocess.run([sys.executable, '-c', code], env=env, check=True)
+    names = [e['name'] for e in json.loads(trace.read_text())['traceEvents']]
+    assert names == ['preprocess', 'spawn', 'write_stdin', 'wait']
@@ -0,0 +1,153 @@
+# test_tree.py
+
+from __future__ import annotations
+
+import threading
+from typing import Any
+
+import pytest
+from pyselector.key_manager import KeyManager
+from pyselector.tree import MenuTree
+from pyselector.tree import Node
+
+
+class ScriptedMenu:
+    """Answers `select_index` with the given (index, code) pairs, in order."""
+
+    def __init__(self, answers: list[tuple[int | None, int]]) -> None:
+        self.keybind = KeyManager()
+        self.answers = list(answers)
+        self.shown: list[list[bytes]] = []
+
+    def select_index(self, items: list[bytes], **_kwargs) -> tuple[int | None, int]:
+        self.shown.append(items)
+        return self.answers.pop(0)
+
+
+def make_tree(calls: list[str]) -> Node[str]:
+    def children(name: str, depth: int) -> Any:
+        def load() -> list[Node[str]]:
+            calls.append(name)
+            if depth == 2:
+                return [Node(f'{name}/{i}') for i in range(3)]
+            return [Node(f'{name}/{i}', children=children(f'{name}/{i}', depth + 1)) for i in range(3)]
+
+        return load
+
+    return Node('root', children=children('root', 0))
+
+
+def test_navigate_to_leaf() -> None:
+    calls: list[str] = []
+    menu = ScriptedMenu([(1, 0), (2, 0), (0, 0)])
+    with MenuTree(menu, make_tree(calls), prefetch=0) as tree:
+        node, code = tree.select()
+    assert node is not None
+    assert (node.value, code) == ('root/1/2/0', 0)
+    assert [n.value for n in tree.path] == ['root/1', 'root/1/2', 'root/1/2/0']
+    assert menu.shown[0] == [b'root/0', b'root/1', b'root/2']
+    assert calls == ['root', 'root/1', 'root/1/2']
+
+
+def test_back_does_not_reload_or_render() -> None:
+    calls: list[str] = []
+    # enter root/0, cancel back to root, enter root/0 again, then pick a grandchild
+    menu = ScriptedMenu([(0, 0), (None, 1), (0, 0), (1, 0), (2, 0)])
+    with MenuTree(menu, make_tree(calls), prefetch=0) as tree:
+        node, _ = tree.select()
+    assert node is not None
+    assert node.value == 'root/0/1/2'
+    assert calls == ['root', 'root/0', 'root/0/1']
+    # the same rendered lines are shown again
+    assert menu.shown[2] is menu.shown[0]
+    assert menu.shown[3] is menu.shown[1]
+    assert tree.info().hits == 1
+
+
+def test_back_key() -> None:
+    menu = ScriptedMenu([])
+    tree = MenuTree(menu, make_tree([]), prefetch=0, back_key='alt-h')
+    assert tree.back is not None
+    menu.answers = [(0, 0), (1, tree.back.code), (None, 1)]
+    assert tree.select() == (None, 1)
+    assert tree.path == []
+
+
+def test_cancel_at_root() -> None:
+    menu = ScriptedMenu([(None, 1)])
+    assert MenuTree(menu, make_tree([]), prefetch=0).select() == (None, 1)
+
+
+def test_bounded_cache() -> None:
+    calls: list[str] = []
+    menu = ScriptedMenu([(0, 0), (None, 1), (1, 0), (None, 1), (0, 0), (None, 1), (None, 1)])
+    tree = MenuTree(menu, make_tree(calls), maxsize=1, prefetch=0)
+    tree.select()
+    assert tree.info().currsize == 1
+    # root/0 was evicted by root/1, the root level is held while it is shown
+    assert calls == ['root', 'root/0', 'root/1', 'root/0']
+
+
+def test_prefetch_siblings() -> None:
+    calls: list[str] = []
+    loaded = threading.Event()
+
+    class WaitingMenu(ScriptedMenu):
+        def select_index(self, items: list[bytes], **kwargs) -> tuple[int | None, int]:
+            # the user is on the root level while its children load
+            if len(self.shown) == 0:
+                assert loaded.wait(5)
+            return super().select_index(items, **kwargs)
+
+    root = make_tree(calls)
+    menu = WaitingMenu([(2, 0), (None, 1), (None, 1)])
+    with MenuTree(menu, root, prefetch=3, workers=1) as tree:
+        root_children = tree.children(root)
+        for node in root_children.nodes:
+            assert node.children is not None
+            load = node.children
+
+            def wrapped(load: Any = load) -> Any:
+                nodes = load()
+                if len(calls) == 4:
+                    loaded.set()
+                return nodes
+
+            node.children = wrapped
+        tree.select()
+    assert sorted(calls) == ['root', 'root/0', 'root/1', 'root/2']
+    assert tree.info().hits == 2
+
+
+def test_failed_load_is_retried() -> None:
+    attempts = []
+
+    def load() -> list[Node[str]]:
+        attempts.append(1)
+        if len(attempts) == 1:
+            err = 'offline'
+            raise OSError(err)
+        return [Node('a')]
+
+    tree = MenuTree(ScriptedMenu([]), Node('root', children=load))
+    with pytest.raises(OSError, match='offline'):
+        tree.children(tree.root)
+    assert [n.value for n in tree.children(tree.root).nodes] == ['a']
+    with pytest.raises(ValueError, match='no children'):
+        tree.children(Node('leaf'))
+
+
+def test_interrupted_load_is_not_cached() -> None:
+    attempts = []
+
+    def load() -> list[Node[str]]:
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise KeyboardInterrupt
+        return [Node('a')]
+
+    tree = MenuTree(ScriptedMenu([]), Node('root', children=load))
+    with pytest.raises(KeyboardInterrupt):
+        tree.children(tree.root)
+    assert tree.info().currsize == 0
+    assert [n.value for n in tree.children(tree.root).nodes] == ['a']